@@ -0,0 +1,140 @@
+"""
+Load generator for admission control: a closed-loop bulk flood of /analyze
+requests alongside a few interactive users, with admission control off and on.
+
+Run from backend/:
+    python -m benchmarks.bench_admission --duration 10 --bulk-clients 48
+
+Uses the synthetic LLM transport with a fixed upstream latency, in-process over
+ASGI, so only queueing inside this service is measured. Bulk clients honour
+Retry-After (capped by --max-backoff) the way a well-behaved importer would.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("LLM_TRANSPORT", "synthetic")
+# Keep synthetic analyses out of the real job queue and history.
+os.environ.setdefault("JOB_QUEUE_DB_PATH", os.path.join(tempfile.gettempdir(), "benchmark-jobs.sqlite3"))
+os.environ.setdefault("ANALYSIS_HISTORY_DB_PATH", os.path.join(tempfile.gettempdir(), "benchmark-analyses.sqlite3"))
+os.environ.setdefault("LLM_REPLAY_LATENCY_MS", "fixed:300")
+# Every request sends the same product; keep it from being served from cache.
+os.environ.setdefault("LLM_CACHE_MAX_ENTRIES", "0")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+import httpx
+
+import main
+from core.admission import AdmissionController
+from core.container import container
+
+PAYLOAD = {
+    "product_name": "Cotton T-shirt",
+    "description": "Knitted crew-neck t-shirt, 95% cotton 5% elastane.",
+    "manufacturing_country": "IN",
+    "destination_country": "US",
+    "declared_value": 12000,
+}
+
+
+class ClassStats:
+    def __init__(self):
+        self.latencies = []
+        self.shed = 0
+        self.errors = 0
+
+    def summary(self, duration: float) -> str:
+        ordered = sorted(self.latencies)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else float("nan")
+        median = statistics.median(ordered) * 1000 if ordered else float("nan")
+        return (
+            f"ok {len(ordered):5d} ({len(ordered) / duration:6.1f}/s)  429 {self.shed:5d}  err {self.errors:3d}  "
+            f"p50 {median:8.1f} ms  p95 {pick(0.95):8.1f} ms  p99 {pick(0.99):8.1f} ms"
+        )
+
+
+async def client_loop(client, priority: str, stats: ClassStats, stop_at: float, think_seconds: float, max_backoff: float):
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.post("/analyze/", json=PAYLOAD, headers={"X-Request-Priority": priority})
+        elapsed = time.perf_counter() - started
+        if response.status_code == 429:
+            stats.shed += 1
+            await asyncio.sleep(min(float(response.headers.get("Retry-After", 1)), max_backoff))
+            continue
+        if response.status_code != 200 or not response.json().get("success"):
+            stats.errors += 1
+        else:
+            stats.latencies.append(elapsed)
+        if think_seconds:
+            await asyncio.sleep(think_seconds)
+
+
+async def run_scenario(args, enabled: bool):
+    container.override(
+        "admission_controller",
+        AdmissionController(max_in_flight=args.max_in_flight, enabled=enabled),
+    )
+    stats = {"interactive": ClassStats(), "bulk": ClassStats()}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        stop_at = time.perf_counter() + args.duration
+        tasks = [
+            client_loop(client, "bulk", stats["bulk"], stop_at, 0, args.max_backoff)
+            for _ in range(args.bulk_clients)
+        ] + [
+            client_loop(client, "interactive", stats["interactive"], stop_at, args.think_ms / 1000, args.max_backoff)
+            for _ in range(args.interactive_clients)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    print(f"admission {'on ' if enabled else 'off'}:")
+    for name, class_stats in stats.items():
+        print(f"  {name:12s} {class_stats.summary(elapsed)}")
+    if enabled:
+        print(f"  controller   {container.admission_controller.metrics()['classes']}")
+
+
+async def check_bulk_routes_shed():
+    """A bulk route must be refused while interactive work is over its delay target."""
+    controller = AdmissionController()
+    controller._queue_delay["interactive"].observe(controller.target_delay * 100, weight=1.0)
+    container.override("admission_controller", controller)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/analyze/jobs/batch", json=[PAYLOAD])
+    if response.status_code != 429:
+        raise SystemExit(f"/analyze/jobs/batch was not shed under overload (status {response.status_code})")
+    print("bulk routes shed under overload: ok")
+
+
+async def main_async(args):
+    await main.startup_event()
+    try:
+        await check_bulk_routes_shed()
+        for enabled in (False, True):
+            await run_scenario(args, enabled)
+    finally:
+        await main.shutdown_event()
+        main.BASE_DIR.joinpath("globe_data.json").unlink(missing_ok=True)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--bulk-clients", type=int, default=48)
+    parser.add_argument("--interactive-clients", type=int, default=4)
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Pause between interactive requests.")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--max-backoff", type=float, default=1.0, help="Cap on honoured Retry-After seconds.")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_()
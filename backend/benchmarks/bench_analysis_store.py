@@ -0,0 +1,181 @@
+"""
+Memory per analysis held in state.ANALYSIS_STORE: the pipeline's plain dicts
+vs. AnalysisRecord (slotted records, interned codes, shared blocks).
+
+Inputs are decoded from JSON per analysis, as request bodies and LLM output
+are, so nothing is shared by accident. Trade intel is the deterministic
+fallback, except for --ai-share of analyses, which get unique insight texts
+the way LLM output does. Each analysis carries the stage cache the pipeline
+seeds (RecalculationService.evaluate over its inputs): the dict layout keeps
+it as one memo dict per stage, as it used to, the record as one flat dict.
+
+Run from backend/:
+    python -m benchmarks.bench_analysis_store --analyses 100000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import orjson
+
+from core import state
+from core.analysis_records import AnalysisRecord, SharedValues, compact_materials
+from services.recalculation_service import RecalculationService
+from services.trade_intel_service import TradeIntelService
+
+from benchmarks.common import load_reference_data
+
+MATERIALS = [
+    ("Cotton", "raw_material"),
+    ("Polyester", "raw_material"),
+    ("Elastane", "raw_material"),
+    ("Steel", "component"),
+    ("Aluminium", "component"),
+    ("ABS plastic", "component"),
+    ("Lithium-ion cell", "component"),
+    ("Assembly", "manufacturing"),
+]
+
+
+def build_inputs(count: int, ai_share: float, seed: int):
+    """Yields (request, ai_result, trade_intel, stage_cache) as the pipeline has them for each analysis."""
+    rng = random.Random(seed)
+    countries = sorted(state.COUNTRY_RISK)
+    hs_codes = sorted(state.TARIFFS)
+    intel_service = TradeIntelService()
+    recalculation_service = RecalculationService()
+    unshared = SharedValues(0)
+    for idx in range(count):
+        materials = [
+            {
+                "id": f"mat-{m + 1}",
+                "name": name,
+                "percentage": share,
+                "origin_country": rng.choice(countries),
+                "stage": stage,
+            }
+            for m, ((name, stage), share) in enumerate(
+                zip(rng.sample(MATERIALS, 3), (60.0, 30.0, 10.0))
+            )
+        ]
+        payload = orjson.loads(orjson.dumps({
+            "request": {
+                "manufacturing_country": rng.choice(countries),
+                "destination_country": rng.choice(countries),
+                "declared_value": float(rng.randrange(1000, 50001, 500)),
+                "currency": rng.choice(["USD", "USD", "EUR", "INR"]),
+            },
+            "ai_result": {"hs_code": rng.choice(hs_codes), "materials": materials},
+        }))
+        request, ai_result = payload["request"], payload["ai_result"]
+        tariff_summary = {"total_duty_percent": float(rng.choice([5, 8, 10, 12, 15]))}
+        intel = intel_service._fallback(
+            product_name="product",
+            hs_code=ai_result["hs_code"],
+            manufacturing_country=request["manufacturing_country"],
+            destination_country=request["destination_country"],
+            declared_value=request["declared_value"],
+            tariff_summary=tariff_summary,
+            risk_score=float(rng.randint(10, 90)),
+        )
+        if rng.random() < ai_share:
+            intel["recent_insights"] = [
+                {"title": f"Insight {n}", "detail": f"Lane-specific observation {idx}-{n} from the model."}
+                for n in range(3)
+            ]
+        stage_cache = {}
+        recalculation_service.evaluate(
+            stage_cache,
+            hs_code=ai_result["hs_code"],
+            manufacturing_country=request["manufacturing_country"],
+            destination_country=request["destination_country"],
+            declared_value=request["declared_value"],
+            materials=compact_materials(materials, unshared),
+            currency=request["currency"],
+        )
+        yield request, ai_result, intel, stage_cache
+
+
+def as_dict(request, ai_result, intel, stage_cache):
+    per_stage = {}
+    for (name, fingerprint), output in stage_cache.items():
+        per_stage.setdefault(name, {})[fingerprint] = output
+    return {
+        "hs_code": ai_result["hs_code"],
+        "materials": ai_result["materials"],
+        "manufacturing_country": request["manufacturing_country"],
+        "destination_country": request["destination_country"],
+        "declared_value": request["declared_value"],
+        "currency": request["currency"],
+        "declared_value_usd": request["declared_value"],
+        "as_of": None,
+        "recent_insights": intel["recent_insights"],
+        "shipping_options": intel["shipping_options"],
+        "compliance_checks": intel["compliance_checks"],
+        "stage_cache": per_stage,
+    }
+
+
+def as_record(shared: SharedValues):
+    def build(request, ai_result, intel, stage_cache):
+        return AnalysisRecord.create(
+            hs_code=ai_result["hs_code"],
+            manufacturing_country=request["manufacturing_country"],
+            destination_country=request["destination_country"],
+            declared_value=request["declared_value"],
+            currency=request["currency"],
+            declared_value_usd=request["declared_value"],
+            as_of=None,
+            materials=ai_result["materials"],
+            recent_insights=intel["recent_insights"],
+            shipping_options=intel["shipping_options"],
+            compliance_checks=intel["compliance_checks"],
+            stage_cache=stage_cache,
+            shared=shared,
+        )
+    return build
+
+
+def measure(build, args):
+    """Bytes still allocated per analysis once `args.analyses` of them are stored."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    store = {idx: build(*inputs) for idx, inputs in enumerate(build_inputs(args.analyses, args.ai_share, args.seed))}
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del store
+    return used / args.analyses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--analyses", type=int, default=100000)
+    parser.add_argument("--ai-share", type=float, default=0.2)
+    parser.add_argument("--shared-entries", type=int, default=65536)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    load_reference_data()
+    # Fills the engines' own lookup caches, so neither layout is charged for them.
+    for _ in build_inputs(args.analyses, args.ai_share, args.seed):
+        pass
+    before, before_s = measure(as_dict, args)
+    shared = SharedValues(args.shared_entries)
+    after, after_s = measure(as_record(shared), args)
+    stats = shared.stats()
+
+    print(f"analyses:                     {args.analyses} ({args.ai_share:.0%} with model-written insights)")
+    print(f"dict layout:                  {before:10.0f} bytes/analysis   build {before_s:6.2f} s")
+    print(f"AnalysisRecord:               {after:10.0f} bytes/analysis   build {after_s:6.2f} s")
+    print(f"saved:                        {1 - after / before:10.1%}")
+    print(f"shared values:                {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
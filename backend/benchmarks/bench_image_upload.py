@@ -0,0 +1,83 @@
+"""
+Peak Python memory for an image analysis sent as base64 JSON (/analyze/)
+versus raw binary (/analyze/image) and multipart (/analyze/upload).
+
+Run from backend/:
+    python -m benchmarks.bench_image_upload --image-mb 5
+
+Uses the synthetic LLM transport, so only the request handling is measured.
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("LLM_TRANSPORT", "synthetic")
+# Keep synthetic analyses out of the real job queue and history.
+os.environ.setdefault("JOB_QUEUE_DB_PATH", os.path.join(tempfile.gettempdir(), "benchmark-jobs.sqlite3"))
+os.environ.setdefault("ANALYSIS_HISTORY_DB_PATH", os.path.join(tempfile.gettempdir(), "benchmark-analyses.sqlite3"))
+
+from fastapi.testclient import TestClient
+
+import main
+
+PRODUCT = {
+    "product_name": "canvas tote bag",
+    "manufacturing_country": "CN",
+    "destination_country": "US",
+    "declared_value": 1200,
+}
+
+
+def fake_png(size_bytes: int) -> bytes:
+    header = b"\x89PNG\r\n\x1a\n"
+    return header + os.urandom(size_bytes - len(header))
+
+
+def measure(send):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    response = send()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ok = response.status_code == 200 and response.json().get("success")
+    return peak / (1024 * 1024), elapsed_ms, ok
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image-mb", type=float, default=5.0)
+    args = parser.parse_args()
+
+    image = fake_png(int(args.image_mb * 1024 * 1024))
+    encoded = base64.b64encode(image).decode("ascii")
+
+    with TestClient(main.app) as client:
+        cases = {
+            "json base64 /analyze/": lambda: client.post(
+                "/analyze/", json={**PRODUCT, "image_base64": encoded, "image_mime_type": "image/png"}
+            ),
+            "raw binary /analyze/image": lambda: client.post(
+                "/analyze/image", params=PRODUCT, content=image, headers={"Content-Type": "image/png"}
+            ),
+            "multipart /analyze/upload": lambda: client.post(
+                "/analyze/upload",
+                data={key: str(value) for key, value in PRODUCT.items()},
+                files={"image": ("tote.png", image, "image/png")},
+            ),
+        }
+        print(f"image size: {len(image) / (1024 * 1024):.1f} MiB (base64 {len(encoded) / (1024 * 1024):.1f} MiB)")
+        for name, send in cases.items():
+            send()  # warm up imports and caches outside the measurement
+            peak_mb, elapsed_ms, ok = measure(send)
+            print(f"  {name:28s} peak {peak_mb:8.1f} MiB  {elapsed_ms:8.1f} ms  {'ok' if ok else 'FAILED'}")
+
+    main.BASE_DIR.joinpath("globe_data.json").unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main_()
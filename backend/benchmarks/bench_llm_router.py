@@ -0,0 +1,87 @@
+"""
+Tail latency of streamed classification calls against local stub backends:
+each endpoint alone, the router without hedging, and the router with hedging.
+
+Run from backend/:
+    python -m benchmarks.bench_llm_router --calls 200 --concurrency 8
+
+Starts three OpenAI-compatible stubs (benchmarks/llm_stub_server.py) on
+--base-port.. : "steady" (normal 400 ms), "tail" (fast median, heavy tail)
+and "flaky" (fast, 30% HTTP 500s), and drives them through the real SDK.
+"""
+import argparse
+import asyncio
+import time
+
+from services import llm_router
+from services.llm_json import complete_json
+from services.llm_router import LLMRouter, build_endpoints, endpoint_metrics
+
+from benchmarks.llm_stub_server import serve
+
+BACKENDS = (
+    ("steady", "normal:400,60", 0.0),
+    ("tail", "lognormal:5.5,0.9", 0.0),
+    ("flaky", "fixed:200", 0.3),
+)
+
+MESSAGES = [{
+    "role": "user",
+    "content": "Classify the product.\nProduct Name: cotton tee\nSupported HS codes for this system: 6109.10, 6110.20",
+}]
+
+
+async def drive(router: LLMRouter, calls: int, concurrency: int):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await complete_json(router, model="stub-model", messages=MESSAGES, temperature=0, stream=True)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else float("nan")
+    return f"ok {len(ordered):4d}  err {errors:3d}  p50 {pick(0.5):7.0f} ms  p95 {pick(0.95):7.0f} ms  p99 {pick(0.99):7.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-port", type=int, default=9101)
+    args = parser.parse_args()
+
+    servers, specs = [], []
+    for offset, (name, latency, error_rate) in enumerate(BACKENDS):
+        port = args.base_port + offset
+        servers.append(serve(port, latency, error_rate, seed=offset))
+        specs.append({"name": name, "base_url": f"http://127.0.0.1:{port}/v1", "api_key": "stub"})
+
+    scenarios = [(f"{spec['name']} only", [spec], False) for spec in specs]
+    scenarios += [("router, no hedging", specs, False), ("router, hedged", specs, True)]
+
+    try:
+        for label, scenario_specs, hedge in scenarios:
+            llm_router._STATS.clear()
+            router = LLMRouter(build_endpoints(scenario_specs, mode="live"), hedge=hedge, seed=1)
+            print(f"{label:20s} {asyncio.run(drive(router, args.calls, args.concurrency))}")
+            if len(scenario_specs) > 1:
+                for name, stats in endpoint_metrics().items():
+                    print(
+                        f"    {name:8s} calls {stats['calls']:4d}  wins {stats['wins']:4d}  hedges {stats['hedges']:3d}  "
+                        f"errors {stats['errors']:3d}  ttft ewma {stats['stream']['ewma_ms']} ms"
+                    )
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
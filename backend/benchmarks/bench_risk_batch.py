@@ -0,0 +1,91 @@
+"""
+Batch vs. scalar RiskEngine benchmark. Also checks the batch path reproduces the
+original per-call formula exactly.
+
+Run from backend/:
+    python -m benchmarks.bench_risk_batch --rows 200000
+"""
+import argparse
+import random
+import time
+
+from core import state
+from core.analysis_records import MaterialRecord
+from services.risk_engine import RiskEngine
+
+from benchmarks.common import load_reference_data
+
+
+def reference_risk(manufacturing_country, destination_country, total_duty_percent, materials):
+    """The pre-vectorisation scalar formula, kept here as the oracle."""
+    origin_risk = state.COUNTRY_RISK.get(manufacturing_country, 50)
+    destination_risk = state.COUNTRY_RISK.get(destination_country, 50)
+    tariff_risk = total_duty_percent * 1.5
+    sourcing_countries = {m.origin_country for m in materials if m.origin_country}
+    complexity_risk = len(sourcing_countries) * 5
+    risk_score = (
+        origin_risk * 0.35 +
+        destination_risk * 0.25 +
+        tariff_risk * 0.25 +
+        complexity_risk * 0.15
+    )
+    risk_score = max(0, min(100, risk_score))
+    return round(risk_score, 2)
+
+
+def build_rows(count: int, seed: int):
+    rng = random.Random(seed)
+    countries = sorted(state.COUNTRY_RISK.keys()) + ["ZZ", "JP"]
+    rows = []
+    for _ in range(count):
+        materials = [
+            MaterialRecord("", "", 0.0, rng.choice(countries), "") for _ in range(rng.randint(0, 6))
+        ]
+        duty = rng.choice([rng.randint(0, 60), round(rng.uniform(0, 80), 2), rng.uniform(0, 120)])
+        rows.append((rng.choice(countries), rng.choice(countries), duty, materials))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    load_reference_data()
+    engine = RiskEngine()
+    rows = build_rows(args.rows, args.seed)
+
+    started = time.perf_counter()
+    expected = [reference_risk(*row) for row in rows]
+    reference_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    scalar = [engine.calculate_risk(*row) for row in rows[: min(len(rows), 20000)]]
+    scalar_ms = (time.perf_counter() - started) * 1000 * len(rows) / len(scalar)
+
+    columns = list(zip(*rows))
+    started = time.perf_counter()
+    batch = engine.calculate_risk_batch(*columns[:3], materials=columns[3])
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    counts = [RiskEngine._sourcing_count(m) for m in columns[3]]
+    started = time.perf_counter()
+    engine.calculate_risk_batch(*columns[:3], sourcing_counts=counts)
+    batch_counts_ms = (time.perf_counter() - started) * 1000
+
+    mismatches = sum(1 for a, b in zip(expected, batch.tolist()) if a != b)
+    mismatches += sum(1 for a, b in zip(expected, scalar) if a != b)
+
+    print(f"rows:                         {len(rows)}")
+    print(f"original scalar formula:      {reference_ms:10.1f} ms")
+    print(f"calculate_risk (extrapolated):{scalar_ms:10.1f} ms")
+    print(f"calculate_risk_batch:         {batch_ms:10.1f} ms")
+    print(f"  with sourcing_counts:       {batch_counts_ms:10.1f} ms")
+    print(f"mismatches vs original:       {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Response serialization benchmark across payload sizes: FastAPI's default
+jsonable_encoder + JSONResponse path vs. FastJSONResponse.
+
+Run from backend/:
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import gzip
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core.responses import FastJSONResponse
+from models.response_models import TariffResponse
+from services.trade_intel_service import TradeIntelService
+
+from benchmarks.common import time_call
+
+
+def build_record(idx: int, as_model: bool):
+    tariff = {
+        "base_duty": 12.0,
+        "additional_duty": 2.0,
+        "trade_agreement_discount": -1.0,
+        "total_duty_percent": 13.0,
+        "estimated_duty_amount": 130.0 + idx,
+        "explanation": "Base duty 12% + additional duty 2% - trade agreement discount 1% = total 13% applied on declared value.",
+    }
+    intel = TradeIntelService()._fallback(
+        product_name="T-shirt",
+        hs_code="6109.10",
+        manufacturing_country="IN",
+        destination_country="US",
+        declared_value=1000.0 + idx,
+        tariff_summary=tariff,
+        risk_score=27.12,
+    )
+    return {
+        "analysis_id": f"analysis-{idx}",
+        "hs_code": "6109.10",
+        "materials": [
+            {"id": f"mat-{m}", "name": "cotton", "percentage": 25.0, "origin_country": "CN", "stage": "raw_material"}
+            for m in range(4)
+        ],
+        "tariff_summary": TariffResponse(**tariff) if as_model else tariff,
+        "risk_score": 27.12,
+        "map_flow": [
+            {"country": "India", "role": "exporter", "material": "cotton", "hs_code": "6109.10"},
+            {"country": "United States of America", "role": "importer", "material": "cotton", "hs_code": "6109.10"},
+        ],
+        **intel,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1,10,100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'bytes':>10} {'gzip bytes':>11} {'encoder+json ms':>16} {'orjson ms':>10} {'speedup':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        envelope = {
+            "success": True,
+            "data": {"items": [build_record(idx, as_model=True) for idx in range(size)]},
+            "error": None,
+        }
+
+        default_timing = time_call(lambda: JSONResponse(jsonable_encoder(envelope)), repeat=args.repeat)
+        fast_timing = time_call(lambda: FastJSONResponse(envelope), repeat=args.repeat)
+        body = FastJSONResponse(envelope).body
+
+        print(
+            f"{size:>8} {len(body):>10} {len(gzip.compress(body)):>11} "
+            f"{default_timing['median_ms']:>16} {fast_timing['median_ms']:>10} "
+            f"{default_timing['median_ms'] / max(fast_timing['median_ms'], 1e-6):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Scaling benchmark for SourcingOptimizer.
+
+Run from backend/:
+    python -m benchmarks.bench_sourcing_optimizer
+"""
+import argparse
+
+from core import state
+from core.analysis_records import MaterialRecord
+from services.sourcing_optimizer import SourcingOptimizer
+
+from benchmarks.common import load_reference_data, time_call
+
+
+def build_materials(count: int, shares: str = "equal"):
+    origins = sorted(state.COUNTRY_RISK.keys())
+    if shares == "skewed":
+        raw = [count - idx for idx in range(count)]
+        percentages = [round(100.0 * value / sum(raw), 2) for value in raw]
+    else:
+        percentages = [round(100.0 / count, 2)] * count
+    return tuple(
+        MaterialRecord(
+            id=f"mat-{idx + 1}",
+            name=f"material {idx + 1}",
+            percentage=percentages[idx],
+            origin_country=origins[idx % len(origins)],
+            stage="raw_material",
+        )
+        for idx in range(count)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-materials", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--time-budget-ms", type=int, default=5000)
+    parser.add_argument("--shares", choices=["equal", "skewed"], default="equal")
+    args = parser.parse_args()
+
+    load_reference_data()
+    optimizer = SourcingOptimizer()
+    candidates = len(optimizer.candidate_countries())
+
+    print(f"{'materials':>9} {'brute force':>14} {'nodes':>8} {'frontier':>8} {'complete':>8} {'median ms':>10}")
+    for count in range(1, args.max_materials + 1):
+        materials = build_materials(count, args.shares)
+
+        def run():
+            return optimizer.optimize(
+                hs_code="6109.10",
+                manufacturing_country="IN",
+                destination_country="US",
+                declared_value=50000,
+                materials=materials,
+                time_budget_ms=args.time_budget_ms,
+            )
+
+        result = run()
+        timing = time_call(run, repeat=args.repeat)
+        print(
+            f"{count:>9} {candidates ** count:>14.3g} {result['search']['nodes_explored']:>8} "
+            f"{len(result['frontier']):>8} {str(result['search']['complete']):>8} {timing['median_ms']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
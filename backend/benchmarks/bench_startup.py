@@ -0,0 +1,109 @@
+"""
+Cold-start benchmark: import-time breakdown of `main` and time to first
+response (import, startup event, GET /) in a fresh interpreter.
+
+Run from backend/:
+    python -m benchmarks.bench_startup --budget-ms 1500
+
+Exits non-zero when the median time to first response exceeds the budget, so
+it can gate CI. Heavy modules (numpy, openai) should not appear in the import
+list; services are built lazily by core.container.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Executed in a fresh interpreter so nothing is already imported or built.
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started_up = time.perf_counter()
+    response = client.get("/")
+    answered = time.perf_counter()
+heavy = [name for name in ("numpy", "openai") if name in sys.modules]
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (started_up - imported) * 1000,
+    "first_request_ms": (answered - started_up) * 1000,
+    "total_ms": (answered - started) * 1000,
+    "status": response.status_code,
+    "heavy_modules_loaded": heavy,
+}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("LLM_TRANSPORT", "synthetic")
+    env.setdefault("JOB_QUEUE_DB_PATH", str(Path("/tmp") / "bench_startup_jobs.sqlite3"))
+    env.setdefault("ANALYSIS_HISTORY_DB_PATH", str(Path("/tmp") / "bench_startup_analyses.sqlite3"))
+    return env
+
+
+def import_times(top: int):
+    """Returns the `top` modules with the largest cumulative import time."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def first_request():
+    completed = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST_SCRIPT],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if median time to first response exceeds this.")
+    args = parser.parse_args()
+
+    print(f"top {args.top} imports by cumulative time (ms):")
+    for cumulative_us, self_us, name in import_times(args.top):
+        print(f"  {cumulative_us / 1000:8.1f}  (self {self_us / 1000:6.1f})  {name}")
+
+    runs = [first_request() for _ in range(max(1, args.repeat))]
+    median = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("import_ms", "startup_ms", "first_request_ms", "total_ms")
+    }
+    heavy = sorted({name for run in runs for name in run["heavy_modules_loaded"]})
+
+    print(f"\ncold start over {len(runs)} fresh interpreters (median):")
+    print(f"  import main:             {median['import_ms']:8.1f} ms")
+    print(f"  startup event:           {median['startup_ms']:8.1f} ms")
+    print(f"  first GET /:             {median['first_request_ms']:8.1f} ms")
+    print(f"  time to first response:  {median['total_ms']:8.1f} ms")
+    print(f"  heavy modules loaded:    {', '.join(heavy) or 'none'}")
+
+    if any(run["status"] != 200 for run in runs):
+        raise SystemExit("GET / did not return 200")
+    if args.budget_ms is not None and median["total_ms"] > args.budget_ms:
+        raise SystemExit(f"time to first response {median['total_ms']} ms exceeds budget {args.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
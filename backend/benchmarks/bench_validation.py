@@ -0,0 +1,161 @@
+"""
+ProductRequest validation cost: per item vs. one bulk pass.
+
+- legacy per item:  the model as it was, with Python field validators for the
+                    country and currency codes, one model_validate per item
+                    after decoding the body (what FastAPI does per request);
+- per item:         the current model, same loop;
+- bulk (python):    PRODUCT_REQUEST_BATCH.validate_python over the decoded list;
+- bulk (json):      PRODUCT_REQUEST_BATCH.validate_json straight from the body
+                    bytes, as POST /analyze/jobs/batch does.
+
+Every path must produce the same field values; the run stops if they differ.
+
+Run from backend/:
+    python -m benchmarks.bench_validation --items 1000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date
+from typing import List, Optional
+
+import orjson
+from pydantic import BaseModel, Field, ValidationInfo, field_validator, model_validator
+
+from config import ANALYSIS_BATCH_MAX_ITEMS
+from models.product import PRODUCT_REQUEST_BATCH, ProductRequest
+
+
+class LegacyProductRequest(BaseModel):
+    """ProductRequest before its code fields moved to pydantic-core constraints."""
+
+    product_name: str = Field(..., min_length=2)
+    description: Optional[str] = None
+    image_base64: Optional[str] = None
+    image_mime_type: Optional[str] = None
+    manufacturing_country: str = Field(..., min_length=2, max_length=2)
+    destination_country: str = Field(..., min_length=2, max_length=2)
+    declared_value: float = Field(..., gt=0)
+    currency: str = Field("USD", min_length=3, max_length=3)
+    as_of: Optional[date] = None
+    groq_api_key: Optional[str] = None
+
+    @field_validator("description", mode="before")
+    @classmethod
+    def normalize_description(cls, value):
+        if value is None:
+            return None
+        return str(value).strip() or None
+
+    @field_validator("groq_api_key", mode="before")
+    @classmethod
+    def normalize_groq_api_key(cls, value):
+        if value is None:
+            return None
+        return str(value).strip() or None
+
+    @field_validator("image_mime_type", mode="before")
+    @classmethod
+    def normalize_image_mime_type(cls, value):
+        if value is None:
+            return None
+        return str(value).strip().lower() or None
+
+    @field_validator("description")
+    @classmethod
+    def validate_description_length(cls, value):
+        if value is not None and len(value) < 5:
+            raise ValueError("Description must be at least 5 characters long")
+        return value
+
+    @field_validator("manufacturing_country", "destination_country")
+    @classmethod
+    def validate_country_code(cls, value):
+        code = str(value).strip().upper()
+        if len(code) != 2:
+            raise ValueError("Country must be ISO2 format")
+        return code
+
+    @field_validator("currency")
+    @classmethod
+    def validate_currency_code(cls, value):
+        code = str(value).strip().upper()
+        if len(code) != 3 or not code.isalpha():
+            raise ValueError("Currency must be ISO 4217 format")
+        return code
+
+    @model_validator(mode="after")
+    def validate_description_or_image(self, info: ValidationInfo):
+        has_upload = bool(info.context and info.context.get("image_upload"))
+        if not self.description and not self.image_base64 and not has_upload:
+            raise ValueError("Either description or image_base64 is required")
+        return self
+
+
+COUNTRIES = ["us", "IN", "cn", "VN", "DE", "mx", "BD", "TR"]
+CURRENCIES = ["USD", "eur", "INR", "GBP", "cny"]
+
+
+def build_bodies(count: int, seed: int) -> List[bytes]:
+    """JSON request bodies of at most ANALYSIS_BATCH_MAX_ITEMS items, `count` items in all."""
+    rng = random.Random(seed)
+    items = []
+    for idx in range(count):
+        item = {
+            "product_name": f"Product {idx}",
+            "description": f"  Knitted garment {idx}, 95% cotton 5% elastane. ",
+            "manufacturing_country": rng.choice(COUNTRIES),
+            "destination_country": rng.choice(COUNTRIES),
+            "declared_value": float(rng.randrange(1000, 50001, 500)),
+            "currency": rng.choice(CURRENCIES),
+        }
+        if rng.random() < 0.3:
+            item["as_of"] = "2025-03-01"
+        items.append(item)
+    return [
+        orjson.dumps(items[start:start + ANALYSIS_BATCH_MAX_ITEMS])
+        for start in range(0, count, ANALYSIS_BATCH_MAX_ITEMS)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    bodies = build_bodies(args.items, args.seed)
+    paths = {
+        "legacy per item": lambda body: [LegacyProductRequest.model_validate(item) for item in json.loads(body)],
+        "per item": lambda body: [ProductRequest.model_validate(item) for item in json.loads(body)],
+        "bulk (python)": lambda body: PRODUCT_REQUEST_BATCH.validate_python(json.loads(body)),
+        "bulk (json)": lambda body: PRODUCT_REQUEST_BATCH.validate_json(body),
+    }
+
+    # Also warms every path up before timing.
+    expected = [[request.model_dump() for request in paths["legacy per item"](body)] for body in bodies]
+    for name, validate in paths.items():
+        if [[request.model_dump() for request in validate(body)] for body in bodies] != expected:
+            raise SystemExit(f"{name} validated the batch differently from the legacy model")
+
+    # Round-robin over the paths so machine noise hits them alike; best run wins.
+    best = {name: float("inf") for name in paths}
+    for _ in range(args.repeat):
+        for name, validate in paths.items():
+            started = time.perf_counter()
+            for body in bodies:
+                validate(body)
+            best[name] = min(best[name], time.perf_counter() - started)
+
+    baseline = best["legacy per item"]
+    print(f"items:                        {args.items} in {len(bodies)} bodies")
+    for name, seconds in best.items():
+        per_item_us = seconds / args.items * 1e6
+        print(f"{name + ':':30s}{seconds * 1000:8.2f} ms  {per_item_us:6.2f} us/item  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict
+
+import main
+
+
+def load_reference_data():
+    """Loads tariffs, agreements and country risk into core.state like app startup does."""
+    asyncio.run(main.startup_event())
+
+
+def time_call(fn: Callable, repeat: int = 5) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
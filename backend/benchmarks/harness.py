@@ -0,0 +1,171 @@
+"""
+Minimal benchmark harness: a registry of micro and macro benchmarks, timing
+helpers, machine-readable results and regression comparison against a
+previous results file.
+"""
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REGISTRY: List["Benchmark"] = []
+
+
+@dataclass
+class Benchmark:
+    name: str
+    kind: str  # "micro" or "macro"
+    fn: Callable
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def micro(name: str):
+    """Registers fn() -> callable; the returned callable is the timed operation."""
+    def register(fn):
+        REGISTRY.append(Benchmark(name=name, kind="micro", fn=fn))
+        return fn
+    return register
+
+
+def macro(name: str, **params):
+    """Registers an async fn(client, context) -> request coroutine factory."""
+    def register(fn):
+        REGISTRY.append(Benchmark(name=name, kind="macro", fn=fn, params=params))
+        return fn
+    return register
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_micro(operation: Callable[[], Any], rounds: int = 7, min_round_seconds: float = 0.02) -> Dict[str, float]:
+    """Times operation in calibrated batches; reports per-call microseconds."""
+    operation()
+    inner = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(inner):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_seconds or inner >= 1 << 20:
+            break
+        inner *= 2
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(inner):
+            operation()
+        samples.append((time.perf_counter() - started) / inner * 1e6)
+
+    ordered = sorted(samples)
+    return {
+        "calls_per_round": inner,
+        "rounds": rounds,
+        "min_us": round(ordered[0], 3),
+        "median_us": round(statistics.median(ordered), 3),
+        "max_us": round(ordered[-1], 3),
+        "ops_per_second": round(1e6 / statistics.median(ordered), 1),
+    }
+
+
+async def run_load(
+    send: Callable[[int], Any],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """
+    Fires `requests` calls of send(i) with at most `concurrency` in flight.
+    send must return (ok: bool). Reports throughput and latency percentiles.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(idx: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            ok = await send(idx)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(idx) for idx in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(_percentile(ordered, 0.50), 3),
+        "p95_ms": round(_percentile(ordered, 0.95), 3),
+        "p99_ms": round(_percentile(ordered, 0.99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+# Metric used for regression checks per benchmark kind, and whether higher is better.
+PRIMARY_METRICS = {
+    "micro": [("median_us", False)],
+    "macro": [("p95_ms", False), ("throughput_rps", True)],
+}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Returns one row per primary metric present in both runs, flagging regressions."""
+    rows = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in PRIMARY_METRICS.get(result["kind"], []):
+            before, after = previous.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            regressed = change < -threshold if higher_is_better else change > threshold
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change_percent": round(change * 100, 2),
+                "regressed": regressed,
+            })
+    return rows
+
+
+def environment_metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def write_results(path: Optional[Path], results: Dict[str, Any]):
+    if path is None:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2), encoding="utf-8")
@@ -0,0 +1,144 @@
+"""
+Local OpenAI-compatible stub for exercising the LLM router against real HTTP.
+
+Serves POST /v1/chat/completions (plain and stream=true via SSE) with the
+synthetic transport's schema-valid content, after a sampled latency, failing
+a configurable share of requests with HTTP 500.
+
+Run from backend/, one process per simulated backend:
+    python -m benchmarks.llm_stub_server --port 9001 --latency normal:300,50
+    python -m benchmarks.llm_stub_server --port 9002 --latency lognormal:6.5,0.8 --error-rate 0.2
+
+Then point the app at them:
+    LLM_ENDPOINTS='[{"name":"fast","base_url":"http://127.0.0.1:9001/v1","api_key":"stub"},
+                    {"name":"flaky","base_url":"http://127.0.0.1:9002/v1","api_key":"stub"}]'
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.llm_transport import LatencyModel, SyntheticResponder
+
+_STREAM_CHUNK_CHARS = 16
+
+
+class StubBackend:
+    def __init__(self, latency: str, error_rate: float, seed=None):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._latency = LatencyModel(latency, self._rng)
+        self.error_rate = error_rate
+        self.responder = SyntheticResponder()
+
+    def sample(self):
+        with self._lock:
+            return self._latency.sample_ms() / 1000, self._rng.random() < self.error_rate
+
+
+def _handler(backend: StubBackend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": "Not found"}})
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get("model", "stub")
+            delay, fail = backend.sample()
+
+            if fail:
+                # Failures come back faster than successes.
+                time.sleep(delay * 0.3)
+                return self._json(500, {"error": {"message": "Injected stub failure", "type": "server_error"}})
+
+            content = backend.responder.respond(model, request.get("messages") or [])
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+            if not request.get("stream"):
+                time.sleep(delay)
+                return self._json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                })
+
+            # First token after 30% of the latency, the rest spread over the stream.
+            pieces = [content[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(content), _STREAM_CHUNK_CHARS)]
+            time.sleep(delay * 0.3)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            per_piece = delay * 0.7 / max(1, len(pieces))
+            try:
+                for index, piece in enumerate(pieces + [None]):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": piece} if piece is not None else {},
+                            "finish_reason": None if piece is not None else "stop",
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if piece is not None and index:
+                        time.sleep(per_piece)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client hedged elsewhere and closed the stream
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(port: int, latency: str, error_rate: float = 0.0, seed=None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Starts a stub in a daemon thread and returns the server (call shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), _handler(StubBackend(latency, error_rate, seed)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", default="normal:300,50", help="Same syntax as LLM_REPLAY_LATENCY_MS.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), _handler(StubBackend(args.latency, args.error_rate, args.seed)))
+    server.daemon_threads = True
+    print(f"LLM stub on http://{args.host}:{args.port}/v1 latency={args.latency} error_rate={args.error_rate}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
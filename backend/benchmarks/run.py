@@ -0,0 +1,118 @@
+"""
+Runs the benchmark suite and writes machine-readable results.
+
+Run from backend/:
+    python -m benchmarks.run --output bench/latest.json
+    python -m benchmarks.run --baseline bench/main.json --threshold 0.15
+    python -m benchmarks.run --filter tariff --kind micro
+
+Macro benchmarks use the synthetic LLM transport; --llm-latency-ms sets its
+simulated upstream latency (any LLM_REPLAY_LATENCY_MS spec). Exits with
+status 1 when a primary metric regresses past the threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=Path, default=None, help="Write results JSON here.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Previous results JSON to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression (0.15 = 15%%).")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text.")
+    parser.add_argument("--kind", choices=["all", "micro", "macro"], default="all")
+    parser.add_argument("--llm-latency-ms", default="0")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for macro request counts.")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    # Must happen before config.py is imported anywhere.
+    os.environ["LLM_TRANSPORT"] = "synthetic"
+    os.environ["LLM_REPLAY_LATENCY_MS"] = args.llm_latency_ms
+    os.environ["LLM_REPLAY_ERROR_RATE"] = "0"
+    # Measure the pipeline, not completion-cache hits or a background warmup.
+    os.environ["LLM_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["WARMUP_ENABLED"] = "false"
+    os.environ.setdefault("JOB_QUEUE_DB_PATH", str(Path(tempfile.gettempdir()) / "benchmark-jobs.sqlite3"))
+    os.environ.setdefault("ANALYSIS_HISTORY_DB_PATH", str(Path(tempfile.gettempdir()) / "benchmark-analyses.sqlite3"))
+
+
+async def run_macro_benchmarks(benchmarks, scale):
+    import httpx
+
+    import main
+
+    await main.startup_event()
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        from benchmarks.harness import run_load
+
+        for bench in benchmarks:
+            send = await bench.fn(client)
+            requests = max(1, int(bench.params.get("requests", 100) * scale))
+            results[bench.name] = {
+                "kind": "macro",
+                **await run_load(send, requests, bench.params.get("concurrency", 8)),
+            }
+            print_row(bench.name, results[bench.name])
+    return results
+
+
+def print_row(name, result):
+    if result["kind"] == "micro":
+        print(f"{name:<42} {result['median_us']:>12.3f} us {result['ops_per_second']:>14.1f} ops/s")
+    else:
+        print(
+            f"{name:<42} {result['throughput_rps']:>10.1f} rps  p50 {result['p50_ms']:.2f} ms"
+            f"  p95 {result['p95_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms  errors {result['errors']}"
+        )
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+
+    from benchmarks import suite  # noqa: F401  (registers benchmarks)
+    from benchmarks.common import load_reference_data
+    from benchmarks.harness import REGISTRY, compare, environment_metadata, run_micro, write_results
+
+    selected = [b for b in REGISTRY if args.filter in b.name and args.kind in ("all", b.kind)]
+    results = {}
+
+    micro_benchmarks = [b for b in selected if b.kind == "micro"]
+    if micro_benchmarks:
+        load_reference_data()
+        for bench in micro_benchmarks:
+            results[bench.name] = {"kind": "micro", **run_micro(bench.fn())}
+            print_row(bench.name, results[bench.name])
+
+    macro_benchmarks = [b for b in selected if b.kind == "macro"]
+    if macro_benchmarks:
+        results.update(asyncio.run(run_macro_benchmarks(macro_benchmarks, args.scale)))
+
+    report = {"meta": {**environment_metadata(), "llm_latency_ms": args.llm_latency_ms}, "results": results}
+    write_results(args.output, report)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        rows = compare(report, baseline, args.threshold)
+        regressions = [row for row in rows if row["regressed"]]
+        for row in rows:
+            flag = "REGRESSION" if row["regressed"] else "ok"
+            print(
+                f"{row['benchmark']:<42} {row['metric']:<15} {row['baseline']:>12} -> {row['current']:>12}"
+                f" ({row['change_percent']:+.1f}%) {flag}"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
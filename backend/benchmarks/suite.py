@@ -0,0 +1,163 @@
+"""
+Benchmarks for every route and service hot path. Imported by benchmarks.run,
+which configures the synthetic LLM transport before this module loads.
+"""
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core.analysis_records import MaterialRecord
+from core.responses import FastJSONResponse
+from models.product import PRODUCT_REQUEST_BATCH, ProductRequest
+from services.ai_service import AIService
+from services.risk_engine import RiskEngine
+from services.tariff_engine import TariffEngine
+from services.trade_intel_service import TradeIntelService
+
+from benchmarks.bench_serialization import build_record
+from benchmarks.harness import macro, micro
+
+ANALYZE_PAYLOAD = {
+    "product_name": "Cotton T-shirt",
+    "description": "Knitted crew-neck t-shirt, 95% cotton 5% elastane.",
+    "manufacturing_country": "IN",
+    "destination_country": "US",
+    "declared_value": 12000,
+}
+
+
+# ----------------------------------------------------------------------
+# Micro benchmarks
+# ----------------------------------------------------------------------
+@micro("tariff.calculate_tariff.exact")
+def tariff_exact():
+    engine = TariffEngine()
+    return lambda: engine.calculate_tariff("6109.10", "IN", "US", 12000)
+
+
+@micro("tariff.calculate_tariff.heading_fallback")
+def tariff_heading_fallback():
+    engine = TariffEngine()
+    return lambda: engine.calculate_tariff("6109.99", "IN", "US", 12000)
+
+
+@micro("tariff.calculate_tariff.chapter_fallback")
+def tariff_chapter_fallback():
+    engine = TariffEngine()
+    return lambda: engine.calculate_tariff("6199.00", "IN", "US", 12000)
+
+
+@micro("tariff.total_percents_by_origin.40")
+def tariff_by_origin():
+    engine = TariffEngine()
+    origins = list(engine.index().countries[:40])
+    return lambda: engine.total_percents_by_origin("6109.10", origins, "US")
+
+
+@micro("risk.calculate_risk")
+def risk_scalar():
+    engine = RiskEngine()
+    materials = [MaterialRecord("", "", 0.0, code, "") for code in ("CN", "VN", "IN", "CN")]
+    return lambda: engine.calculate_risk("IN", "US", 13.0, materials)
+
+
+@micro("risk.calculate_risk_batch.10k")
+def risk_batch():
+    engine = RiskEngine()
+    rows = 10000
+    origins = (["IN", "CN", "VN", "ZZ"] * rows)[:rows]
+    destinations = (["US", "DE", "GB"] * rows)[:rows]
+    duties = [float(idx % 40) for idx in range(rows)]
+    counts = [idx % 5 for idx in range(rows)]
+    return lambda: engine.calculate_risk_batch(origins, destinations, duties, sourcing_counts=counts)
+
+
+@micro("ai._normalize_materials")
+def normalize_materials():
+    service = AIService()
+    raw = [
+        {"name": "Cotton", "percentage": "57", "country": "in"},
+        {"material": "Elastane", "percentage": 3, "origin_country": "CN", "stage": "fibre"},
+        {"name": "Polyester", "percentage": None, "origin_country": "VN"},
+        {"name": "Dye", "percentage": 12.5, "origin_country": "DEU"},
+        "not-a-material",
+    ]
+    return lambda: service._normalize_materials(raw, "Cotton T-shirt")
+
+
+@micro("trade_intel._normalize_payload")
+def normalize_payload():
+    service = TradeIntelService()
+    fallback = service._fallback("T-shirt", "6109.10", "IN", "US", 12000, {"total_duty_percent": 13.0}, 27.1)
+    parsed = {
+        "recent_insights": [{"title": "Signal", "detail": "Freight rates easing on IN->US."}] * 3,
+        "shipping_options": [
+            {"mode": "sea", "route": "INNSA -> USLAX", "eta_days": "28", "estimated_cost_usd": "1800.456",
+             "risk_level": "low", "notes": "Weekly sailings."},
+        ] * 3,
+        "compliance_checks": [{"item": "Origin", "status": "PASS", "note": "Certificate on file."}] * 3,
+    }
+    return lambda: service._normalize_payload(parsed, fallback)
+
+
+@micro("models.ProductRequest.model_validate")
+def validate_product_request():
+    return lambda: ProductRequest.model_validate(ANALYZE_PAYLOAD)
+
+
+@micro("models.PRODUCT_REQUEST_BATCH.validate_json.100")
+def validate_product_request_batch():
+    body = orjson.dumps([dict(ANALYZE_PAYLOAD, product_name=f"Cotton T-shirt {idx}") for idx in range(100)])
+    return lambda: PRODUCT_REQUEST_BATCH.validate_json(body)
+
+
+@micro("serialization.jsonable_encoder")
+def serialize_default():
+    envelope = {"success": True, "data": build_record(0, as_model=True), "error": None}
+    return lambda: JSONResponse(jsonable_encoder(envelope))
+
+
+@micro("serialization.fast_json")
+def serialize_fast():
+    envelope = {"success": True, "data": build_record(0, as_model=True), "error": None}
+    return lambda: FastJSONResponse(envelope)
+
+
+# ----------------------------------------------------------------------
+# Macro load tests (in-process ASGI, synthetic LLM transport)
+# ----------------------------------------------------------------------
+def _ok(response) -> bool:
+    return response.status_code == 200 and response.json().get("success") is True
+
+
+async def _create_analysis(client) -> str:
+    response = await client.post("/analyze/", json=ANALYZE_PAYLOAD)
+    return response.json()["data"]["analysis_id"]
+
+
+@macro("route./analyze", requests=100, concurrency=8)
+async def analyze_route(client):
+    async def send(idx):
+        payload = dict(ANALYZE_PAYLOAD, product_name=f"Cotton T-shirt {idx}")
+        return _ok(await client.post("/analyze/", json=payload))
+    return send
+
+
+@macro("route./recalculate", requests=1000, concurrency=16)
+async def recalculate_route(client):
+    analysis_id = await _create_analysis(client)
+
+    async def send(idx):
+        # Distinct declared values defeat the response cache and exercise the stages.
+        body = {"analysis_id": analysis_id, "declared_value": 1000 + idx}
+        return _ok(await client.post("/recalculate/", json=body))
+    return send
+
+
+@macro("route./generate-report", requests=1000, concurrency=16)
+async def report_route(client):
+    analysis_id = await _create_analysis(client)
+
+    async def send(idx):
+        return _ok(await client.post("/generate-report/", json={"analysis_id": analysis_id}))
+    return send
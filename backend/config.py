@@ -21,3 +21,99 @@ VISION_FALLBACK_MODEL = os.getenv(
     "meta-llama/llama-4-maverick-17b-128e-instruct"
 )
 USE_REAL_AI = True
+
+# Responses larger than this many bytes are gzip-compressed when the client accepts it.
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+# Deterministic routes (/recalculate, /generate-report) are cached by ETag.
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "300"))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "2048"))
+
+# Asynchronous /analyze/jobs queue, persisted to SQLite.
+JOB_QUEUE_DB_PATH = Path(os.getenv("JOB_QUEUE_DB_PATH", str(Path(__file__).parent / "jobs.sqlite3")))
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "2"))
+JOB_DEFAULT_DEADLINE_SECONDS = float(os.getenv("JOB_DEFAULT_DEADLINE_SECONDS", "300"))
+# Finished jobs (and their results) are deleted this long after they finish; 0 keeps them.
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+# Most analyses, and most body bytes, one POST /analyze/jobs/batch may submit.
+ANALYSIS_BATCH_MAX_ITEMS = int(os.getenv("ANALYSIS_BATCH_MAX_ITEMS", "1000"))
+ANALYSIS_BATCH_MAX_BYTES = int(os.getenv("ANALYSIS_BATCH_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Searchable history of completed analyses (/analyses/search), persisted to SQLite.
+ANALYSIS_HISTORY_DB_PATH = Path(os.getenv("ANALYSIS_HISTORY_DB_PATH", str(Path(__file__).parent / "analyses.sqlite3")))
+# /analyses/export reads the history this many analyses per query; Parquet and
+# Arrow exports (pyarrow required) write row groups of this many rows.
+ANALYSIS_EXPORT_BATCH_SIZE = int(os.getenv("ANALYSIS_EXPORT_BATCH_SIZE", "500"))
+ANALYSIS_EXPORT_ROW_GROUP_ROWS = int(os.getenv("ANALYSIS_EXPORT_ROW_GROUP_ROWS", "50000"))
+
+# In-memory analyses (core/analysis_records.py): equal materials, insights, shipping
+# options and compliance checks share one instance while among this many recent ones.
+ANALYSIS_STORE_SHARED_ENTRIES = int(os.getenv("ANALYSIS_STORE_SHARED_ENTRIES", "65536"))
+
+# Exchange rates (data/fx_rates.json): resolved rate vectors are kept for this many dates.
+FX_RATE_CACHE_DAYS = int(os.getenv("FX_RATE_CACHE_DAYS", "1024"))
+
+# End-to-end /analyze budget; clients may ask for less with X-Request-Deadline-Ms.
+ANALYZE_DEADLINE_SECONDS = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "60"))
+ANALYZE_DEADLINE_MAX_SECONDS = float(os.getenv("ANALYZE_DEADLINE_MAX_SECONDS", "120"))
+# Trade intel is skipped (deterministic fallback) when less than this is left.
+TRADE_INTEL_MIN_BUDGET_SECONDS = float(os.getenv("TRADE_INTEL_MIN_BUDGET_SECONDS", "1.0"))
+
+# Admission control for the LLM-backed routes (core/admission.py).
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").strip().lower() in {"1", "true", "yes"}
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16"))
+ADMISSION_BULK_MAX_SHARE = float(os.getenv("ADMISSION_BULK_MAX_SHARE", "0.5"))
+ADMISSION_TARGET_QUEUE_DELAY_MS = float(os.getenv("ADMISSION_TARGET_QUEUE_DELAY_MS", "250"))
+ADMISSION_INTERACTIVE_MAX_WAIT_MS = float(os.getenv("ADMISSION_INTERACTIVE_MAX_WAIT_MS", "5000"))
+ADMISSION_BULK_MAX_WAIT_MS = float(os.getenv("ADMISSION_BULK_MAX_WAIT_MS", "1000"))
+ADMISSION_BULK_ROUTES = tuple(route.strip() for route in os.getenv("ADMISSION_BULK_ROUTES", "/analyses/export,/analyze/jobs/batch").split(",") if route.strip())
+ADMISSION_BULK_API_KEYS = tuple(key.strip() for key in os.getenv("ADMISSION_BULK_API_KEYS", "").split(",") if key.strip())
+
+# LLM transport: live | record | replay | synthetic (see services/llm_transport.py).
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "live").strip().lower()
+LLM_CASSETTE_DIR = Path(os.getenv("LLM_CASSETTE_DIR", str(Path(__file__).parent / "llm_cassettes")))
+LLM_REPLAY_LATENCY_MS = os.getenv("LLM_REPLAY_LATENCY_MS", "0")
+LLM_REPLAY_ERROR_RATE = float(os.getenv("LLM_REPLAY_ERROR_RATE", "0"))
+LLM_REPLAY_FALLBACK = os.getenv("LLM_REPLAY_FALLBACK", "error").strip().lower()
+LLM_REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED")) if os.getenv("LLM_REPLAY_SEED") else None
+# Stream completions and parse them incrementally (services/llm_json.py).
+LLM_STREAM_RESPONSES = os.getenv("LLM_STREAM_RESPONSES", "true").strip().lower() in {"1", "true", "yes"}
+# Optional JSON list of OpenAI-compatible endpoints to route across (services/llm_router.py).
+LLM_ENDPOINTS = os.getenv("LLM_ENDPOINTS", "").strip()
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").strip().lower() in {"1", "true", "yes"}
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "100"))
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2000"))
+
+# Completions for identical classification / trade-intel inputs are reused for this long.
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "4096"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+
+# Startup warmup from recent analysis history, and the /ready gate (services/warmup.py).
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").strip().lower() in {"1", "true", "yes"}
+WARMUP_INTERVAL_SECONDS = float(os.getenv("WARMUP_INTERVAL_SECONDS", "0"))
+WARMUP_HISTORY_SECONDS = float(os.getenv("WARMUP_HISTORY_SECONDS", str(7 * 86400)))
+WARMUP_HISTORY_LIMIT = int(os.getenv("WARMUP_HISTORY_LIMIT", "5000"))
+WARMUP_TOP_PRODUCTS = int(os.getenv("WARMUP_TOP_PRODUCTS", "100"))
+WARMUP_TOP_LANES = int(os.getenv("WARMUP_TOP_LANES", "50"))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+WARMUP_READY_THRESHOLD = float(os.getenv("WARMUP_READY_THRESHOLD", "0.8"))
+WARMUP_READY_TIMEOUT_SECONDS = float(os.getenv("WARMUP_READY_TIMEOUT_SECONDS", "120"))
+
+# Opt-in request profiling (core/profiling.py); the middleware is only installed when enabled.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").strip().lower() in {"1", "true", "yes"}
+# Authenticates X-Profile requests and /admin/profiles; header-triggered profiling is off without it.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sample").strip().lower()
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+
+# Binary image uploads (/analyze/upload, /analyze/image).
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_SPOOL_MAX_MEMORY_BYTES = int(os.getenv("IMAGE_SPOOL_MAX_MEMORY_BYTES", str(1024 * 1024)))
+
+# /analytics/lanes aggregates: time buckets kept per lane and sketch accuracy.
+LANE_ANALYTICS_BUCKET_SECONDS = int(os.getenv("LANE_ANALYTICS_BUCKET_SECONDS", "300"))
+LANE_ANALYTICS_BUCKETS = int(os.getenv("LANE_ANALYTICS_BUCKETS", "288"))
+LANE_ANALYTICS_RELATIVE_ACCURACY = float(os.getenv("LANE_ANALYTICS_RELATIVE_ACCURACY", "0.01"))
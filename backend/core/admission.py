@@ -0,0 +1,266 @@
+"""
+Admission control for the expensive routes: LLM-backed analysis, sourcing
+optimization and the bulk routes (ADMISSION_BULK_ROUTES, e.g. history
+exports and batch job submission).
+
+Requests are classed bulk by the route (ADMISSION_BULK_ROUTES) or the
+caller's key (ADMISSION_BULK_API_KEYS), otherwise by the X-Request-Priority
+header (default interactive); the header cannot raise bulk work to interactive.
+Up to ADMISSION_MAX_IN_FLIGHT controlled requests run at once; bulk work may
+use at most ADMISSION_BULK_MAX_SHARE of them. Requests over the limit wait
+in a queue that always serves interactive work first. Bulk work is shed while
+interactive queueing delay is above its target, and any request that waits
+longer than its class allows gets 429 with Retry-After.
+
+Every other route (/recalculate, /generate-report, job polling, analytics) is
+always admitted.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from config import (
+    ADMISSION_BULK_API_KEYS,
+    ADMISSION_BULK_MAX_SHARE,
+    ADMISSION_BULK_MAX_WAIT_MS,
+    ADMISSION_BULK_ROUTES,
+    ADMISSION_ENABLED,
+    ADMISSION_INTERACTIVE_MAX_WAIT_MS,
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_TARGET_QUEUE_DELAY_MS,
+)
+from core.responses import error_response
+
+PRIORITY_HEADER = "x-request-priority"
+API_KEY_HEADER = "x-groq-api-key"
+PRIORITY_CLASSES = ("interactive", "bulk")
+# The job queue calls its low-priority class "batch"; accept it here too.
+_PRIORITY_ALIASES = {"interactive": "interactive", "bulk": "bulk", "batch": "bulk"}
+
+CONTROLLED_ROUTES = {
+    ("POST", "/analyze"),
+    ("POST", "/analyze/"),
+    ("POST", "/analyze/upload"),
+    ("POST", "/analyze/image"),
+    ("POST", "/optimize-sourcing"),
+    ("POST", "/optimize-sourcing/"),
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, priority: str, reason: str, retry_after: int):
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Server is at capacity for {priority} requests ({reason}). Retry in {retry_after} s.")
+
+
+class _DecayingAverage:
+    """EWMA that also decays toward zero while nothing is observed."""
+
+    __slots__ = ("value", "updated_at", "half_life")
+
+    def __init__(self, half_life: float = 5.0):
+        self.value = 0.0
+        self.updated_at = time.monotonic()
+        self.half_life = half_life
+
+    def current(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        return self.value * 0.5 ** ((now - self.updated_at) / self.half_life)
+
+    def observe(self, sample: float, weight: float = 0.2):
+        now = time.monotonic()
+        self.value = self.current(now) * (1 - weight) + sample * weight
+        self.updated_at = now
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        bulk_max_share: float = ADMISSION_BULK_MAX_SHARE,
+        target_queue_delay_ms: float = ADMISSION_TARGET_QUEUE_DELAY_MS,
+        interactive_max_wait_ms: float = ADMISSION_INTERACTIVE_MAX_WAIT_MS,
+        bulk_max_wait_ms: float = ADMISSION_BULK_MAX_WAIT_MS,
+        bulk_routes: Tuple[str, ...] = ADMISSION_BULK_ROUTES,
+        bulk_api_keys: Tuple[str, ...] = ADMISSION_BULK_API_KEYS,
+        enabled: bool = ADMISSION_ENABLED,
+    ):
+        self.enabled = enabled
+        self.max_in_flight = max(1, max_in_flight)
+        self.bulk_limit = max(1, int(self.max_in_flight * bulk_max_share))
+        self.target_delay = target_queue_delay_ms / 1000
+        self.max_wait = {"interactive": interactive_max_wait_ms / 1000, "bulk": bulk_max_wait_ms / 1000}
+        self.bulk_routes = tuple(bulk_routes)
+        self.bulk_api_keys = frozenset(bulk_api_keys)
+
+        self.in_flight = {name: 0 for name in PRIORITY_CLASSES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITY_CLASSES}
+        self._queue_delay = {name: _DecayingAverage() for name in PRIORITY_CLASSES}
+        self._service_time = _DecayingAverage(half_life=30.0)
+        self._counters = {
+            name: {"admitted": 0, "queued": 0, "rejected": 0} for name in PRIORITY_CLASSES
+        }
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+    def _bulk_route(self, path: str) -> bool:
+        return any(path.startswith(prefix) for prefix in self.bulk_routes)
+
+    def controls(self, scope) -> bool:
+        return (scope["method"], scope["path"]) in CONTROLLED_ROUTES or self._bulk_route(scope["path"])
+
+    def classify(self, scope) -> str:
+        # Bulk routes and keys stay bulk; the header can only lower a priority.
+        if self._bulk_route(scope["path"]):
+            return "bulk"
+        headers = dict(scope.get("headers") or ())
+        api_key = headers.get(API_KEY_HEADER.encode(), b"").decode("latin-1").strip()
+        if api_key and api_key in self.bulk_api_keys:
+            return "bulk"
+        requested = headers.get(PRIORITY_HEADER.encode(), b"").decode("latin-1").strip().lower()
+        return _PRIORITY_ALIASES.get(requested, "interactive")
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+    def _overloaded(self) -> bool:
+        """Interactive work is queueing longer than its target."""
+        return bool(self._waiters["interactive"]) or self._queue_delay["interactive"].current() > self.target_delay
+
+    def _can_start(self, priority: str) -> bool:
+        if sum(self.in_flight.values()) >= self.max_in_flight:
+            return False
+        if priority == "bulk":
+            return self.in_flight["bulk"] < self.bulk_limit and not self._overloaded()
+        return True
+
+    def _retry_after(self) -> int:
+        waiting = sum(len(queue) for queue in self._waiters.values())
+        service = self._service_time.current() or 1.0
+        return max(1, math.ceil(service * (1 + waiting / self.max_in_flight)))
+
+    def _reject(self, priority: str, reason: str):
+        self._counters[priority]["rejected"] += 1
+        raise AdmissionRejected(priority, reason, self._retry_after())
+
+    async def acquire(self, priority: str) -> float:
+        """Waits for a slot; returns the queueing delay in seconds or raises AdmissionRejected."""
+        if priority == "bulk" and self._overloaded():
+            self._reject(priority, "shedding bulk work while interactive latency is over target")
+
+        if not self._waiters[priority] and self._can_start(priority):
+            self.in_flight[priority] += 1
+            self._counters[priority]["admitted"] += 1
+            self._queue_delay[priority].observe(0.0)
+            return 0.0
+
+        if self.max_wait[priority] <= 0:
+            self._reject(priority, "no capacity")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self._counters[priority]["queued"] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait[priority])
+        except asyncio.TimeoutError:
+            # A slot granted just as the wait ran out is still taken.
+            if not waiter.done():
+                self._abandon(priority, waiter)
+                self._queue_delay[priority].observe(time.monotonic() - started)
+                self._reject(priority, "queue wait exceeded")
+        except BaseException:
+            self._abandon(priority, waiter)
+            raise
+
+        delay = time.monotonic() - started
+        self._queue_delay[priority].observe(delay)
+        self._counters[priority]["admitted"] += 1
+        return delay
+
+    def _abandon(self, priority: str, waiter: asyncio.Future):
+        if waiter.done():
+            # Granted a slot just as the caller went away; hand it on.
+            self._release_slot(priority)
+            return
+        waiter.cancel()
+        self._waiters[priority].remove(waiter)
+        self._dispatch()
+
+    def release(self, priority: str, service_seconds: float):
+        self._service_time.observe(service_seconds)
+        self._release_slot(priority)
+
+    def _release_slot(self, priority: str):
+        self.in_flight[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        for priority in PRIORITY_CLASSES:
+            queue = self._waiters[priority]
+            while queue and self._can_start_queued(priority):
+                self.in_flight[priority] += 1
+                queue.popleft().set_result(None)
+
+    def _can_start_queued(self, priority: str) -> bool:
+        if sum(self.in_flight.values()) >= self.max_in_flight:
+            return False
+        if priority == "bulk":
+            return self.in_flight["bulk"] < self.bulk_limit and not self._waiters["interactive"]
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "bulk_limit": self.bulk_limit,
+            "target_queue_delay_ms": round(self.target_delay * 1000, 1),
+            "overloaded": self._overloaded(),
+            "classes": {
+                name: {
+                    **self._counters[name],
+                    "in_flight": self.in_flight[name],
+                    "waiting": len(self._waiters[name]),
+                    "queue_delay_ms": round(self._queue_delay[name].current(now) * 1000, 2),
+                }
+                for name in PRIORITY_CLASSES
+            },
+            "service_time_ms": round(self._service_time.current(now) * 1000, 2),
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware; the request body is not read until the request is admitted."""
+
+    def __init__(self, app, controller_factory):
+        self.app = app
+        self._controller_factory = controller_factory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        controller: AdmissionController = self._controller_factory()
+        if not controller.enabled or not controller.controls(scope):
+            return await self.app(scope, receive, send)
+
+        priority = controller.classify(scope)
+        try:
+            await controller.acquire(priority)
+        except AdmissionRejected as e:
+            response = error_response(
+                "OVERLOADED", str(e), status_code=429, headers={"Retry-After": str(e.retry_after)}
+            )
+            return await response(scope, receive, send)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(priority, time.monotonic() - started)
@@ -0,0 +1,203 @@
+"""
+Compact records for the in-memory analysis store (state.ANALYSIS_STORE).
+
+Analyses stay in memory for /recalculate, /generate-report and
+/optimize-sourcing for the life of the process. Kept as the pipeline builds
+them, most of their memory is dict overhead and copies of the same short
+strings. Records are slotted dataclasses instead:
+
+- enumerated fields (country and currency codes, HS codes, material stages,
+  shipping modes, risk levels, check statuses) are interned;
+- the nested records are frozen, so equal ones can be shared. SharedValues
+  maps each material, insight, shipping option and compliance check, and
+  each whole block of them, to one canonical instance. The deterministic
+  trade-intel fallback repeats the same blocks for every analysis on a lane,
+  and those end up stored once.
+
+The nested records serialize (orjson) like the dicts they replace. Materials
+are converted once where they enter (compact_materials): the risk, map and
+recalculation stages read MaterialRecord attributes only.
+"""
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from config import ANALYSIS_STORE_SHARED_ENTRIES
+
+
+def _field(item: Any, name: str, default: Any = None) -> Any:
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def _code(value: Any) -> str:
+    return sys.intern(str(value or ""))
+
+
+@dataclass(frozen=True, slots=True)
+class MaterialRecord:
+    id: str
+    name: str
+    percentage: float
+    origin_country: str
+    stage: str
+
+
+@dataclass(frozen=True, slots=True)
+class InsightRecord:
+    title: str
+    detail: str
+
+
+@dataclass(frozen=True, slots=True)
+class ShippingOptionRecord:
+    mode: str
+    route: str
+    eta_days: int
+    estimated_cost_usd: float
+    risk_level: str
+    notes: str
+
+
+@dataclass(frozen=True, slots=True)
+class ComplianceCheckRecord:
+    item: str
+    status: str
+    note: str
+
+
+class SharedValues:
+    """
+    Bounded LRU of canonical instances of hashable values. share(value)
+    returns the instance stored first among those equal to it, so the hot
+    values (fallback blocks, common materials) stay single copies while rare
+    ones age out of the table, not out of the records holding them.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._values: "OrderedDict[Hashable, Hashable]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def share(self, value: Hashable) -> Hashable:
+        if self.max_entries <= 0:
+            return value
+        with self._lock:
+            canonical = self._values.get(value)
+            if canonical is not None:
+                self._values.move_to_end(value)
+                self.hits += 1
+                return canonical
+            self._values[value] = value
+            if len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+            self.misses += 1
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._values), "hits": self.hits, "misses": self.misses}
+
+
+SHARED_VALUES = SharedValues(ANALYSIS_STORE_SHARED_ENTRIES)
+
+
+@dataclass(slots=True)
+class AnalysisRecord:
+    hs_code: str
+    manufacturing_country: str
+    destination_country: str
+    declared_value: float
+    currency: str
+    declared_value_usd: float
+    as_of: Optional[date]
+    materials: Tuple[MaterialRecord, ...]
+    recent_insights: Tuple[InsightRecord, ...]
+    shipping_options: Tuple[ShippingOptionRecord, ...]
+    compliance_checks: Tuple[ComplianceCheckRecord, ...]
+    # Memoised stage outputs for /recalculate (services/recalculation_service.py).
+    stage_cache: Dict[Tuple, Any] = field(default_factory=dict)
+
+    @classmethod
+    def create(
+        cls,
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        declared_value: float,
+        currency: str,
+        declared_value_usd: float,
+        as_of: Optional[date],
+        materials: Iterable[Any],
+        recent_insights: Iterable[Any],
+        shipping_options: Iterable[Any],
+        compliance_checks: Iterable[Any],
+        stage_cache: Optional[Dict[Tuple, Any]] = None,
+        shared: SharedValues = SHARED_VALUES,
+    ) -> "AnalysisRecord":
+        """Builds a record from the pipeline's dicts (or models), sharing every equal part."""
+        return cls(
+            hs_code=_code(hs_code),
+            manufacturing_country=_code(manufacturing_country),
+            destination_country=_code(destination_country),
+            declared_value=float(declared_value),
+            currency=_code(currency),
+            declared_value_usd=float(declared_value_usd),
+            as_of=as_of,
+            materials=compact_materials(materials, shared),
+            recent_insights=shared.share(tuple(
+                shared.share(InsightRecord(
+                    title=str(_field(item, "title", "")),
+                    detail=str(_field(item, "detail", "")),
+                ))
+                for item in recent_insights
+            )),
+            shipping_options=shared.share(tuple(
+                shared.share(ShippingOptionRecord(
+                    mode=_code(_field(item, "mode")),
+                    route=str(_field(item, "route", "")),
+                    eta_days=int(_field(item, "eta_days", 0) or 0),
+                    estimated_cost_usd=float(_field(item, "estimated_cost_usd", 0) or 0),
+                    risk_level=_code(_field(item, "risk_level")),
+                    notes=str(_field(item, "notes", "")),
+                ))
+                for item in shipping_options
+            )),
+            compliance_checks=shared.share(tuple(
+                shared.share(ComplianceCheckRecord(
+                    item=str(_field(item, "item", "")),
+                    status=_code(_field(item, "status")),
+                    note=str(_field(item, "note", "")),
+                ))
+                for item in compliance_checks
+            )),
+            stage_cache={} if stage_cache is None else stage_cache,
+        )
+
+
+def compact_materials(materials: Iterable[Any], shared: SharedValues = SHARED_VALUES) -> Tuple[MaterialRecord, ...]:
+    """
+    The typed materials the risk, map and tariff stages take, from dicts
+    (LLM output), models (request bodies) or records already converted.
+    """
+    if isinstance(materials, tuple) and all(type(material) is MaterialRecord for material in materials):
+        return shared.share(materials)
+    return shared.share(tuple(
+        shared.share(MaterialRecord(
+            id=str(_field(material, "id", "")),
+            name=str(_field(material, "name", "")),
+            percentage=float(_field(material, "percentage", 0) or 0),
+            origin_country=_code(_field(material, "origin_country")),
+            stage=_code(_field(material, "stage")),
+        ))
+        for material in materials
+    ))
@@ -0,0 +1,222 @@
+"""
+Lazy service container.
+
+Services are built on first use rather than at import time, so importing the
+app (and answering the first cheap request) does not pay for the LLM SDK,
+NumPy or reference-data parsing. Routes receive services through FastAPI
+Depends(get_...) providers; service modules are imported inside the factories.
+"""
+from threading import RLock
+from typing import Any, Callable, Dict
+
+
+class ServiceContainer:
+    def __init__(self):
+        self._instances: Dict[str, Any] = {}
+        self._lock = RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    def override(self, name: str, instance: Any):
+        """Replaces a service, e.g. with a stub in benchmarks."""
+        with self._lock:
+            self._instances[name] = instance
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    @property
+    def tariff_engine(self):
+        def build():
+            from services.tariff_engine import TariffEngine
+            return TariffEngine()
+        return self._get("tariff_engine", build)
+
+    @property
+    def risk_engine(self):
+        def build():
+            from services.risk_engine import RiskEngine
+            return RiskEngine()
+        return self._get("risk_engine", build)
+
+    @property
+    def map_service(self):
+        def build():
+            from services.map_flow_service import MapFlowService
+            return MapFlowService()
+        return self._get("map_service", build)
+
+    @property
+    def ai_service(self):
+        def build():
+            from services.ai_service import AIService
+            return AIService()
+        return self._get("ai_service", build)
+
+    @property
+    def trade_intel_service(self):
+        def build():
+            from services.trade_intel_service import TradeIntelService
+            return TradeIntelService()
+        return self._get("trade_intel_service", build)
+
+    @property
+    def recalculation_service(self):
+        def build():
+            from services.recalculation_service import RecalculationService
+            return RecalculationService(self.tariff_engine, self.risk_engine, self.map_service)
+        return self._get("recalculation_service", build)
+
+    @property
+    def lane_analytics(self):
+        def build():
+            from services.lane_analytics import LaneAnalytics
+            return LaneAnalytics()
+        return self._get("lane_analytics", build)
+
+    @property
+    def admission_controller(self):
+        def build():
+            from core.admission import AdmissionController
+            return AdmissionController()
+        return self._get("admission_controller", build)
+
+    @property
+    def stage_metrics(self):
+        def build():
+            from core.deadline import StageMetrics
+            return StageMetrics()
+        return self._get("stage_metrics", build)
+
+    @property
+    def analysis_history(self):
+        def build():
+            from config import ANALYSIS_HISTORY_DB_PATH
+            from services.analysis_history import AnalysisHistory
+            return AnalysisHistory(ANALYSIS_HISTORY_DB_PATH)
+        return self._get("analysis_history", build)
+
+    @property
+    def analysis_pipeline(self):
+        def build():
+            from services.analysis_pipeline import AnalysisPipeline
+            return AnalysisPipeline(
+                self.ai_service,
+                self.map_service,
+                self.trade_intel_service,
+                self.recalculation_service,
+                self.lane_analytics,
+                self.stage_metrics,
+                self.analysis_history,
+            )
+        return self._get("analysis_pipeline", build)
+
+    @property
+    def sourcing_optimizer(self):
+        def build():
+            from services.sourcing_optimizer import SourcingOptimizer
+            return SourcingOptimizer(self.tariff_engine, self.risk_engine)
+        return self._get("sourcing_optimizer", build)
+
+    @property
+    def job_queue(self):
+        def build():
+            from config import JOB_DEFAULT_DEADLINE_SECONDS, JOB_QUEUE_DB_PATH, JOB_QUEUE_WORKERS, JOB_RESULT_TTL_SECONDS
+            from services.job_queue import JobQueue
+
+            async def run_job(payload, groq_api_key, remaining_seconds):
+                from core.deadline import Deadline
+                from models.product import ProductRequest
+                return await self.analysis_pipeline.run(
+                    ProductRequest.from_job_payload(payload, groq_api_key),
+                    deadline=Deadline(remaining_seconds),
+                )
+
+            # The pipeline (and the LLM clients behind it) is only built when a job runs.
+            return JobQueue(
+                JOB_QUEUE_DB_PATH,
+                runner=run_job,
+                workers=JOB_QUEUE_WORKERS,
+                default_deadline_seconds=JOB_DEFAULT_DEADLINE_SECONDS,
+                result_ttl_seconds=JOB_RESULT_TTL_SECONDS,
+            )
+        return self._get("job_queue", build)
+
+    @property
+    def warmup(self):
+        def build():
+            from services.warmup import WarmupService
+            return WarmupService(
+                self.ai_service,
+                self.trade_intel_service,
+                self.recalculation_service,
+                history=self.analysis_history.recent_results,
+            )
+        return self._get("warmup", build)
+
+
+container = ServiceContainer()
+
+
+def get_tariff_engine():
+    return container.tariff_engine
+
+
+def get_risk_engine():
+    return container.risk_engine
+
+
+def get_map_service():
+    return container.map_service
+
+
+def get_ai_service():
+    return container.ai_service
+
+
+def get_trade_intel_service():
+    return container.trade_intel_service
+
+
+def get_recalculation_service():
+    return container.recalculation_service
+
+
+def get_lane_analytics():
+    return container.lane_analytics
+
+
+def get_admission_controller():
+    return container.admission_controller
+
+
+def get_stage_metrics():
+    return container.stage_metrics
+
+
+def get_analysis_history():
+    return container.analysis_history
+
+
+def get_analysis_pipeline():
+    return container.analysis_pipeline
+
+
+def get_sourcing_optimizer():
+    return container.sourcing_optimizer
+
+
+def get_job_queue():
+    return container.job_queue
+
+
+def get_warmup():
+    return container.warmup
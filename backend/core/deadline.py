@@ -0,0 +1,113 @@
+"""
+Per-request time budgets for /analyze.
+
+A Deadline is created when the request arrives, from the X-Request-Deadline-Ms
+header (the client's remaining budget in milliseconds) or ANALYZE_DEADLINE_SECONDS.
+It is passed through every stage: LLM calls get only the remaining budget as
+their timeout, required stages raise DeadlineExceeded once it is spent, and
+optional stages fall back to deterministic output and note the miss.
+"""
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional
+
+from config import ANALYZE_DEADLINE_MAX_SECONDS, ANALYZE_DEADLINE_SECONDS
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Request deadline exceeded during {stage}.")
+
+
+class Deadline:
+    __slots__ = ("budget_seconds", "expires_at", "misses")
+
+    def __init__(self, seconds: float = ANALYZE_DEADLINE_SECONDS):
+        self.budget_seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.misses: List[str] = []
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """Invalid or non-positive values use the default; large ones are capped."""
+        try:
+            seconds = float(value) / 1000 if value else ANALYZE_DEADLINE_SECONDS
+        except ValueError:
+            seconds = ANALYZE_DEADLINE_SECONDS
+        if not seconds > 0:
+            seconds = ANALYZE_DEADLINE_SECONDS
+        return cls(min(seconds, ANALYZE_DEADLINE_MAX_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, stage: str) -> float:
+        """The remaining budget, to use as a stage timeout. Raises if none is left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(stage)
+        return remaining
+
+    def missed(self, stage: str):
+        if stage not in self.misses:
+            self.misses.append(stage)
+
+
+class StageMetrics:
+    """Per-stage latency and deadline-miss counters for the analyze pipeline."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = Lock()
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._requests = {"total": 0, "deadline_exceeded": 0, "degraded": 0}
+
+    def _stage(self, stage: str) -> Dict[str, int]:
+        counters = self._counters.get(stage)
+        if counters is None:
+            counters = self._counters[stage] = {"runs": 0, "deadline_misses": 0}
+            self._latencies[stage] = deque(maxlen=self._window)
+        return counters
+
+    def observe(self, stage: str, elapsed_seconds: float):
+        with self._lock:
+            self._stage(stage)["runs"] += 1
+            self._latencies[stage].append(elapsed_seconds)
+
+    def finish(self, deadline: Deadline, exceeded: bool):
+        """Records one request's outcome and the stages that missed its deadline."""
+        with self._lock:
+            self._requests["total"] += 1
+            if exceeded:
+                self._requests["deadline_exceeded"] += 1
+            elif deadline.misses:
+                self._requests["degraded"] += 1
+            for stage in deadline.misses:
+                self._stage(stage)["deadline_misses"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        def percentiles(values):
+            if not values:
+                return {"p50": None, "p95": None, "p99": None}
+            ordered = sorted(values)
+            pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+            return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+        with self._lock:
+            return {
+                "requests": dict(self._requests),
+                "default_deadline_seconds": ANALYZE_DEADLINE_SECONDS,
+                "stages": {
+                    stage: {**counters, "latency_ms": percentiles(list(self._latencies[stage]))}
+                    for stage, counters in self._counters.items()
+                },
+            }
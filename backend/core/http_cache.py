@@ -0,0 +1,106 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi import Request, Response
+
+from config import HTTP_CACHE_MAX_AGE, HTTP_CACHE_MAX_ENTRIES
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hex digest of JSON-serializable parts (dict key order ignored)."""
+    payload = orjson.dumps(
+        parts,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU of rendered response bodies keyed by ETag."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+RESPONSE_CACHE = ResponseCache(HTTP_CACHE_MAX_ENTRIES)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate",
+    }
+
+
+def cached_response(
+    request: Request,
+    key: str,
+    build: Callable[[], Response],
+    replayed: Optional[Callable[[bytes], bytes]] = None,
+) -> Response:
+    """
+    Serves a deterministic route result by ETag. `key` must fingerprint every
+    input of the result (including the reference data version). Returns 304 when
+    the client already holds it, the cached body when the server does, and
+    otherwise builds, caches (successful envelopes only) and returns it.
+    `replayed`, when given, maps the built body to the one served on later hits
+    (for fields that describe the computation rather than its result).
+    """
+    etag = f'"{key}"'
+    headers = cache_headers(etag)
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = RESPONSE_CACHE.get(key)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    response = build()
+    if response.status_code != 200 or not response.body.startswith(b'{"success":true'):
+        return response
+
+    RESPONSE_CACHE.put(key, replayed(response.body) if replayed else response.body)
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,390 @@
+"""
+Opt-in per-request profiling (PROFILING_ENABLED). When disabled the middleware
+is not installed at all, so requests pay nothing.
+
+A request is profiled when it sends `X-Profile: sample|trace` together with
+`X-Profile-Token: <PROFILING_TOKEN>`, or when it is picked at
+PROFILING_SAMPLE_RATE (in PROFILING_MODE). Its response carries
+`X-Profile-Id`, and the profile can be fetched from /admin/profiles/{id} as
+collapsed stacks (flamegraph.pl, speedscope) or speedscope JSON.
+
+- sample: a shared thread records the request task's stack every
+  PROFILING_INTERVAL_MS. While the task runs that is the event loop thread's
+  stack; while it is suspended it is the task's await chain, so time spent
+  waiting on the LLM shows up under the await that is waiting. Weights are
+  wall-clock milliseconds. Other requests on the same loop are not counted.
+- trace: a deterministic sys.setprofile hook on the event loop thread that
+  times every Python and C call made in the request's context, in
+  microseconds. Exact, but the loop runs several times slower while it is
+  installed; meant for single requests. Only time on the loop is counted, not
+  time suspended waiting on the LLM or on threads.
+"""
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config import (
+    PROFILING_INTERVAL_MS,
+    PROFILING_MAX_PROFILES,
+    PROFILING_MODE,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_TOKEN,
+)
+
+PROFILE_HEADER = "x-profile"
+TOKEN_HEADER = "x-profile-token"
+PROFILE_ID_HEADER = "x-profile-id"
+PROFILING_MODES = ("sample", "trace")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_ACTIVE: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+_LABELS: Dict[Any, str] = {}
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and hmac.compare_digest(str(candidate or ""), PROFILING_TOKEN)
+
+
+def _label(code) -> str:
+    label = _LABELS.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_ROOT):
+            filename = filename[len(_ROOT):]
+        else:
+            # site-packages/<pkg>/... -> <pkg>/...
+            parts = filename.replace(os.sep, "/").rsplit("-packages/", 1)
+            filename = parts[-1]
+        label = _LABELS[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+    return label
+
+
+def _c_label(function) -> str:
+    module = getattr(function, "__module__", None) or type(getattr(function, "__self__", None)).__name__
+    return f"{module}.{getattr(function, '__qualname__', repr(function))} (native)"
+
+
+# ----------------------------------------------------------------------
+# Stack sampling
+# ----------------------------------------------------------------------
+def _awaited(awaitable):
+    for frame_attr, next_attr in (("cr_frame", "cr_await"), ("gi_frame", "gi_yieldfrom"), ("ag_frame", "ag_await")):
+        if hasattr(awaitable, frame_attr):
+            return getattr(awaitable, frame_attr), getattr(awaitable, next_attr)
+    return None, None
+
+
+def task_stack(task: asyncio.Task, thread_frame) -> List[str]:
+    """Root-first labels for where `task` is: running on the loop thread, or awaiting."""
+    labels: List[str] = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        if isinstance(awaitable, asyncio.Task):
+            awaitable = awaitable.get_coro()
+            continue
+        frame, awaiting = _awaited(awaitable)
+        if frame is None:
+            # A bare future: an executor thread, a sleep or I/O.
+            labels.append(f"[await {type(awaitable).__name__}]")
+            break
+        if getattr(awaitable, "cr_running", False) or getattr(awaitable, "gi_running", False):
+            # Running right now: the thread's stack from this frame down is exact.
+            running = []
+            current = thread_frame
+            while current is not None and current is not frame:
+                running.append(_label(current.f_code))
+                current = current.f_back
+            if current is frame:
+                labels.append(_label(frame.f_code))
+                labels.extend(reversed(running))
+                return labels
+        labels.append(_label(frame.f_code))
+        awaitable = awaiting
+    return labels
+
+
+class _Sampler:
+    """One daemon thread sampling every active sample-mode profile."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self._profiles: Dict["RequestProfile", None] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: "RequestProfile"):
+        with self._lock:
+            self._profiles[profile] = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, profile: "RequestProfile"):
+        with self._lock:
+            self._profiles.pop(profile, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+            if not profiles:
+                self._wake.clear()
+                if not self._wake.wait(timeout=5.0):
+                    with self._lock:
+                        if not self._profiles:
+                            self._thread = None
+                            return
+                continue
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for profile in profiles:
+                profile.sample(frames.get(profile.thread_id), now)
+            time.sleep(self.interval)
+
+
+# ----------------------------------------------------------------------
+# Deterministic tracing
+# ----------------------------------------------------------------------
+class _Tracer:
+    """Per-profile call stack of [label, started, child time] driven by _trace_hook."""
+
+    __slots__ = ("stack", "profile")
+
+    def __init__(self, profile: "RequestProfile"):
+        self.profile = profile
+        self.stack: List[list] = []
+
+    def enter(self, label: str, now: float):
+        self.stack.append([label, now, 0.0])
+
+    def leave(self, now: float):
+        if not self.stack:
+            return  # returning from frames entered before tracing started
+        label, started, child = self.stack.pop()
+        elapsed = now - started
+        self_time = int((elapsed - child) * 1_000_000)
+        if self_time > 0:
+            path = ";".join(entry[0] for entry in self.stack)
+            self.profile.stacks[f"{path};{label}" if path else label] += self_time
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+
+def _trace_hook(frame, event, arg):
+    profile = _ACTIVE.get()
+    if profile is None or profile.tracer is None:
+        return
+    now = time.perf_counter()
+    if event == "call":
+        profile.tracer.enter(_label(frame.f_code), now)
+    elif event == "c_call":
+        profile.tracer.enter(_c_label(arg), now)
+    else:  # return, c_return, c_exception
+        profile.tracer.leave(now)
+
+
+class _TraceInstaller:
+    """Keeps the hook installed on the loop thread while any trace profile is active."""
+
+    def __init__(self):
+        self.active = 0
+
+    def acquire(self) -> bool:
+        current = sys.getprofile()
+        if current is not None and current is not _trace_hook:
+            return False  # another profiler (or coverage) owns the hook
+        self.active += 1
+        sys.setprofile(_trace_hook)
+        return True
+
+    def release(self):
+        self.active -= 1
+        if self.active <= 0:
+            self.active = 0
+            sys.setprofile(None)
+
+
+# ----------------------------------------------------------------------
+# Profiles
+# ----------------------------------------------------------------------
+class RequestProfile:
+    def __init__(self, mode: str, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.created_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.task: Optional[asyncio.Task] = None
+        self.thread_id: Optional[int] = None
+        self.tracer: Optional[_Tracer] = None
+        self._last_sample: Optional[float] = None
+        self._started: Optional[float] = None
+
+    @property
+    def unit(self) -> str:
+        return "milliseconds" if self.mode == "sample" else "microseconds"
+
+    def sample(self, thread_frame, now: float):
+        task = self.task
+        if task is None or task.done():
+            return
+        weight = now - (self._last_sample or self._started)
+        self._last_sample = now
+        stack = task_stack(task, thread_frame)
+        if stack:
+            self.stacks[";".join(stack)] += weight * 1000
+            self.samples += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "created_at": self.created_at,
+            "duration_ms": self.duration_ms,
+            "samples": self.samples if self.mode == "sample" else None,
+            "unit": self.unit,
+            "stacks": len(self.stacks),
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: `frame;frame;frame weight` per line."""
+        return "".join(
+            f"{stack} {max(1, round(weight))}\n"
+            for stack, weight in sorted(self.stacks.items(), key=lambda item: -item[1])
+        )
+
+    def speedscope(self) -> Dict[str, Any]:
+        frames: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, weight in self.stacks.items():
+            samples.append([frames.setdefault(name, len(frames)) for name in stack.split(";")])
+            weights.append(round(weight, 3))
+        total = round(sum(weights), 3)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path} ({self.id})",
+            "exporter": "trade-intelligence-backend",
+            "shared": {"frames": [{"name": name} for name in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.mode} {self.method} {self.path}",
+                "unit": self.unit,
+                "startValue": 0,
+                "endValue": total,
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfileStore:
+    """Bounded store of finished profiles, oldest evicted first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [profile.summary() for profile in reversed(profiles)]
+
+
+PROFILE_STORE = ProfileStore(PROFILING_MAX_PROFILES)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware; installed by main.py only when PROFILING_ENABLED is set."""
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore = PROFILE_STORE,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        default_mode: str = PROFILING_MODE,
+        interval_ms: float = PROFILING_INTERVAL_MS,
+    ):
+        if default_mode not in PROFILING_MODES:
+            raise ValueError(f"Unknown PROFILING_MODE '{default_mode}'. Use one of: {', '.join(PROFILING_MODES)}")
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.default_mode = default_mode
+        self._sampler = _Sampler(max(0.001, interval_ms / 1000))
+        self._tracing = _TraceInstaller()
+        self._rng = random.Random()
+
+    def _requested_mode(self, scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or ())
+        requested = headers.get(PROFILE_HEADER.encode())
+        if requested is not None and token_matches(headers.get(TOKEN_HEADER.encode(), b"").decode("latin-1")):
+            requested = requested.decode("latin-1").strip().lower()
+            return requested if requested in PROFILING_MODES else self.default_mode
+        if self.sample_rate > 0 and self._rng.random() < self.sample_rate:
+            return self.default_mode
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/"):
+            return await self.app(scope, receive, send)
+        mode = self._requested_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(mode, scope["method"], scope["path"])
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.encode(), profile.id.encode())]}
+            await send(message)
+
+        context_token = _ACTIVE.set(profile)
+        profile._started = time.perf_counter()
+        tracing = False
+        if mode == "trace":
+            profile.tracer = _Tracer(profile)
+            tracing = self._tracing.acquire()
+        else:
+            profile.task = asyncio.current_task()
+            profile.thread_id = threading.get_ident()
+            self._sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if tracing:
+                self._tracing.release()
+            self._sampler.remove(profile)
+            profile.task = None
+            profile.tracer = None
+            _ACTIVE.reset(context_token)
+            profile.duration_ms = round((time.perf_counter() - profile._started) * 1000, 3)
+            self.store.put(profile)
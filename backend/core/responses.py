@@ -0,0 +1,48 @@
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson. Routes return it directly (via
+    success_response / error_response) so FastAPI skips the jsonable_encoder
+    pass over the envelope; models nested in the payload are dumped once here.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def success_response(data: Optional[Any], status_code: int = 200, headers: Optional[dict] = None) -> FastJSONResponse:
+    return FastJSONResponse(
+        {"success": True, "data": data, "error": None},
+        status_code=status_code,
+        headers=headers,
+    )
+
+
+def error_response(code: str, message: str, status_code: int = 200, headers: Optional[dict] = None) -> FastJSONResponse:
+    return FastJSONResponse(
+        {"success": False, "data": None, "error": {"code": code, "message": message}},
+        status_code=status_code,
+        headers=headers,
+    )
@@ -2,5 +2,8 @@ ANALYSIS_STORE = {}
 
 TARIFFS = {}
 TRADE_AGREEMENTS = {}
+TRADE_BLOCS = {}
 COUNTRY_COORDINATES = {}
 COUNTRY_RISK = {}
+FX_RATES = {}
+DATA_VERSION = ""
@@ -0,0 +1,124 @@
+"""
+Binary image uploads for /analyze.
+
+Images are streamed into a SpooledTemporaryFile (in memory up to a threshold,
+then on disk) with a hard size limit, identified by their magic bytes, and only
+base64-encoded once, when the vision request is built.
+"""
+import base64
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, BinaryIO, Optional
+
+from config import IMAGE_SPOOL_MAX_MEMORY_BYTES, MAX_IMAGE_UPLOAD_BYTES
+
+# Multiple of 3 so chunks encode without padding and can be concatenated.
+_ENCODE_CHUNK_BYTES = 3 * 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+def sniff_image_mime_type(header: bytes) -> Optional[str]:
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ImageUpload:
+    """An uploaded image held in a spooled file. Close it when the request is done."""
+
+    def __init__(self, file: BinaryIO, size: int, mime_type: str):
+        self.file = file
+        self.size = size
+        self.mime_type = mime_type
+
+    @classmethod
+    def from_file(cls, file: BinaryIO, max_bytes: int = MAX_IMAGE_UPLOAD_BYTES) -> "ImageUpload":
+        """Wraps an already-spooled file, e.g. a multipart UploadFile's .file."""
+        size = file.seek(0, 2)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Image exceeds the {max_bytes} byte upload limit.")
+        if size == 0:
+            raise InvalidImageError("Image upload is empty.")
+        file.seek(0)
+        mime_type = sniff_image_mime_type(file.read(12))
+        if mime_type is None:
+            raise InvalidImageError("Unsupported image format. Use JPEG, PNG, WEBP or GIF.")
+        file.seek(0)
+        return cls(file, size, mime_type)
+
+    def data_url(self) -> str:
+        """Encodes the image as a base64 data URL, reading the spool in chunks."""
+        self.file.seek(0)
+        parts = [f"data:{self.mime_type};base64,"]
+        while True:
+            chunk = self.file.read(_ENCODE_CHUNK_BYTES)
+            if not chunk:
+                break
+            parts.append(base64.b64encode(chunk).decode("ascii"))
+        return "".join(parts)
+
+    def close(self):
+        self.file.close()
+
+
+def limit_receive(receive, max_bytes: int):
+    """
+    Wraps an ASGI receive callable so reading more than max_bytes of request
+    body raises UploadTooLargeError, whether or not Content-Length was sent.
+    """
+    size = 0
+
+    async def limited():
+        nonlocal size
+        message = await receive()
+        if message["type"] == "http.request":
+            size += len(message.get("body", b""))
+            if size > max_bytes:
+                raise UploadTooLargeError(f"Request body exceeds the {max_bytes} byte limit.")
+        return message
+
+    return limited
+
+
+async def read_body_stream(chunks: AsyncIterator[bytes], max_bytes: int) -> bytes:
+    """Reads a whole request body into memory, stopping as soon as it passes max_bytes."""
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Request body exceeds the {max_bytes} byte limit.")
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+async def spool_image_stream(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int = MAX_IMAGE_UPLOAD_BYTES,
+    max_memory_bytes: int = IMAGE_SPOOL_MAX_MEMORY_BYTES,
+) -> ImageUpload:
+    """Copies a request body stream into a spooled file, stopping at max_bytes."""
+    spool = SpooledTemporaryFile(max_size=max_memory_bytes)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"Image exceeds the {max_bytes} byte upload limit.")
+            spool.write(chunk)
+        return ImageUpload.from_file(spool, max_bytes=max_bytes)
+    except Exception:
+        spool.close()
+        raise
@@ -4,20 +4,33 @@ import sys
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 BASE_DIR = Path(__file__).resolve().parent
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
+from config import GZIP_MINIMUM_SIZE, PROFILING_ENABLED
 from core import state
+from core.admission import AdmissionMiddleware
+from core.container import container, get_admission_controller
+from core.http_cache import RESPONSE_CACHE, fingerprint
+from core.responses import FastJSONResponse, error_response, success_response
 from routes.analyze import router as analyze_router
 from routes.recalculate import router as recalc_router
 from routes.report import router as report_router
+from routes.optimize import router as optimize_router
+from routes.analytics import router as analytics_router
+from routes.analyses import router as analyses_router
+from routes.admin import router as admin_router
+from services.map_flow_service import MapFlowService
+from services.tariff_engine import TariffEngine
 
 
 app = FastAPI(
     title="AI Global Trade Intelligence Backend",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 
@@ -28,11 +41,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+if PROFILING_ENABLED:
+    from core.profiling import ProfilingMiddleware
+
+    # Inside admission control, so profiles cover the request but not its queueing.
+    app.add_middleware(ProfilingMiddleware)
+# Outermost, so shed requests cost neither body parsing nor compression.
+app.add_middleware(AdmissionMiddleware, controller_factory=get_admission_controller)
 
 
 app.include_router(analyze_router)
 app.include_router(recalc_router)
 app.include_router(report_router)
+app.include_router(optimize_router)
+app.include_router(analytics_router)
+app.include_router(analyses_router)
+app.include_router(admin_router)
 
 DATA_DIR = BASE_DIR / "data"
 
@@ -46,24 +71,84 @@ def load_json_file(filename):
 async def startup_event():
     state.TARIFFS.clear()
     state.TRADE_AGREEMENTS.clear()
+    state.TRADE_BLOCS.clear()
     state.COUNTRY_RISK.clear()
+    state.COUNTRY_COORDINATES.clear()
+    state.FX_RATES.clear()
 
     state.TARIFFS.update(load_json_file("tariffs.json"))
     state.TRADE_AGREEMENTS.update(load_json_file("trade_agreements.json"))
+    state.TRADE_BLOCS.update(load_json_file("trade_blocs.json"))
     state.COUNTRY_RISK.update(load_json_file("country_risk.json"))
+    state.COUNTRY_COORDINATES.update(load_json_file("countries.json"))
+    state.FX_RATES.update(load_json_file("fx_rates.json"))
+
+    # Cached responses embed reference data, so their ETags include its version.
+    state.DATA_VERSION = fingerprint(
+        state.TARIFFS,
+        state.TRADE_AGREEMENTS,
+        state.TRADE_BLOCS,
+        state.COUNTRY_RISK,
+        state.COUNTRY_COORDINATES,
+        state.FX_RATES,
+    )[:16]
+    RESPONSE_CACHE.clear()
+
+    # Lanes between countries we hold trade data for are the ones analyses hit.
+    lane_countries = set(state.COUNTRY_RISK)
+    for pair in state.TRADE_AGREEMENTS:
+        lane_countries.update(pair.split("-"))
+    lanes = MapFlowService.precompute_lanes(lane_countries)
+    tariff_index = TariffEngine.index()
 
     print("[OK] Static data loaded successfully")
-    print(f"[DATA] Tariffs: {len(state.TARIFFS)} entries")
+    print(f"[DATA] Tariffs: {len(state.TARIFFS)} entries, {tariff_index.version_count} rate versions indexed")
+    print(f"[DATA] Trade preferences: {len(state.TRADE_AGREEMENTS)} lanes, {len(state.TRADE_BLOCS)} blocs, {len(tariff_index.countries)} countries")
     print(f"[DATA] Country Risks: {len(state.COUNTRY_RISK)} entries")
+    print(f"[DATA] Countries: {len(state.COUNTRY_COORDINATES)} entries, {lanes} lanes precomputed")
+    print(f"[DATA] Exchange rates: {len(state.FX_RATES)} currencies besides USD")
+    print(f"[DATA] Reference data version: {state.DATA_VERSION}")
+
+    await container.job_queue.start()
+    # Runs in the background; /ready reports when enough of it is done.
+    container.warmup.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await container.warmup.stop()
+    await container.job_queue.stop()
 
 
 @app.get("/")
 def root():
-    return {
-        "success": True,
-        "data": {
-            "message": "AI Global Trade Intelligence Backend Running",
-            "version": "1.0.0"
-        },
-        "error": None
-    }
+    return success_response({
+        "message": "AI Global Trade Intelligence Backend Running",
+        "version": "1.0.0"
+    })
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the startup warmup has reached its threshold."""
+    warmup = container.warmup
+    status = warmup.status()
+    if status["ready"]:
+        return success_response(status)
+    return error_response(
+        "WARMING_UP",
+        f"Warming caches: {status['warm_fraction']:.0%} of top products and lanes done.",
+        status_code=503,
+        headers={"Retry-After": "5"},
+    )
+
+
+@app.get("/admission/metrics")
+def admission_metrics():
+    return success_response(container.admission_controller.metrics())
+
+
+@app.get("/llm/metrics")
+def llm_metrics():
+    from services.llm_router import endpoint_metrics
+    return success_response({"endpoints": endpoint_metrics()})
@@ -1,18 +1,36 @@
-from typing import List, Optional
+from datetime import date
+from typing import Annotated, List, Optional
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    StringConstraints,
+    TypeAdapter,
+    ValidationInfo,
+    field_validator,
+    model_validator,
+)
 
+from config import ANALYSIS_BATCH_MAX_ITEMS
 from models.response_models import Material
 
+# Code fields are normalised and checked by pydantic-core itself, without a
+# Python validator call per field.
+CountryCode = Annotated[str, StringConstraints(strip_whitespace=True, to_upper=True, min_length=2, max_length=2)]
+CurrencyCode = Annotated[str, StringConstraints(strip_whitespace=True, to_upper=True, pattern=r"^\s*[A-Za-z]{3}\s*$")]
+
 
 class ProductRequest(BaseModel):
     product_name: str = Field(..., min_length=2)
     description: Optional[str] = None
     image_base64: Optional[str] = None
     image_mime_type: Optional[str] = None
-    manufacturing_country: str = Field(..., min_length=2, max_length=2)
-    destination_country: str = Field(..., min_length=2, max_length=2)
+    manufacturing_country: CountryCode
+    destination_country: CountryCode
     declared_value: float = Field(..., gt=0)
+    # ISO 4217 code of declared_value; rates come from data/fx_rates.json.
+    currency: CurrencyCode = "USD"
+    as_of: Optional[date] = None
     groq_api_key: Optional[str] = None
 
     @field_validator("description", mode="before")
@@ -21,6 +39,8 @@ class ProductRequest(BaseModel):
         if value is None:
             return None
         normalized = str(value).strip()
+        if normalized and len(normalized) < 5:
+            raise ValueError("Description must be at least 5 characters long")
         return normalized or None
 
     @field_validator("image_mime_type", mode="before")
@@ -39,33 +59,51 @@ class ProductRequest(BaseModel):
         normalized = str(value).strip()
         return normalized or None
 
-    @field_validator("description")
-    @classmethod
-    def validate_description_length(cls, value):
-        if value is None:
-            return value
-        if len(value) < 5:
-            raise ValueError("Description must be at least 5 characters long")
-        return value
-
-    @field_validator("manufacturing_country", "destination_country")
-    @classmethod
-    def validate_country_code(cls, value):
-        code = str(value).strip().upper()
-        if len(code) != 2:
-            raise ValueError("Country must be ISO2 format")
-        return code
-
     @model_validator(mode="after")
-    def validate_description_or_image(self):
-        if not self.description and not self.image_base64:
+    def validate_description_or_image(self, info: ValidationInfo):
+        # Binary uploads carry the image outside the model; see routes/analyze.py.
+        has_upload = bool(info.context and info.context.get("image_upload"))
+        if not self.description and not self.image_base64 and not has_upload:
             raise ValueError("Either description or image_base64 is required")
         return self
 
+    @classmethod
+    def from_job_payload(cls, payload: dict, groq_api_key: Optional[str] = None) -> "ProductRequest":
+        """
+        Rebuilds a request that was validated when its job was submitted
+        (services/job_queue.py stores model_dump() as JSON) without validating it again.
+        """
+        as_of = payload.get("as_of")
+        return cls.model_construct(**{
+            **payload,
+            "as_of": date.fromisoformat(as_of) if isinstance(as_of, str) else as_of,
+            "groq_api_key": groq_api_key,
+        })
+
 
 class RecalculateRequest(BaseModel):
     analysis_id: str
-    destination_country: Optional[str] = None
+    destination_country: Optional[CountryCode] = None
     declared_value: Optional[float] = None
+    currency: Optional[CurrencyCode] = None
     hs_code: Optional[str] = None
     materials: Optional[List[Material]] = None
+    as_of: Optional[date] = None
+
+
+class OptimizeSourcingRequest(BaseModel):
+    analysis_id: str
+    candidate_countries: Optional[List[CountryCode]] = None
+    time_budget_ms: Optional[int] = Field(None, gt=0, le=30000)
+
+    @field_validator("candidate_countries")
+    @classmethod
+    def validate_candidate_countries(cls, value):
+        return value or None
+
+
+# Bulk submissions are validated as one list straight from the request body
+# bytes (validate_json), in a single pass through pydantic-core.
+PRODUCT_REQUEST_BATCH = TypeAdapter(
+    Annotated[List[ProductRequest], Field(min_length=1, max_length=ANALYSIS_BATCH_MAX_ITEMS)]
+)
@@ -24,6 +24,11 @@ class TariffResponse(BaseModel):
     trade_agreement_discount: float
     total_duty_percent: float
     estimated_duty_amount: float
+    currency: str = "USD"
+    fx_rate: float = 1.0
+    fx_effective_from: Optional[str] = None
+    declared_value_usd: Optional[float] = None
+    estimated_duty_amount_in_currency: Optional[float] = None
     explanation: str
 
 
@@ -56,6 +61,7 @@ class AnalyzeResponseData(BaseModel):
     tariff_summary: TariffResponse
     risk_score: float
     map_flow: Dict
+    map_lanes: Optional[Dict] = None
     recent_insights: List[InsightItem]
     shipping_options: List[ShippingOption]
     compliance_checks: List[ComplianceCheck]
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import PlainTextResponse
+
+from config import PROFILING_ENABLED, PROFILING_TOKEN
+from core.profiling import PROFILE_STORE, token_matches
+from core.responses import FastJSONResponse, error_response, success_response
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def _forbidden(token: Optional[str]):
+    if not PROFILING_TOKEN:
+        return error_response("FORBIDDEN", "Set PROFILING_TOKEN to use the admin endpoints.", status_code=403)
+    if not token_matches(token):
+        return error_response("FORBIDDEN", "Missing or invalid X-Profile-Token.", status_code=403)
+    return None
+
+
+@router.get("/profiles")
+async def list_profiles(token: Optional[str] = Header(None, alias="X-Profile-Token")):
+    denied = _forbidden(token)
+    if denied is not None:
+        return denied
+    return success_response({"enabled": PROFILING_ENABLED, "profiles": PROFILE_STORE.list()})
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed|summary)$"),
+    token: Optional[str] = Header(None, alias="X-Profile-Token"),
+):
+    """
+    speedscope: JSON to open at https://www.speedscope.app.
+    collapsed:  one `frame;frame;frame weight` line per stack, for flamegraph.pl.
+    summary:    the profile's metadata in the usual envelope.
+    """
+    denied = _forbidden(token)
+    if denied is not None:
+        return denied
+
+    profile = PROFILE_STORE.get(profile_id)
+    if profile is None:
+        return error_response("NOT_FOUND", "Profile ID not found.", status_code=404)
+
+    if format == "summary":
+        return success_response(profile.summary())
+    disposition = {"Content-Disposition": f'attachment; filename="profile-{profile.id}.{format}"'}
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed(), headers=disposition)
+    return FastJSONResponse(profile.speedscope(), headers=disposition)
@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from core.container import get_analysis_history
+from core.responses import error_response, success_response
+from services.analysis_export import COLUMNAR_FORMATS, FORMATS, columnar_available, export_chunks
+
+router = APIRouter(prefix="/analyses", tags=["Analyses"])
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+# The history handlers are sync so FastAPI runs them in the threadpool: their
+# SQLite queries wait on the history lock, which export batches also take.
+@router.get("/search")
+def search_analyses(
+    hs_code: Optional[str] = Query(None, min_length=4, max_length=12),
+    hs_chapter: Optional[str] = Query(None, pattern=r"^\d{2}$"),
+    manufacturing_country: Optional[str] = Query(None, min_length=2, max_length=2),
+    destination_country: Optional[str] = Query(None, min_length=2, max_length=2),
+    material_origin: Optional[str] = Query(None, description="Comma-separated; every country must appear."),
+    material: Optional[str] = Query(None, max_length=200, description="Every word must appear in a material name."),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=64),
+    analysis_history=Depends(get_analysis_history),
+):
+    """
+    Newest-first analyses matching every given filter. `hs_code` is a 4-digit
+    heading (6109) or a 6-digit subheading (6109.10). Pass `next_cursor` back
+    as `cursor` for the next page; it is null on the last page.
+    """
+    origins = [country.strip().upper() for country in (material_origin or "").split(",") if country.strip()]
+    if any(len(country) != 2 for country in origins):
+        return error_response("INVALID_REQUEST", "material_origin must be two-letter country codes.")
+
+    try:
+        terms = analysis_history.query_terms(
+            hs_code=hs_code,
+            hs_chapter=hs_chapter,
+            manufacturing_country=manufacturing_country.upper() if manufacturing_country else None,
+            destination_country=destination_country.upper() if destination_country else None,
+            material_origins=origins,
+            material=material,
+        )
+        analyses, next_cursor = analysis_history.search(terms, limit=limit, cursor=cursor)
+    except ValueError as e:
+        # A malformed hs_code, or an InvalidCursorError.
+        return error_response("INVALID_REQUEST", str(e))
+
+    return success_response({"analyses": analyses, "next_cursor": next_cursor, "limit": limit})
+
+
+@router.get("/export")
+async def export_analyses(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet|arrow)$"),
+    rows: str = Query("analyses", pattern="^(analyses|materials|shipping_options)$"),
+    since: Optional[datetime] = Query(None, description="Inclusive; naive times are UTC."),
+    until: Optional[datetime] = Query(None, description="Exclusive; naive times are UTC."),
+    hs_chapter: Optional[str] = Query(None, pattern=r"^\d{2}$"),
+    manufacturing_country: Optional[str] = Query(None, min_length=2, max_length=2),
+    destination_country: Optional[str] = Query(None, min_length=2, max_length=2),
+    analysis_history=Depends(get_analysis_history),
+):
+    """
+    Streams every matching analysis, oldest first, as one flat table with a
+    row per analysis, material or shipping option (`rows`). parquet and arrow
+    (an Arrow IPC stream) need pyarrow installed.
+    """
+    if format in COLUMNAR_FORMATS and not columnar_available():
+        return error_response("UNSUPPORTED_FORMAT", f"Install pyarrow to export {format}; csv and ndjson are always available.")
+
+    terms = analysis_history.query_terms(
+        hs_chapter=hs_chapter,
+        manufacturing_country=manufacturing_country.upper() if manufacturing_country else None,
+        destination_country=destination_country.upper() if destination_country else None,
+    )
+    media_type, extension = FORMATS[format]
+    # A sync iterator: Starlette pulls each chunk in the threadpool.
+    chunks = export_chunks(
+        analysis_history, format, rows, terms, since=_timestamp(since), until=_timestamp(until)
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="analyses-{rows}.{extension}"'},
+    )
+
+
+@router.get("/{analysis_id}")
+def get_analysis(analysis_id: str, analysis_history=Depends(get_analysis_history)):
+    analysis = analysis_history.get(analysis_id)
+
+    if analysis is None:
+        return error_response("NOT_FOUND", "Analysis ID not found.")
+
+    return success_response(analysis)
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from config import LANE_ANALYTICS_BUCKET_SECONDS, LANE_ANALYTICS_BUCKETS
+from core.container import get_lane_analytics
+from core.responses import error_response, success_response
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/lanes")
+async def lane_analytics_summary(
+    manufacturing_country: Optional[str] = Query(None, min_length=2, max_length=2),
+    destination_country: Optional[str] = Query(None, min_length=2, max_length=2),
+    hs_chapter: Optional[str] = Query(None, min_length=2, max_length=2),
+    window_seconds: Optional[int] = Query(None, gt=0),
+    limit: int = Query(100, ge=1, le=1000),
+    lane_analytics=Depends(get_lane_analytics),
+):
+    retention_seconds = LANE_ANALYTICS_BUCKET_SECONDS * LANE_ANALYTICS_BUCKETS
+    if window_seconds and window_seconds > retention_seconds:
+        return error_response(
+            "INVALID_REQUEST",
+            f"window_seconds cannot exceed the {retention_seconds} second retention.",
+        )
+
+    lanes = lane_analytics.lanes(
+        manufacturing_country=manufacturing_country.upper() if manufacturing_country else None,
+        destination_country=destination_country.upper() if destination_country else None,
+        hs_chapter=hs_chapter,
+        window_seconds=window_seconds,
+        limit=limit,
+    )
+
+    return success_response({
+        "lanes": lanes,
+        "bucket_seconds": LANE_ANALYTICS_BUCKET_SECONDS,
+        "retention_seconds": retention_seconds,
+    })
@@ -1,109 +1,264 @@
-from fastapi import APIRouter
-import uuid
+from datetime import date
+from typing import Any, Dict, Optional
 
-from models.product import ProductRequest
-from services.ai_service import AIService
-from services.tariff_engine import TariffEngine
-from services.risk_engine import RiskEngine
-from services.map_flow_service import MapFlowService
-from services.trade_intel_service import TradeIntelService
-from core import state
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from config import ANALYSIS_BATCH_MAX_BYTES, MAX_IMAGE_UPLOAD_BYTES
+from models.product import PRODUCT_REQUEST_BATCH, ProductRequest
+from core.container import get_analysis_pipeline, get_job_queue, get_stage_metrics
+from core.deadline import DEADLINE_HEADER, Deadline, DeadlineExceeded
+from core.responses import error_response, success_response
+from core.uploads import (
+    ImageUpload,
+    InvalidImageError,
+    UploadTooLargeError,
+    limit_receive,
+    read_body_stream,
+    spool_image_stream,
+)
+from services.currency_converter import FxRateError
 
 
 router = APIRouter(prefix="/analyze", tags=["Analyze"])
 
-ai_service = AIService()
-tariff_engine = TariffEngine()
-risk_engine = RiskEngine()
-map_service = MapFlowService()
-trade_intel_service = TradeIntelService()
+# Room for the form fields and part headers around the image in a multipart body.
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _deadline_exceeded_response(e: DeadlineExceeded):
+    return error_response("DEADLINE_EXCEEDED", str(e), status_code=504)
 
 
 @router.post("/")
-async def analyze_product(request: ProductRequest):
+async def analyze_product(
+    request: ProductRequest,
+    deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
+    pipeline=Depends(get_analysis_pipeline),
+):
+    deadline = Deadline.from_header(deadline_ms)
 
     try:
-        ai_result = await ai_service.classify_product(
-            product_name=request.product_name,
-            description=request.description,
-            image_base64=request.image_base64,
-            image_mime_type=request.image_mime_type,
-            groq_api_key=request.groq_api_key,
-        )
+        return success_response(await pipeline.run(request, deadline=deadline))
 
-        tariff_result = tariff_engine.calculate_tariff(
-            hs_code=ai_result["hs_code"],
-            manufacturing_country=request.manufacturing_country,
-            destination_country=request.destination_country,
-            declared_value=request.declared_value,
-        )
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
 
-        risk_score = risk_engine.calculate_risk(
-            manufacturing_country=request.manufacturing_country,
-            destination_country=request.destination_country,
-            total_duty_percent=tariff_result.total_duty_percent,
-            materials=ai_result["materials"],
-        )
+    except FxRateError as e:
+        return error_response("INVALID_REQUEST", str(e))
 
-        map_flow = map_service.generate_map_flow(
-            hs_code=ai_result["hs_code"],
-            manufacturing_country=request.manufacturing_country,
-            destination_country=request.destination_country,
-            materials=ai_result["materials"],
-        )
-        map_service.save_globe_file(map_flow)
-
-        tariff_summary = tariff_result.dict()
-        trade_intel = await trade_intel_service.generate(
-            product_name=request.product_name,
-            hs_code=ai_result["hs_code"],
-            manufacturing_country=request.manufacturing_country,
-            destination_country=request.destination_country,
-            declared_value=request.declared_value,
-            tariff_summary=tariff_summary,
-            risk_score=risk_score,
-            ai_explanation=ai_result.get("explanation", ""),
-            groq_api_key=request.groq_api_key,
-        )
+    except Exception as e:
+        return error_response("INTERNAL_SERVER_ERROR", str(e))
 
-        analysis_id = str(uuid.uuid4())
-
-        state.ANALYSIS_STORE[analysis_id] = {
-            "hs_code": ai_result["hs_code"],
-            "materials": ai_result["materials"],
-            "manufacturing_country": request.manufacturing_country,
-            "destination_country": request.destination_country,
-            "declared_value": request.declared_value,
-            "recent_insights": trade_intel["recent_insights"],
-            "shipping_options": trade_intel["shipping_options"],
-            "compliance_checks": trade_intel["compliance_checks"],
-        }
 
-        return {
-            "success": True,
-            "data": {
-                "analysis_id": analysis_id,
-                "hs_code": ai_result["hs_code"],
-                "confidence": ai_result["confidence"],
-                "explanation": ai_result["explanation"],
-                "resolved_description": ai_result.get("resolved_description"),
-                "manufacturing_country": request.manufacturing_country,
-                "destination_country": request.destination_country,
-                "declared_value": request.declared_value,
-                "materials": ai_result["materials"],
-                "tariff_summary": tariff_summary,
-                "risk_score": risk_score,
-                "map_flow": map_flow,
-                "recent_insights": trade_intel["recent_insights"],
-                "shipping_options": trade_intel["shipping_options"],
-                "compliance_checks": trade_intel["compliance_checks"],
-            },
-            "error": None,
-        }
+def _content_length(http_request: Request) -> Optional[int]:
+    try:
+        return int(http_request.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _too_large_response():
+    return error_response(
+        "PAYLOAD_TOO_LARGE",
+        f"Image exceeds the {MAX_IMAGE_UPLOAD_BYTES} byte upload limit.",
+        status_code=413,
+    )
+
+
+async def _analyze_with_upload(pipeline, fields: Dict[str, Any], image: Optional[ImageUpload], deadline: Deadline):
+    try:
+        request = ProductRequest.model_validate(fields, context={"image_upload": image is not None})
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+    try:
+        return success_response(await pipeline.run(request, image=image, deadline=deadline))
+
+    except DeadlineExceeded as e:
+        return _deadline_exceeded_response(e)
+
+    except FxRateError as e:
+        return error_response("INVALID_REQUEST", str(e))
 
     except Exception as e:
-        return {
-            "success": False,
-            "data": None,
-            "error": {"code": "INTERNAL_SERVER_ERROR", "message": str(e)},
+        return error_response("INTERNAL_SERVER_ERROR", str(e))
+
+
+@router.post("/upload")
+async def analyze_product_upload(
+    http_request: Request,
+    deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
+    pipeline=Depends(get_analysis_pipeline),
+):
+    """
+    multipart/form-data variant of /analyze: the ProductRequest fields as form
+    fields plus an optional `image` file part, sent as raw bytes.
+    """
+    # The budget starts before the body is read.
+    deadline = Deadline.from_header(deadline_ms)
+    max_body_bytes = MAX_IMAGE_UPLOAD_BYTES + _MULTIPART_OVERHEAD_BYTES
+    content_length = _content_length(http_request)
+    if content_length is not None and content_length > max_body_bytes:
+        return _too_large_response()
+
+    # Chunked bodies carry no Content-Length: count the bytes as the parser
+    # reads them, so an oversized file part stops spooling at the limit.
+    limited_request = Request(http_request.scope, limit_receive(http_request.receive, max_body_bytes))
+    try:
+        form = await limited_request.form(max_files=1, max_fields=16)
+    except UploadTooLargeError:
+        return _too_large_response()
+
+    image = None
+    try:
+        fields = {key: value for key, value in form.items() if isinstance(value, str)}
+        fields.pop("image_base64", None)
+        upload = form.get("image")
+        if upload is not None and not isinstance(upload, str):
+            image = ImageUpload.from_file(upload.file)
+        return await _analyze_with_upload(pipeline, fields, image, deadline)
+
+    except UploadTooLargeError:
+        return _too_large_response()
+
+    except InvalidImageError as e:
+        return error_response("INVALID_IMAGE", str(e))
+
+    finally:
+        await form.close()
+
+
+@router.post("/image")
+async def analyze_product_image(
+    http_request: Request,
+    product_name: str = Query(...),
+    manufacturing_country: str = Query(...),
+    destination_country: str = Query(...),
+    declared_value: float = Query(...),
+    currency: str = Query("USD"),
+    description: Optional[str] = Query(None),
+    as_of: Optional[date] = Query(None),
+    groq_api_key: Optional[str] = Header(None, alias="X-Groq-Api-Key"),
+    deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
+    pipeline=Depends(get_analysis_pipeline),
+):
+    """
+    Raw-binary variant of /analyze: the request body is the image itself and
+    the ProductRequest fields are query parameters.
+    """
+    deadline = Deadline.from_header(deadline_ms)
+    content_length = _content_length(http_request)
+    if content_length is not None and content_length > MAX_IMAGE_UPLOAD_BYTES:
+        return _too_large_response()
+
+    image = None
+    try:
+        image = await spool_image_stream(http_request.stream())
+        fields = {
+            "product_name": product_name,
+            "description": description,
+            "manufacturing_country": manufacturing_country,
+            "destination_country": destination_country,
+            "declared_value": declared_value,
+            "currency": currency,
+            "as_of": as_of,
+            "groq_api_key": groq_api_key,
         }
+        return await _analyze_with_upload(pipeline, fields, image, deadline)
+
+    except UploadTooLargeError:
+        return _too_large_response()
+
+    except InvalidImageError as e:
+        return error_response("INVALID_IMAGE", str(e))
+
+    finally:
+        if image is not None:
+            image.close()
+
+
+@router.post("/jobs")
+async def submit_analysis_job(
+    request: ProductRequest,
+    priority: str = Query("interactive"),
+    deadline_seconds: Optional[float] = Query(None, gt=0),
+    job_queue=Depends(get_job_queue),
+):
+    try:
+        job = await job_queue.submit(
+            request.model_dump(exclude={"groq_api_key"}),
+            priority=priority,
+            deadline_seconds=deadline_seconds,
+            secret=request.groq_api_key,
+        )
+    except ValueError as e:
+        return error_response("INVALID_REQUEST", str(e))
+
+    return success_response(job, status_code=202)
+
+
+@router.post("/jobs/batch")
+async def submit_analysis_jobs(
+    http_request: Request,
+    priority: str = Query("batch"),
+    deadline_seconds: Optional[float] = Query(None, gt=0),
+    job_queue=Depends(get_job_queue),
+):
+    """
+    Queues one job per ProductRequest in a JSON array body of at most
+    ANALYSIS_BATCH_MAX_BYTES. The whole array is validated in one pass from the
+    raw body; one invalid item rejects the batch.
+    """
+    too_large = error_response(
+        "PAYLOAD_TOO_LARGE", f"Batch exceeds the {ANALYSIS_BATCH_MAX_BYTES} byte limit.", status_code=413
+    )
+    content_length = _content_length(http_request)
+    if content_length is not None and content_length > ANALYSIS_BATCH_MAX_BYTES:
+        return too_large
+    try:
+        body = await read_body_stream(http_request.stream(), ANALYSIS_BATCH_MAX_BYTES)
+    except UploadTooLargeError:
+        return too_large
+
+    try:
+        requests = PRODUCT_REQUEST_BATCH.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+    try:
+        jobs = await job_queue.submit_many(
+            [request.model_dump(exclude={"groq_api_key"}) for request in requests],
+            priority=priority,
+            deadline_seconds=deadline_seconds,
+            secrets=[request.groq_api_key for request in requests],
+        )
+    except ValueError as e:
+        return error_response("INVALID_REQUEST", str(e))
+
+    return success_response({"jobs": jobs}, status_code=202)
+
+
+@router.get("/metrics")
+async def analysis_stage_metrics(stage_metrics=Depends(get_stage_metrics)):
+    return success_response(stage_metrics.snapshot())
+
+
+@router.get("/jobs/metrics")
+async def analysis_job_metrics(job_queue=Depends(get_job_queue)):
+    return success_response(await job_queue.metrics())
+
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60),
+    job_queue=Depends(get_job_queue),
+):
+    job = await job_queue.wait(job_id, timeout=wait)
+
+    if job is None:
+        return error_response("NOT_FOUND", "Job ID not found.")
+
+    return success_response(job)
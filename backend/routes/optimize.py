@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+
+from models.product import OptimizeSourcingRequest
+from core import state
+from core.container import get_sourcing_optimizer
+from core.responses import error_response, success_response
+
+router = APIRouter(prefix="/optimize-sourcing", tags=["Optimize"])
+
+
+@router.post("/")
+async def optimize_sourcing(request: OptimizeSourcingRequest, optimizer=Depends(get_sourcing_optimizer)):
+    stored = state.ANALYSIS_STORE.get(request.analysis_id)
+
+    if not stored:
+        return error_response("NOT_FOUND", "Analysis ID not found.")
+
+    # The search is CPU bound for up to its time budget; keep it off the event loop.
+    result = await run_in_threadpool(
+        optimizer.optimize,
+        hs_code=stored.hs_code,
+        manufacturing_country=stored.manufacturing_country,
+        destination_country=stored.destination_country,
+        declared_value=stored.declared_value,
+        currency=stored.currency,
+        materials=stored.materials,
+        candidate_countries=request.candidate_countries,
+        time_budget_ms=request.time_budget_ms,
+        as_of=stored.as_of,
+    )
+
+    return success_response({
+        "analysis_id": request.analysis_id,
+        "hs_code": stored.hs_code,
+        **result
+    })
@@ -1,80 +1,94 @@
-from fastapi import APIRouter
+from datetime import date
+
+import orjson
+from fastapi import APIRouter, Depends, Request
 from models.product import RecalculateRequest
-from services.tariff_engine import TariffEngine
-from services.risk_engine import RiskEngine
-from services.map_flow_service import MapFlowService
 from core import state
+from core.analysis_records import compact_materials
+from core.container import get_lane_analytics, get_recalculation_service
+from core.http_cache import cached_response, fingerprint
+from core.responses import dumps, error_response, success_response
+from services.currency_converter import FxRateError
 
 router = APIRouter(prefix="/recalculate", tags=["Recalculate"])
 
 
+def _replayed(body: bytes) -> bytes:
+    # A cache hit recomputes nothing.
+    envelope = orjson.loads(body)
+    envelope["data"]["recomputed"] = []
+    return dumps(envelope)
+
+
 @router.post("/")
-async def recalculate(request: RecalculateRequest):
+async def recalculate(
+    request: RecalculateRequest,
+    http_request: Request,
+    recalculation_service=Depends(get_recalculation_service),
+    lane_analytics=Depends(get_lane_analytics),
+):
 
     if request.analysis_id not in state.ANALYSIS_STORE:
-        return {
-            "success": False,
-            "data": None,
-            "error": {
-                "code": "NOT_FOUND",
-                "message": "Analysis ID not found."
-            }
-        }
+        return error_response("NOT_FOUND", "Analysis ID not found.")
 
     stored = state.ANALYSIS_STORE[request.analysis_id]
 
     # Use stored values unless overridden
-    hs_code = request.hs_code or stored["hs_code"]
-    materials = request.materials or stored["materials"]
-    manufacturing_country = stored["manufacturing_country"]
-    destination_country = request.destination_country or stored["destination_country"]
-    declared_value = request.declared_value or stored["declared_value"]
+    hs_code = request.hs_code or stored.hs_code
+    materials = compact_materials(request.materials) if request.materials else stored.materials
+    manufacturing_country = stored.manufacturing_country
+    destination_country = request.destination_country or stored.destination_country
+    declared_value = request.declared_value or stored.declared_value
+    currency = request.currency or stored.currency
+    # Analyses without an explicit date follow the tariffs in effect today.
+    as_of = request.as_of or stored.as_of or date.today()
 
-    tariff_engine = TariffEngine()
-    risk_engine = RiskEngine()
-    map_service = MapFlowService()
+    try:
+        recalculation_service.currency_converter.quote(currency, as_of)
+    except FxRateError as e:
+        return error_response("INVALID_REQUEST", str(e))
 
-    # -----------------------------
-    # 1️⃣ Tariff Recalculation
-    # -----------------------------
-    tariff_result = tariff_engine.calculate_tariff(
-        hs_code=hs_code,
-        manufacturing_country=manufacturing_country,
-        destination_country=destination_country,
-        declared_value=declared_value
-    )
+    def build():
+        # Tariff, risk and map stages are memoised per analysis; only the stages
+        # whose inputs changed since a previous run are recomputed.
+        result, recomputed = recalculation_service.evaluate(
+            stored.stage_cache,
+            hs_code=hs_code,
+            manufacturing_country=manufacturing_country,
+            destination_country=destination_country,
+            declared_value=declared_value,
+            materials=materials,
+            as_of=as_of,
+            currency=currency,
+        )
+        # Responses replayed from the HTTP cache are not recorded again.
+        lane_analytics.record(
+            "recalculate",
+            hs_code=hs_code,
+            manufacturing_country=manufacturing_country,
+            destination_country=destination_country,
+            duty_percent=result["tariff_summary"]["total_duty_percent"],
+            risk_score=result["risk_score"],
+            declared_value=result["tariff_summary"]["declared_value_usd"],
+        )
 
-    # -----------------------------
-    # 2️⃣ Risk Recalculation
-    # -----------------------------
-    risk_score = risk_engine.calculate_risk(
-        manufacturing_country=manufacturing_country,
-        destination_country=destination_country,
-        total_duty_percent=tariff_result.total_duty_percent,
-        materials=materials
-    )
-
-    # -----------------------------
-    # 3️⃣ Map Flow Regeneration
-    # -----------------------------
-    map_flow = map_service.generate_map_flow(
-        manufacturing_country=manufacturing_country,
-        destination_country=destination_country,
-        materials=materials,
-        hs_code=hs_code
-    )
-
-    return {
-        "success": True,
-        "data": {
+        return success_response({
             "hs_code": hs_code,
             "manufacturing_country": manufacturing_country,
             "destination_country": destination_country,
             "declared_value": declared_value,
+            "currency": currency,
+            "as_of": as_of,
             "materials": materials,
-            "tariff_summary": tariff_result.dict(),
-            "risk_score": risk_score,
-            "map_flow": map_flow
-        },
-        "error": None
-    }
+            "tariff_summary": result["tariff_summary"],
+            "risk_score": result["risk_score"],
+            "map_flow": result["map_flow"],
+            "map_lanes": result["map_lanes"],
+            "recomputed": recomputed
+        })
+
+    # The result is fully determined by the analysis, the overrides, the
+    # effective date and the reference data, so repeated calls are answered
+    # by ETag / response cache.
+    key = fingerprint("recalculate", request.model_dump(), as_of, state.DATA_VERSION)
+    return cached_response(http_request, key, build, replayed=_replayed)
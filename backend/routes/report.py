@@ -1,7 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
 
 from core import state
+from core.http_cache import cached_response, fingerprint
+from core.responses import error_response, success_response
 
 router = APIRouter(prefix="/generate-report", tags=["Report"])
 
@@ -11,31 +13,27 @@ class ReportRequest(BaseModel):
 
 
 @router.post("/")
-async def generate_report(request: ReportRequest):
+async def generate_report(request: ReportRequest, http_request: Request):
     stored = state.ANALYSIS_STORE.get(request.analysis_id)
 
     if not stored:
-        return {
-            "success": False,
-            "data": None,
-            "error": {
-                "code": "NOT_FOUND",
-                "message": "Analysis ID not found."
-            }
-        }
-
-    summary = (
-        f"HS {stored['hs_code']} shipment from {stored['manufacturing_country']} "
-        f"to {stored['destination_country']} with declared value ${stored['declared_value']:.2f}."
-    )
-
-    return {
-        "success": True,
-        "data": {
+        return error_response("NOT_FOUND", "Analysis ID not found.")
+
+    def build():
+        declared_value = f"${stored.declared_value:.2f}"
+        if stored.currency != "USD":
+            declared_value = f"{stored.currency} {stored.declared_value:.2f} (${stored.declared_value_usd:.2f})"
+        summary = (
+            f"HS {stored.hs_code} shipment from {stored.manufacturing_country} "
+            f"to {stored.destination_country} with declared value {declared_value}."
+        )
+
+        return success_response({
             "analysis_id": request.analysis_id,
-            "hs_code": stored["hs_code"],
-            "materials": stored["materials"],
+            "hs_code": stored.hs_code,
+            "materials": stored.materials,
             "summary": summary
-        },
-        "error": None
-    }
+        })
+
+    key = fingerprint("generate-report", request.model_dump(), state.DATA_VERSION)
+    return cached_response(http_request, key, build)
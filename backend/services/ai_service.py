@@ -1,18 +1,24 @@
+import asyncio
+import copy
 import json
 from pathlib import Path
-from typing import Optional
-from openai import OpenAI
-from dotenv import load_dotenv
+from typing import Any, Callable, Dict, Optional
 from config import (
     GROQ_API_KEY,
-    GROQ_BASE_URL,
     AI_MODEL,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
     VISION_MODEL,
     VISION_FALLBACK_MODEL,
     USE_REAL_AI
 )
-
-load_dotenv()
+from core import state
+from core.deadline import Deadline, DeadlineExceeded
+from core.http_cache import fingerprint
+from core.ttl_cache import TTLCache
+from core.uploads import ImageUpload
+from services.llm_json import complete_json
+from services.llm_transport import create_llm_client, requires_api_key
 
 class AIService:
     _ALLOWED_IMAGE_MIME_TYPES = {
@@ -23,23 +29,57 @@ class AIService:
     }
 
     def __init__(self):
-        self.client = None
-        if USE_REAL_AI and GROQ_API_KEY:
-            self.client = OpenAI(
-                api_key=GROQ_API_KEY,
-                base_url=GROQ_BASE_URL
-            )
+        self._client = None
+        self._supported_hs_codes = None
         self.model = AI_MODEL
         self.vision_model = VISION_MODEL
         self.vision_fallback_model = VISION_FALLBACK_MODEL
-        self.supported_hs_codes = self._load_supported_hs_codes()
+        # Classifications of text-described products, by classification_key().
+        self.cache = TTLCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+
+    @property
+    def client(self):
+        # Built on first use so constructing the service stays cheap.
+        if self._client is None and USE_REAL_AI and (GROQ_API_KEY or not requires_api_key()):
+            self._client = create_llm_client(api_key=GROQ_API_KEY)
+        return self._client
+
+    @property
+    def supported_hs_codes(self):
+        if self._supported_hs_codes is None:
+            # Reuse the tariff table loaded at startup instead of re-reading the file.
+            self._supported_hs_codes = sorted(state.TARIFFS.keys()) or self._load_supported_hs_codes()
+        return self._supported_hs_codes
+
+    def classification_key(self, product_name: str, description: str) -> str:
+        # The prompt lists the supported HS codes, so the key follows the reference data.
+        return fingerprint("classification", self.model, product_name.strip(), description.strip(), state.DATA_VERSION)
+
+    def remember_classification(
+        self,
+        product_name: str,
+        description: str,
+        result: Dict[str, Any],
+        stored_at: Optional[float] = None
+    ) -> bool:
+        """Seeds the cache with an earlier classification; False if it was not stored."""
+        key = self.classification_key(product_name, description)
+        if key in self.cache:
+            return False
+        return self.cache.put(key, {
+            "hs_code": result["hs_code"],
+            "confidence": result["confidence"],
+            "explanation": result["explanation"],
+            "materials": copy.deepcopy(result["materials"]),
+            "resolved_description": description.strip(),
+        }, stored_at=stored_at)
 
     def _resolve_client(self, groq_api_key: Optional[str] = None):
         if not USE_REAL_AI:
             return None
         key = str(groq_api_key or "").strip()
         if key:
-            return OpenAI(api_key=key, base_url=GROQ_BASE_URL)
+            return create_llm_client(api_key=key)
         if self.client is not None:
             return self.client
         raise RuntimeError(
@@ -165,22 +205,30 @@ class AIService:
     async def describe_product_image(
         self,
         product_name: str,
-        image_base64: str,
+        image_base64: Optional[str] = None,
         image_mime_type: Optional[str] = None,
-        groq_api_key: Optional[str] = None
+        groq_api_key: Optional[str] = None,
+        image: Optional[ImageUpload] = None,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """
         Uses a vision-capable model to generate a trade-focused description from an image.
+        The image is either base64 from the JSON body or a binary ImageUpload.
+        Each attempt runs off the event loop and gets only what is left of the
+        deadline as its timeout.
         """
         client = self._resolve_client(groq_api_key=groq_api_key)
         if client is None:
             raise RuntimeError("AI client is not configured.")
 
-        if not image_base64:
+        if image is not None:
+            # Encoded once here, straight from the spooled upload.
+            image_url = await asyncio.to_thread(image.data_url)
+        elif image_base64:
+            image_url = f"data:{self._normalize_image_mime_type(image_mime_type)};base64,{image_base64}"
+        else:
             raise ValueError("Image data is required for image description.")
 
-        mime_type = self._normalize_image_mime_type(image_mime_type)
-
         prompt = (
             "Describe this product for customs classification. "
             "Return one concise paragraph including visible materials, intended use, "
@@ -195,8 +243,11 @@ class AIService:
         response = None
         last_error = None
         for model_name in models_to_try:
+            timeout = deadline.timeout("vision") if deadline is not None else None
+            options = {"timeout": timeout} if timeout is not None else {}
             try:
-                response = client.chat.completions.create(
+                request = asyncio.to_thread(
+                    client.chat.completions.create,
                     model=model_name,
                     messages=[
                         {
@@ -205,15 +256,19 @@ class AIService:
                                 {"type": "text", "text": f"Product name hint: {product_name}\n{prompt}"},
                                 {
                                     "type": "image_url",
-                                    "image_url": {"url": f"data:{mime_type};base64,{image_base64}"}
+                                    "image_url": {"url": image_url}
                                 }
                             ]
                         }
                     ],
-                    temperature=0
+                    temperature=0,
+                    **options
                 )
+                response = await asyncio.wait_for(request, timeout)
                 break
             except Exception as err:
+                if deadline is not None and deadline.expired:
+                    raise DeadlineExceeded("vision") from err
                 body = getattr(err, "body", None)
                 error_code = None
                 if isinstance(body, dict):
@@ -241,11 +296,18 @@ class AIService:
         description: Optional[str] = None,
         image_base64: Optional[str] = None,
         image_mime_type: Optional[str] = None,
-        groq_api_key: Optional[str] = None
+        groq_api_key: Optional[str] = None,
+        image: Optional[ImageUpload] = None,
+        on_hs_code: Optional[Callable[[str], None]] = None,
+        deadline: Optional[Deadline] = None
     ):
         """
         Calls LLM to classify product into HS code,
         extract materials, and provide explanation.
+        on_hs_code is called with the normalized HS code as soon as it has
+        streamed in, before the materials and explanation are complete.
+        The vision and classification calls share the request deadline.
+        A product already classified from the same text is answered from cache.
         """
         client = self._resolve_client(groq_api_key=groq_api_key)
         if client is None:
@@ -253,14 +315,25 @@ class AIService:
 
         resolved_description = description.strip() if description else ""
 
+        # Images are described afresh each time; only text descriptions are cached.
+        cache_key = self.classification_key(product_name, resolved_description) if resolved_description else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if on_hs_code is not None:
+                    on_hs_code(cached["hs_code"])
+                return copy.deepcopy(cached)
+
         if not resolved_description:
-            if not image_base64:
+            if not image_base64 and image is None:
                 raise ValueError("Either description or image is required for classification.")
             resolved_description = await self.describe_product_image(
                 product_name,
                 image_base64,
                 image_mime_type=image_mime_type,
-                groq_api_key=groq_api_key
+                groq_api_key=groq_api_key,
+                image=image,
+                deadline=deadline
             )
 
         hs_code_guidance = ", ".join(self.supported_hs_codes) if self.supported_hs_codes else "Any valid HS code"
@@ -299,25 +372,32 @@ Important:
 - Choose an hs_code from the supported list when possible.
 """
 
-        response = client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0  # deterministic
-        )
-
-        content = response.choices[0].message.content.strip()
-
-        # 🔒 Safety: remove accidental markdown wrapping
-        if content.startswith("```"):
-            content = content.replace("```json", "").replace("```", "").strip()
+        def on_field(name, value):
+            if on_hs_code is not None and name == "hs_code":
+                on_hs_code(self._normalize_hs_code(value))
 
+        # Streamed and parsed incrementally; fenced or truncated output is repaired.
         try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
+            parsed = await complete_json(
+                client,
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0,  # deterministic
+                on_field=on_field,
+                watch={"hs_code"},
+                timeout=deadline.timeout("classification") if deadline is not None else None,
+            )
+        except Exception as err:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded("classification") from err
+            raise
+        if not isinstance(parsed, dict):
             raise ValueError("AI returned invalid JSON format.")
 
         normalized = self._normalize_ai_result(parsed, product_name)
         normalized["resolved_description"] = resolved_description
+        if cache_key is not None:
+            self.cache.put(cache_key, copy.deepcopy(normalized))
         return normalized
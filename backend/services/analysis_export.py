@@ -0,0 +1,269 @@
+"""
+Flat, streamed exports of the analysis history for warehouse loads.
+
+`rows` picks the grain: one row per analysis, per material or per shipping
+option. Every row carries the analysis columns and its tariff summary, so
+each grain loads as a single table without joins. Rows are read from the
+history a batch at a time and encoded as they arrive:
+
+- csv and ndjson yield one chunk per history batch;
+- parquet and arrow (Arrow IPC stream) need pyarrow, which is optional, and
+  yield one chunk per row group of ANALYSIS_EXPORT_ROW_GROUP_ROWS rows.
+
+The generators are synchronous; StreamingResponse runs each step in the
+threadpool, so a long export never blocks the event loop.
+"""
+import csv
+import importlib.util
+import io
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+
+from config import ANALYSIS_EXPORT_BATCH_SIZE, ANALYSIS_EXPORT_ROW_GROUP_ROWS
+from services.analysis_history import AnalysisHistory
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+Column = Tuple[str, str]
+
+_ANALYSIS_COLUMNS: List[Column] = [
+    ("analysis_id", "string"),
+    ("created_at", "timestamp"),
+    ("product_name", "string"),
+    ("hs_code", "string"),
+    ("confidence", "float"),
+    ("manufacturing_country", "string"),
+    ("destination_country", "string"),
+    ("declared_value", "float"),
+    ("currency", "string"),
+    ("as_of", "string"),
+    ("risk_score", "float"),
+    ("tariff_base_duty", "float"),
+    ("tariff_additional_duty", "float"),
+    ("tariff_trade_agreement_discount", "float"),
+    ("tariff_total_duty_percent", "float"),
+    ("tariff_estimated_duty_amount", "float"),
+    ("tariff_fx_rate", "float"),
+    ("tariff_declared_value_usd", "float"),
+    ("tariff_estimated_duty_amount_in_currency", "float"),
+    ("tariff_explanation", "string"),
+]
+_TARIFF_FIELDS = (
+    "base_duty",
+    "additional_duty",
+    "trade_agreement_discount",
+    "total_duty_percent",
+    "estimated_duty_amount",
+    "fx_rate",
+    "declared_value_usd",
+    "estimated_duty_amount_in_currency",
+    "explanation",
+)
+_MATERIAL_FIELDS = ("id", "name", "percentage", "origin_country", "stage")
+_SHIPPING_FIELDS = ("mode", "route", "eta_days", "estimated_cost_usd", "risk_level", "notes")
+
+GRAINS: Dict[str, List[Column]] = {
+    "analyses": _ANALYSIS_COLUMNS + [("material_count", "int"), ("shipping_option_count", "int")],
+    "materials": _ANALYSIS_COLUMNS + [
+        ("material_id", "string"),
+        ("material_name", "string"),
+        ("material_percentage", "float"),
+        ("material_origin_country", "string"),
+        ("material_stage", "string"),
+    ],
+    "shipping_options": _ANALYSIS_COLUMNS + [
+        ("shipping_mode", "string"),
+        ("shipping_route", "string"),
+        ("shipping_eta_days", "int"),
+        ("shipping_estimated_cost_usd", "float"),
+        ("shipping_risk_level", "string"),
+        ("shipping_notes", "string"),
+    ],
+}
+
+
+def columnar_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+# ----------------------------------------------------------------------
+# Flattening
+# ----------------------------------------------------------------------
+def _analysis_values(record: Dict[str, Any]) -> tuple:
+    result = record["result"]
+    tariff = result.get("tariff_summary") or {}
+    return (
+        record["analysis_id"],
+        datetime.fromtimestamp(record["created_at"], tz=timezone.utc),
+        record["product_name"],
+        result.get("hs_code"),
+        result.get("confidence"),
+        result.get("manufacturing_country"),
+        result.get("destination_country"),
+        result.get("declared_value"),
+        result.get("currency", "USD"),
+        result.get("as_of"),
+        result.get("risk_score"),
+        *(tariff.get(field) for field in _TARIFF_FIELDS),
+    )
+
+
+def flatten(record: Dict[str, Any], grain: str) -> Iterator[tuple]:
+    """Rows of one history record in the column order of GRAINS[grain]."""
+    base = _analysis_values(record)
+    result = record["result"]
+    materials = result.get("materials") or []
+    shipping_options = result.get("shipping_options") or []
+    if grain == "analyses":
+        yield base + (len(materials), len(shipping_options))
+    elif grain == "materials":
+        for material in materials:
+            yield base + tuple(material.get(field) for field in _MATERIAL_FIELDS)
+    else:
+        for option in shipping_options:
+            yield base + tuple(option.get(field) for field in _SHIPPING_FIELDS)
+
+
+def _row_batches(
+    history: AnalysisHistory,
+    terms: List[str],
+    grain: str,
+    since: Optional[float],
+    until: Optional[float],
+    batch_size: int,
+) -> Iterator[List[tuple]]:
+    for records in history.export_batches(terms, since=since, until=until, batch_size=batch_size):
+        rows = [row for record in records for row in flatten(record, grain)]
+        if rows:
+            yield rows
+
+
+# ----------------------------------------------------------------------
+# Encoders
+# ----------------------------------------------------------------------
+def _csv_chunks(columns: List[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([name for name, _ in columns])
+    timestamps = [index for index, (_, kind) in enumerate(columns) if kind == "timestamp"]
+    for rows in batches:
+        for row in rows:
+            if timestamps:
+                row = list(row)
+                for index in timestamps:
+                    row[index] = row[index].isoformat()
+            writer.writerow(row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # A header-only export is still a valid CSV.
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(columns: List[Column], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    names = [name for name, _ in columns]
+    for rows in batches:
+        yield b"".join(orjson.dumps(dict(zip(names, row))) + b"\n" for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever pyarrow wrote since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _row_groups(batches: Iterable[List[tuple]], rows_per_group: int) -> Iterator[List[tuple]]:
+    pending: List[tuple] = []
+    for rows in batches:
+        pending.extend(rows)
+        while len(pending) >= rows_per_group:
+            yield pending[:rows_per_group]
+            pending = pending[rows_per_group:]
+    if pending:
+        yield pending
+
+
+def _columnar_chunks(
+    fmt: str,
+    columns: List[Column],
+    batches: Iterable[List[tuple]],
+    rows_per_group: int,
+) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "int": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for rows in _row_groups(batches, rows_per_group):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            # One write per row group: Parquet row group, or Arrow record batch.
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(
+    history: AnalysisHistory,
+    fmt: str,
+    grain: str,
+    terms: List[str],
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    batch_size: int = ANALYSIS_EXPORT_BATCH_SIZE,
+    rows_per_group: int = ANALYSIS_EXPORT_ROW_GROUP_ROWS,
+) -> Iterator[bytes]:
+    columns = GRAINS[grain]
+    batches = _row_batches(history, terms, grain, since, until, batch_size)
+    if fmt == "csv":
+        chunks = _csv_chunks(columns, batches)
+    elif fmt == "ndjson":
+        chunks = _ndjson_chunks(columns, batches)
+    else:
+        chunks = _columnar_chunks(fmt, columns, batches, rows_per_group)
+    for chunk in chunks:
+        if chunk:
+            yield chunk
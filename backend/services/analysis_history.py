@@ -0,0 +1,411 @@
+import base64
+import re
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+
+# Geometry is recomputable from the lane and is most of a result's size.
+_UNSTORED_FIELDS = ("map_flow", "map_lanes")
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def material_tokens(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(str(text or "").lower()) if len(token) > 1]
+
+
+def normalize_hs_code(value: str) -> str:
+    digits = "".join(char for char in str(value or "") if char.isdigit())
+    if len(digits) >= 6:
+        return f"{digits[:4]}.{digits[4:6]}"
+    return digits or str(value or "").strip()
+
+
+def hs_code_term(value: str) -> str:
+    """Search term of an HS code query: a 4-digit heading or a 6-digit subheading (longer codes are cut to 6)."""
+    digits = "".join(char for char in str(value or "") if char.isdigit())
+    if len(digits) >= 6:
+        return f"hs:{normalize_hs_code(digits)}"
+    if len(digits) == 4:
+        return f"hd:{digits}"
+    raise ValueError("hs_code must be a 4-digit heading or a 6-digit subheading, e.g. 6109 or 6109.10.")
+
+
+def encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(f"s{seq}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        if not raw.startswith("s"):
+            raise ValueError(raw)
+        return int(raw[1:])
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("Invalid cursor.") from e
+
+
+class AnalysisHistory:
+    """
+    SQLite-backed history of completed analyses.
+
+    Each analysis gets an increasing `seq` and a set of index terms (HS code,
+    HS heading, HS chapter, origin, destination, lane, material origins, material-name
+    tokens) stored as postings keyed (term, seq). A search walks the postings
+    of its rarest term newest-first, probes the other terms by primary key and
+    stops after `limit` matches, so its cost follows the size of the result
+    (bounded by the rarest term), not of the history. Cursors carry the last
+    seq returned, so later pages start where the previous one stopped.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn = None
+        self._db_lock = Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few analyses on power loss is acceptable for a history.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS analyses (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    analysis_id TEXT NOT NULL UNIQUE,
+                    created_at REAL NOT NULL,
+                    product_name TEXT NOT NULL,
+                    hs_code TEXT NOT NULL,
+                    manufacturing_country TEXT NOT NULL,
+                    destination_country TEXT NOT NULL,
+                    declared_value REAL NOT NULL,
+                    total_duty_percent REAL,
+                    risk_score REAL,
+                    materials BLOB NOT NULL,
+                    request BLOB NOT NULL,
+                    result BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS analysis_terms (
+                    term TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (term, seq)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS analysis_term_counts (
+                    term TEXT PRIMARY KEY,
+                    postings INTEGER NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created_at);
+                """
+            )
+            self._backfill_headings(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _backfill_headings(conn: sqlite3.Connection):
+        """Adds the hd: (HS heading) terms to histories recorded before they were indexed."""
+        indexed = conn.execute("SELECT 1 FROM analysis_term_counts WHERE term >= 'hd:' AND term < 'hd;' LIMIT 1").fetchone()
+        recorded = conn.execute("SELECT 1 FROM analysis_term_counts WHERE term >= 'hs:' AND term < 'hs;' LIMIT 1").fetchone()
+        if indexed or not recorded:
+            return
+        conn.execute("BEGIN")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO analysis_terms (term, seq) "
+                "SELECT 'hd:' || substr(term, 4, 4), seq FROM analysis_terms "
+                "WHERE term >= 'hs:' AND term < 'hs;' AND length(term) >= 7"
+            )
+            conn.execute(
+                "INSERT INTO analysis_term_counts (term, postings) "
+                "SELECT term, COUNT(*) FROM analysis_terms WHERE term >= 'hd:' AND term < 'hd;' GROUP BY term "
+                "ON CONFLICT (term) DO UPDATE SET postings = excluded.postings"
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._db_lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+    @staticmethod
+    def index_terms(
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        materials: Iterable[Dict[str, Any]],
+    ) -> List[str]:
+        hs_code = normalize_hs_code(hs_code)
+        terms = {
+            f"hs:{hs_code}",
+            f"ch:{hs_code[:2]}",
+            f"from:{manufacturing_country}",
+            f"to:{destination_country}",
+            f"lane:{manufacturing_country}-{destination_country}",
+        }
+        heading = hs_code.replace(".", "")[:4]
+        if len(heading) == 4 and heading.isdigit():
+            terms.add(f"hd:{heading}")
+        for material in materials:
+            if material.get("origin_country"):
+                terms.add(f"origin:{material['origin_country']}")
+            terms.update(f"mat:{token}" for token in material_tokens(material.get("name")))
+        return sorted(terms)
+
+    def record(self, analysis_id: str, request: Dict[str, Any], result: Dict[str, Any], created_at: Optional[float] = None):
+        """Stores a finished analysis; `request` holds the inputs the result does not echo (name, description, as_of)."""
+        materials = [
+            {
+                "name": material.get("name"),
+                "percentage": material.get("percentage"),
+                "origin_country": material.get("origin_country"),
+            }
+            for material in result.get("materials") or []
+        ]
+        stored = {key: value for key, value in result.items() if key not in _UNSTORED_FIELDS}
+        terms = self.index_terms(
+            result["hs_code"], result["manufacturing_country"], result["destination_country"], materials
+        )
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                seq = conn.execute(
+                    """
+                    INSERT INTO analyses (
+                        analysis_id, created_at, product_name, hs_code, manufacturing_country,
+                        destination_country, declared_value, total_duty_percent, risk_score,
+                        materials, request, result
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        analysis_id,
+                        time.time() if created_at is None else created_at,
+                        request.get("product_name", ""),
+                        normalize_hs_code(result["hs_code"]),
+                        result["manufacturing_country"],
+                        result["destination_country"],
+                        float(result["declared_value"]),
+                        (result.get("tariff_summary") or {}).get("total_duty_percent"),
+                        result.get("risk_score"),
+                        orjson.dumps(materials),
+                        orjson.dumps(request),
+                        orjson.dumps(stored),
+                    ),
+                ).lastrowid
+                conn.executemany("INSERT INTO analysis_terms (term, seq) VALUES (?, ?)", [(term, seq) for term in terms])
+                conn.executemany(
+                    "INSERT INTO analysis_term_counts (term, postings) VALUES (?, 1) "
+                    "ON CONFLICT (term) DO UPDATE SET postings = postings + 1",
+                    [(term,) for term in terms],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return seq
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    @staticmethod
+    def query_terms(
+        hs_code: Optional[str] = None,
+        hs_chapter: Optional[str] = None,
+        manufacturing_country: Optional[str] = None,
+        destination_country: Optional[str] = None,
+        material_origins: Iterable[str] = (),
+        material: Optional[str] = None,
+    ) -> List[str]:
+        """Raises ValueError for an hs_code that is neither a heading nor a subheading."""
+        terms = []
+        if hs_code:
+            terms.append(hs_code_term(hs_code))
+        if hs_chapter:
+            terms.append(f"ch:{hs_chapter}")
+        if manufacturing_country and destination_country:
+            terms.append(f"lane:{manufacturing_country}-{destination_country}")
+        elif manufacturing_country:
+            terms.append(f"from:{manufacturing_country}")
+        elif destination_country:
+            terms.append(f"to:{destination_country}")
+        terms.extend(f"origin:{country}" for country in material_origins)
+        terms.extend(f"mat:{token}" for token in material_tokens(material))
+        return list(dict.fromkeys(terms))
+
+    def _postings(self, terms: List[str]) -> Dict[str, int]:
+        placeholders = ",".join("?" * len(terms))
+        rows = self._execute(
+            f"SELECT term, postings FROM analysis_term_counts WHERE term IN ({placeholders})", tuple(terms)
+        )
+        counts = {row["term"]: row["postings"] for row in rows}
+        return {term: counts.get(term, 0) for term in terms}
+
+    def _driver_and_probes(self, terms: List[str]) -> Optional[Tuple[str, List[str]]]:
+        """Rarest term first; None when some term has no postings, so nothing can match."""
+        postings = self._postings(terms)
+        if min(postings.values()) == 0:
+            return None
+        driver, *probes = sorted(terms, key=postings.__getitem__)
+        return driver, probes
+
+    @staticmethod
+    def _probe_sql(probes: List[str]) -> Tuple[str, str]:
+        # CROSS JOIN keeps SQLite from reordering: walk the rarest term's postings
+        # and probe the rest by primary key.
+        joins = "".join(f" CROSS JOIN analysis_terms p{idx}" for idx in range(1, len(probes) + 1))
+        probe_filters = "".join(
+            f" AND p{idx}.term = ? AND p{idx}.seq = p0.seq" for idx in range(1, len(probes) + 1)
+        )
+        return joins, probe_filters
+
+    def _matching_seqs(self, terms: List[str], before: Optional[int], limit: int) -> List[int]:
+        before = before if before is not None else 2 ** 63 - 1
+        if not terms:
+            rows = self._execute("SELECT seq FROM analyses WHERE seq < ? ORDER BY seq DESC LIMIT ?", (before, limit))
+            return [row["seq"] for row in rows]
+
+        plan = self._driver_and_probes(terms)
+        if plan is None:
+            return []
+        driver, probes = plan
+        joins, probe_filters = self._probe_sql(probes)
+        rows = self._execute(
+            f"SELECT p0.seq FROM analysis_terms p0{joins} "
+            f"WHERE p0.term = ? AND p0.seq < ?{probe_filters} ORDER BY p0.seq DESC LIMIT ?",
+            (driver, before, *probes, limit),
+        )
+        return [row["seq"] for row in rows]
+
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "analysis_id": row["analysis_id"],
+            "created_at": row["created_at"],
+            "product_name": row["product_name"],
+            "hs_code": row["hs_code"],
+            "manufacturing_country": row["manufacturing_country"],
+            "destination_country": row["destination_country"],
+            "declared_value": row["declared_value"],
+            "total_duty_percent": row["total_duty_percent"],
+            "risk_score": row["risk_score"],
+            "materials": orjson.loads(row["materials"]),
+        }
+
+    def search(self, terms: List[str], limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest-first analyses carrying every term; returns (page, cursor for the next page or None)."""
+        before = decode_cursor(cursor) if cursor else None
+        seqs = self._matching_seqs(terms, before, limit + 1)
+        next_cursor = encode_cursor(seqs[limit - 1]) if len(seqs) > limit else None
+        seqs = seqs[:limit]
+        if not seqs:
+            return [], None
+
+        placeholders = ",".join("?" * len(seqs))
+        rows = self._execute(
+            f"SELECT seq, analysis_id, created_at, product_name, hs_code, manufacturing_country, destination_country, "
+            f"declared_value, total_duty_percent, risk_score, materials FROM analyses WHERE seq IN ({placeholders}) "
+            f"ORDER BY seq DESC",
+            tuple(seqs),
+        )
+        return [self._summary(row) for row in rows], next_cursor
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute("SELECT request, result, created_at FROM analyses WHERE analysis_id = ?", (analysis_id,))
+        if not rows:
+            return None
+        return {
+            **orjson.loads(rows[0]["result"]),
+            "request": orjson.loads(rows[0]["request"]),
+            "created_at": rows[0]["created_at"],
+        }
+
+    def export_batches(
+        self,
+        terms: List[str],
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        batch_size: int = 500,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Oldest-first analyses carrying every term and created in [since, until),
+        `batch_size` at a time. Each batch is its own short query that resumes
+        after the last seq of the previous one, so an export holds neither the
+        lock nor more than one batch in memory. Analyses recorded after the
+        export started are left out.
+        """
+        since = since if since is not None else float("-inf")
+        until = until if until is not None else float("inf")
+        bounds = self._execute(
+            "SELECT MIN(seq) AS low, MAX(seq) AS high FROM analyses WHERE created_at >= ? AND created_at < ?",
+            (since, until),
+        )[0]
+        if bounds["low"] is None:
+            return
+        after, high = bounds["low"] - 1, bounds["high"]
+
+        columns = "a.seq, a.analysis_id, a.created_at, a.product_name, a.result"
+        # Unary + keeps the created_at index out of the plan: walking seq in order
+        # needs no sort, and the seq bounds already narrow the range.
+        time_filter = "+a.created_at >= ? AND +a.created_at < ?"
+        if terms:
+            plan = self._driver_and_probes(terms)
+            if plan is None:
+                return
+            driver, probes = plan
+            joins, probe_filters = self._probe_sql(probes)
+            sql = (
+                f"SELECT {columns} FROM analysis_terms p0{joins} CROSS JOIN analyses a "
+                f"WHERE p0.term = ? AND p0.seq > ? AND p0.seq <= ?{probe_filters} "
+                f"AND a.seq = p0.seq AND {time_filter} ORDER BY p0.seq LIMIT ?"
+            )
+
+            def params(after):
+                return (driver, after, high, *probes, since, until, batch_size)
+        else:
+            sql = f"SELECT {columns} FROM analyses a WHERE a.seq > ? AND a.seq <= ? AND {time_filter} ORDER BY a.seq LIMIT ?"
+
+            def params(after):
+                return (after, high, since, until, batch_size)
+
+        while True:
+            rows = self._execute(sql, params(after))
+            if not rows:
+                return
+            after = rows[-1]["seq"]
+            yield [
+                {
+                    "analysis_id": row["analysis_id"],
+                    "created_at": row["created_at"],
+                    "product_name": row["product_name"],
+                    "result": orjson.loads(row["result"]),
+                }
+                for row in rows
+            ]
+            if len(rows) < batch_size:
+                return
+
+    def recent_results(self, since: float, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Requests and results of analyses since `since`, oldest first, for cache warmup."""
+        rows = self._execute(
+            "SELECT request, result, created_at FROM analyses WHERE created_at >= ? ORDER BY seq DESC LIMIT ?",
+            (since, limit),
+        )
+        return [
+            {"payload": orjson.loads(row["request"]), "result": orjson.loads(row["result"]), "finished_at": row["created_at"]}
+            for row in reversed(rows)
+        ]
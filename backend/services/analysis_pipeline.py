@@ -0,0 +1,227 @@
+import asyncio
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Optional
+
+from core import state
+from core.analysis_records import AnalysisRecord, compact_materials
+from core.deadline import Deadline, DeadlineExceeded, StageMetrics
+from core.uploads import ImageUpload
+from models.product import ProductRequest
+from services.ai_service import AIService
+from services.analysis_history import AnalysisHistory
+from services.lane_analytics import LaneAnalytics
+from services.map_flow_service import MapFlowService
+from services.recalculation_service import RecalculationService
+from services.trade_intel_service import TradeIntelService
+
+
+class AnalysisPipeline:
+    """
+    The /analyze pipeline: classification, tariff/risk/map stages, trade intel,
+    then storing the analysis (in memory for /recalculate and in the searchable
+    history). Shared by the synchronous route and job workers.
+
+    Every run has a Deadline. Required stages raise DeadlineExceeded once it is
+    spent; trade intel degrades to its deterministic fallback instead.
+    """
+
+    def __init__(
+        self,
+        ai_service: AIService,
+        map_service: MapFlowService,
+        trade_intel_service: TradeIntelService,
+        recalculation_service: RecalculationService,
+        lane_analytics: Optional[LaneAnalytics] = None,
+        stage_metrics: Optional[StageMetrics] = None,
+        analysis_history: Optional[AnalysisHistory] = None,
+    ):
+        self.ai_service = ai_service
+        self.map_service = map_service
+        self.trade_intel_service = trade_intel_service
+        self.recalculation_service = recalculation_service
+        self.lane_analytics = lane_analytics
+        self.stage_metrics = stage_metrics
+        self.analysis_history = analysis_history
+
+    @contextmanager
+    def _stage(self, name: str, deadline: Deadline, required: bool = True):
+        started = time.perf_counter()
+        try:
+            if required:
+                deadline.timeout(name)
+            yield
+        except DeadlineExceeded as e:
+            deadline.missed(e.stage)
+            raise
+        except Exception as e:
+            if not (required and deadline.expired):
+                raise
+            deadline.missed(name)
+            raise DeadlineExceeded(name) from e
+        finally:
+            if self.stage_metrics is not None:
+                self.stage_metrics.observe(name, time.perf_counter() - started)
+
+    async def run(
+        self,
+        request: ProductRequest,
+        image: Optional[ImageUpload] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        deadline = deadline or Deadline()
+        exceeded = False
+        try:
+            return await self._run(request, image, deadline)
+        except DeadlineExceeded:
+            exceeded = True
+            raise
+        except asyncio.CancelledError:
+            # e.g. a job worker's own deadline firing first.
+            exceeded = deadline.expired
+            raise
+        finally:
+            if self.stage_metrics is not None:
+                self.stage_metrics.finish(deadline, exceeded)
+
+    async def _run(self, request: ProductRequest, image: Optional[ImageUpload], deadline: Deadline) -> Dict[str, Any]:
+        # Running the stages through the recalculation service seeds the stage
+        # cache, so a later /recalculate with unchanged inputs reuses them.
+        stage_cache = {}
+        as_of = request.as_of or date.today()
+        # An unknown currency fails before any LLM call is paid for.
+        self.recalculation_service.currency_converter.quote(request.currency, as_of)
+
+        def start_tariff(hs_code: str):
+            # The tariff stages only need the HS code, so they run while the
+            # materials are still streaming. Errors resurface in evaluate().
+            try:
+                self.recalculation_service.prime_tariff(
+                    stage_cache,
+                    hs_code=hs_code,
+                    manufacturing_country=request.manufacturing_country,
+                    destination_country=request.destination_country,
+                    declared_value=request.declared_value,
+                    as_of=as_of,
+                    currency=request.currency,
+                )
+            except Exception:
+                pass
+
+        with self._stage("classification", deadline):
+            ai_result = await self.ai_service.classify_product(
+                product_name=request.product_name,
+                description=request.description,
+                image_base64=request.image_base64,
+                image_mime_type=request.image_mime_type,
+                groq_api_key=request.groq_api_key,
+                image=image,
+                on_hs_code=start_tariff,
+                deadline=deadline,
+            )
+
+        # Converted once; the stages and the store read the same records.
+        materials = compact_materials(ai_result["materials"])
+        with self._stage("tariff_risk_map", deadline):
+            stages, _ = self.recalculation_service.evaluate(
+                stage_cache,
+                hs_code=ai_result["hs_code"],
+                manufacturing_country=request.manufacturing_country,
+                destination_country=request.destination_country,
+                declared_value=request.declared_value,
+                materials=materials,
+                as_of=as_of,
+                currency=request.currency,
+            )
+        tariff_summary = stages["tariff_summary"]
+        risk_score = stages["risk_score"]
+        map_flow = stages["map_flow"]
+        self.map_service.save_globe_file(map_flow)
+
+        with self._stage("trade_intel", deadline, required=False):
+            trade_intel = await self.trade_intel_service.generate(
+                product_name=request.product_name,
+                hs_code=ai_result["hs_code"],
+                manufacturing_country=request.manufacturing_country,
+                destination_country=request.destination_country,
+                declared_value=tariff_summary["declared_value_usd"],
+                tariff_summary=tariff_summary,
+                risk_score=risk_score,
+                ai_explanation=ai_result.get("explanation", ""),
+                groq_api_key=request.groq_api_key,
+                deadline=deadline,
+            )
+
+        analysis_id = str(uuid.uuid4())
+
+        if self.lane_analytics is not None:
+            self.lane_analytics.record(
+                "analyze",
+                hs_code=ai_result["hs_code"],
+                manufacturing_country=request.manufacturing_country,
+                destination_country=request.destination_country,
+                duty_percent=tariff_summary["total_duty_percent"],
+                risk_score=risk_score,
+                declared_value=tariff_summary["declared_value_usd"],
+            )
+
+        state.ANALYSIS_STORE[analysis_id] = AnalysisRecord.create(
+            hs_code=ai_result["hs_code"],
+            manufacturing_country=request.manufacturing_country,
+            destination_country=request.destination_country,
+            declared_value=request.declared_value,
+            currency=request.currency,
+            declared_value_usd=tariff_summary["declared_value_usd"],
+            as_of=request.as_of,
+            materials=materials,
+            recent_insights=trade_intel["recent_insights"],
+            shipping_options=trade_intel["shipping_options"],
+            compliance_checks=trade_intel["compliance_checks"],
+            stage_cache=stage_cache,
+        )
+
+        result = {
+            "analysis_id": analysis_id,
+            "hs_code": ai_result["hs_code"],
+            "confidence": ai_result["confidence"],
+            "explanation": ai_result["explanation"],
+            "resolved_description": ai_result.get("resolved_description"),
+            "manufacturing_country": request.manufacturing_country,
+            "destination_country": request.destination_country,
+            "declared_value": request.declared_value,
+            "currency": request.currency,
+            "as_of": as_of,
+            "materials": ai_result["materials"],
+            "tariff_summary": tariff_summary,
+            "risk_score": risk_score,
+            "map_flow": map_flow,
+            "map_lanes": stages["map_lanes"],
+            "recent_insights": trade_intel["recent_insights"],
+            "shipping_options": trade_intel["shipping_options"],
+            "compliance_checks": trade_intel["compliance_checks"],
+        }
+
+        if self.analysis_history is not None:
+            try:
+                # A SQLite transaction that can queue behind an export batch; kept off the loop.
+                await asyncio.to_thread(
+                    self.analysis_history.record,
+                    analysis_id,
+                    {
+                        "product_name": request.product_name,
+                        "description": request.description,
+                        "manufacturing_country": request.manufacturing_country,
+                        "destination_country": request.destination_country,
+                        "declared_value": request.declared_value,
+                        "currency": request.currency,
+                        "as_of": request.as_of,
+                    },
+                    result,
+                )
+            except Exception as e:
+                # The analysis itself succeeded; a history write must not fail it.
+                print(f"[HISTORY] Could not record analysis {analysis_id}: {e}")
+
+        return result
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, Union
+
+from core import state
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from services.fx_table import FxTable
+
+BASE_CURRENCY = "USD"
+
+
+class FxRateError(ValueError):
+    pass
+
+
+class FxQuote(NamedTuple):
+    currency: str
+    usd_per_unit: float
+    effective_from: Optional[date]  # None when the rate has no start date
+
+
+USD_QUOTE = FxQuote(BASE_CURRENCY, 1.0, None)
+
+
+def normalize_currency(value: str) -> str:
+    return str(value or "").strip().upper()
+
+
+class CurrencyConverter:
+    # Shared across instances; rebuilt whenever the reference data changes.
+    _table = None
+    _table_key = None
+
+    @classmethod
+    def table(cls) -> "FxTable":
+        key = (state.DATA_VERSION, id(state.FX_RATES), len(state.FX_RATES))
+        if cls._table is None or key != cls._table_key:
+            # numpy is only imported once a rate is needed, not with the app.
+            from services.fx_table import FxTable
+
+            cls._table = FxTable(state.FX_RATES)
+            cls._table_key = key
+        return cls._table
+
+    def quote(self, currency: str, as_of: Optional[date] = None) -> FxQuote:
+        """USD per unit of currency on as_of (default: today); raises FxRateError."""
+        if normalize_currency(currency) == BASE_CURRENCY:
+            return USD_QUOTE
+        return self.table().quote(currency, (as_of or date.today()).toordinal())
+
+    def to_usd(self, amounts, currencies: Union[str, Iterable[str]], as_of: Optional[date] = None) -> "np.ndarray":
+        return self.table().to_usd(amounts, currencies, (as_of or date.today()).toordinal())
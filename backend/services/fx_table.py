@@ -0,0 +1,101 @@
+"""
+Effective-dated exchange rates from fx_rates.json.
+
+Each entry maps an ISO 4217 code to {"usd_per_unit": rate}, which is always
+in effect, or to {"versions": [...]} dated like tariffs.json (see
+services/tariff_index.py). USD is implicit. A date outside every version of
+a currency has no rate for it.
+
+Every version lives in four parallel numpy arrays (currency id, start day,
+end day, rate). rates_on(day) resolves all currencies at once into a vector
+indexed by currency id and keeps the FX_RATE_CACHE_DAYS most recently used
+dates, so converting any number of amounts on a date is one gather and one
+multiply.
+"""
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Tuple, Union
+
+import numpy as np
+
+from config import FX_RATE_CACHE_DAYS
+from services.currency_converter import BASE_CURRENCY, FxQuote, FxRateError, normalize_currency
+from services.tariff_index import MAX_DAY, MIN_DAY
+
+class FxTable:
+    def __init__(self, entries: Dict[str, Any], cache_days: int = FX_RATE_CACHE_DAYS):
+        codes = {normalize_currency(code) for code in entries} | {BASE_CURRENCY}
+        self.currencies = tuple(sorted(codes))
+        self.currency_ids = {code: idx for idx, code in enumerate(self.currencies)}
+
+        versions = [(self.currency_ids[BASE_CURRENCY], MIN_DAY, MAX_DAY, 1.0)]
+        for code, entry in entries.items():
+            code = normalize_currency(code)
+            if code == BASE_CURRENCY:
+                continue
+            versions.extend((self.currency_ids[code], *interval) for interval in self._intervals(code, entry))
+
+        self._ids = np.array([version[0] for version in versions], dtype=np.int16)
+        self._starts = np.array([version[1] for version in versions], dtype=np.int32)
+        self._ends = np.array([version[2] for version in versions], dtype=np.int32)
+        self._rates = np.array([version[3] for version in versions], dtype=np.float64)
+        self.version_count = len(versions) - 1
+        self.rates_on = lru_cache(maxsize=cache_days)(self._rates_on)
+
+    @staticmethod
+    def _intervals(code: str, entry: Dict[str, Any]):
+        records = entry.get("versions") if isinstance(entry, dict) and "versions" in entry else [entry]
+        intervals = []
+        for record in records:
+            start = date.fromisoformat(record["effective_from"]).toordinal() if record.get("effective_from") else MIN_DAY
+            end = date.fromisoformat(record["effective_to"]).toordinal() if record.get("effective_to") else MAX_DAY
+            rate = float(record["usd_per_unit"])
+            if end <= start:
+                raise ValueError(f"Empty effective date range for {code}.")
+            if rate <= 0:
+                raise ValueError(f"Non-positive exchange rate for {code}.")
+            intervals.append((start, end, rate))
+        intervals.sort()
+        for (_, previous_end, _), (start, _, _) in zip(intervals, intervals[1:]):
+            if start < previous_end:
+                raise ValueError(f"Overlapping effective dates for {code}.")
+        return intervals
+
+    def _rates_on(self, day: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(USD per unit, effective start day) per currency id; NaN rate where none is in effect."""
+        in_effect = (self._starts <= day) & (day < self._ends)
+        rates = np.full(len(self.currencies), np.nan)
+        starts = np.full(len(self.currencies), MIN_DAY, dtype=np.int32)
+        rates[self._ids[in_effect]] = self._rates[in_effect]
+        starts[self._ids[in_effect]] = self._starts[in_effect]
+        # Shared by every caller of this date.
+        rates.setflags(write=False)
+        starts.setflags(write=False)
+        return rates, starts
+
+    def currency_id(self, currency: str) -> int:
+        code = normalize_currency(currency)
+        if code not in self.currency_ids:
+            raise FxRateError(f"Unsupported currency {code or '(empty)'}.")
+        return self.currency_ids[code]
+
+    def quote(self, currency: str, day: int) -> FxQuote:
+        currency_id = self.currency_id(currency)
+        rates, starts = self.rates_on(day)
+        rate = rates[currency_id]
+        if np.isnan(rate):
+            raise FxRateError(f"No {self.currencies[currency_id]} exchange rate in effect on {date.fromordinal(day)}.")
+        start = int(starts[currency_id])
+        return FxQuote(self.currencies[currency_id], float(rate), None if start == MIN_DAY else date.fromordinal(start))
+
+    def to_usd(self, amounts, currencies: Union[str, Iterable[str]], day: int) -> np.ndarray:
+        """USD values of `amounts`, in one currency or in one currency each."""
+        if isinstance(currencies, str):
+            ids = self.currency_id(currencies)
+        else:
+            ids = np.fromiter((self.currency_id(code) for code in currencies), dtype=np.int64)
+        rates = self.rates_on(day)[0][ids]
+        if np.isnan(rates).any():
+            missing = sorted({self.currencies[idx] for idx in np.atleast_1d(ids)[np.isnan(np.atleast_1d(rates))]})
+            raise FxRateError(f"No {', '.join(missing)} exchange rate in effect on {date.fromordinal(day)}.")
+        return np.asarray(amounts, dtype=np.float64) * rates
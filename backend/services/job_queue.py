@@ -0,0 +1,385 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue for long-running analyses.
+
+    Jobs are claimed in (priority, created_at) order by a pool of asyncio
+    workers; SQLite calls run in the default threadpool, off the event loop.
+    A claim is one UPDATE ... RETURNING, so processes sharing the database
+    never run the same job twice. The claiming process owns the job and
+    renews its heartbeat while it runs; running jobs whose heartbeat is older
+    than _STALE_AFTER_SECONDS (their process died) go back to the queue, as do
+    a process's own running jobs when it stops. Request secrets (the
+    per-request Groq key) are held in memory only, by the accepting process,
+    and never written to disk; a job whose secret is gone (e.g. lost in a
+    restart) fails rather than running on the server's key. Finished jobs are
+    deleted result_ttl_seconds after they finish (0 keeps them).
+    The runner is called with (payload, secret, seconds left until the deadline).
+    """
+
+    PRIORITIES = {"interactive": 0, "batch": 10}
+    TERMINAL_STATUSES = {"succeeded", "failed", "expired"}
+    _POLL_INTERVAL_SECONDS = 1.0
+    _HEARTBEAT_SECONDS = 10.0
+    _STALE_AFTER_SECONDS = 3 * _HEARTBEAT_SECONDS
+    _PURGE_INTERVAL_SECONDS = 60.0
+    _PURGE_BATCH = 1000
+
+    def __init__(
+        self,
+        db_path: Path,
+        runner: Callable[[Dict[str, Any], Optional[str], float], Awaitable[Dict[str, Any]]],
+        workers: int = 2,
+        default_deadline_seconds: float = 300.0,
+        result_ttl_seconds: float = 86400.0,
+    ):
+        self.db_path = Path(db_path)
+        self.runner = runner
+        self.worker_count = max(1, workers)
+        self.default_deadline_seconds = default_deadline_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._owner = uuid.uuid4().hex
+        self._conn = None
+        self._db_lock = Lock()
+        self._secrets: Dict[str, str] = {}
+        self._waiters: Dict[str, asyncio.Event] = {}
+        self._waiter_counts: Dict[str, int] = {}
+        self._work_available: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._next_purge_at = 0.0
+        self._latencies = deque(maxlen=1000)
+        self._counters = {"submitted": 0, "succeeded": 0, "failed": 0, "expired": 0}
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Consistent under WAL; a power loss may drop the last few commits.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    result BLOB,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    deadline_at REAL NOT NULL,
+                    owner TEXT,
+                    heartbeat_at REAL,
+                    has_secret INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL"), ("has_secret", "INTEGER NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)")
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._db_lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _serialize(row: sqlite3.Row, include_result: bool = True) -> Dict[str, Any]:
+        priority_name = next(
+            (name for name, value in JobQueue.PRIORITIES.items() if value == row["priority"]),
+            str(row["priority"]),
+        )
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "priority": priority_name,
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "deadline_at": row["deadline_at"],
+            "result": None,
+            "error": None,
+        }
+        if include_result and row["result"] is not None:
+            job["result"] = orjson.loads(row["result"])
+        if row["error"]:
+            job["error"] = {"code": row["status"].upper(), "message": row["error"]}
+        return job
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self):
+        if self._tasks:
+            return
+        await asyncio.to_thread(self._requeue_stale)
+        self._work_available = asyncio.Event()
+        self._work_available.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs interrupted mid-run go back to the queue for the next process.
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+            "WHERE status = 'running' AND owner = ?",
+            (self._owner,),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def submit(
+        self,
+        payload: Dict[str, Any],
+        priority: str = "interactive",
+        deadline_seconds: Optional[float] = None,
+        secret: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return (await self.submit_many([payload], priority, deadline_seconds, secrets=[secret]))[0]
+
+    async def submit_many(
+        self,
+        payloads: List[Dict[str, Any]],
+        priority: str = "interactive",
+        deadline_seconds: Optional[float] = None,
+        secrets: Optional[List[Optional[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Queues every payload in one transaction; all of them share the priority and deadline."""
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(self.PRIORITIES)}")
+
+        secrets = secrets or [None] * len(payloads)
+        now = time.time()
+        deadline_at = now + (deadline_seconds or self.default_deadline_seconds)
+        jobs = [
+            {
+                "id": str(uuid.uuid4()),
+                "status": "queued",
+                "priority": self.PRIORITIES[priority],
+                "payload": orjson.dumps(payload),
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "deadline_at": deadline_at,
+                "has_secret": int(bool(secret)),
+            }
+            for payload, secret in zip(payloads, secrets)
+        ]
+        # Secrets are in place before a worker can claim the rows.
+        for job, secret in zip(jobs, secrets):
+            if secret:
+                self._secrets[job["id"]] = secret
+        try:
+            await asyncio.to_thread(self._insert, jobs)
+        except BaseException:
+            for job in jobs:
+                self._secrets.pop(job["id"], None)
+            raise
+
+        self._counters["submitted"] += len(jobs)
+        if self._work_available is not None:
+            self._work_available.set()
+        return [self._serialize(job) for job in jobs]
+
+    def _insert(self, jobs: List[Dict[str, Any]]):
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO jobs (id, status, priority, payload, created_at, deadline_at, has_secret) "
+                    "VALUES (:id, :status, :priority, :payload, :created_at, :deadline_at, :has_secret)",
+                    jobs,
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(self._execute, "SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._serialize(rows[0]) if rows else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: returns once the job is finished or the timeout elapses."""
+        job = await self.get(job_id)
+        if job is None or job["status"] in self.TERMINAL_STATUSES or timeout <= 0:
+            return job
+        # Waiters share one event per job; the last one out removes it, so jobs
+        # that time out, never finish or finish in another process leave nothing behind.
+        event = self._waiters.setdefault(job_id, asyncio.Event())
+        self._waiter_counts[job_id] = self._waiter_counts.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            remaining = self._waiter_counts.pop(job_id) - 1
+            if remaining:
+                self._waiter_counts[job_id] = remaining
+            else:
+                self._waiters.pop(job_id, None)
+        return await self.get(job_id)
+
+    async def metrics(self) -> Dict[str, Any]:
+        depth = {name: 0 for name in self.PRIORITIES}
+        statuses = {}
+        rows, oldest = await asyncio.to_thread(self._metrics_rows)
+        for row in rows:
+            statuses[row["status"]] = statuses.get(row["status"], 0) + row["total"]
+            if row["status"] == "queued":
+                for name, value in self.PRIORITIES.items():
+                    if value == row["priority"]:
+                        depth[name] += row["total"]
+
+        def percentiles(values):
+            if not values:
+                return {"p50": None, "p95": None, "p99": None}
+            ordered = sorted(values)
+            pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+            return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+        return {
+            "queue_depth": depth,
+            "jobs_by_status": statuses,
+            "oldest_queued_age_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "workers": self.worker_count,
+            "counters": dict(self._counters),
+            "queue_wait_seconds": percentiles([wait for wait, _ in self._latencies]),
+            "run_seconds": percentiles([run for _, run in self._latencies]),
+        }
+
+    def _metrics_rows(self):
+        rows = self._execute("SELECT status, priority, COUNT(*) AS total FROM jobs GROUP BY status, priority")
+        oldest = self._execute("SELECT MIN(created_at) AS oldest FROM jobs WHERE status = 'queued'")[0]["oldest"]
+        return rows, oldest
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        rows = self._execute(
+            "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, heartbeat_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority, created_at LIMIT 1) "
+            "AND status = 'queued' RETURNING *",
+            (now, self._owner, now),
+        )
+        return rows[0] if rows else None
+
+    def _requeue_stale(self) -> int:
+        """Re-queues running jobs whose process stopped renewing their heartbeat."""
+        with self._db_lock:
+            return self._connection().execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (time.time() - self._STALE_AFTER_SECONDS,),
+            ).rowcount
+
+    def _purge_finished(self) -> int:
+        """Deletes up to _PURGE_BATCH jobs that finished more than result_ttl_seconds ago."""
+        with self._db_lock:
+            return self._connection().execute(
+                "DELETE FROM jobs WHERE id IN ("
+                "SELECT id FROM jobs WHERE finished_at < ? ORDER BY finished_at LIMIT ?)",
+                (time.time() - self.result_ttl_seconds, self._PURGE_BATCH),
+            ).rowcount
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self._HEARTBEAT_SECONDS)
+            await asyncio.to_thread(
+                self._execute,
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                (time.time(), self._owner),
+            )
+            if await asyncio.to_thread(self._requeue_stale):
+                self._work_available.set()
+
+    async def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        # A job re-queued as stale meanwhile belongs to whoever claimed it next.
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND owner = ?",
+            (status, orjson.dumps(result) if result is not None else None, error, time.time(), job_id, self._owner),
+        )
+        self._secrets.pop(job_id, None)
+        self._counters[status] += 1
+        event = self._waiters.get(job_id)
+        if event is not None:
+            event.set()
+
+    async def _worker(self):
+        while True:
+            # Cleared before claiming, so a submit made while the claim runs is not missed.
+            self._work_available.clear()
+            row = await asyncio.to_thread(self._claim)
+            if row is None:
+                if self.result_ttl_seconds > 0 and time.time() >= self._next_purge_at:
+                    self._next_purge_at = time.time() + self._PURGE_INTERVAL_SECONDS
+                    if await asyncio.to_thread(self._purge_finished) == self._PURGE_BATCH:
+                        # More to delete: take the next batch on the next idle pass.
+                        self._next_purge_at = 0.0
+                try:
+                    await asyncio.wait_for(self._work_available.wait(), timeout=self._POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = row["id"]
+            started = time.time()
+            remaining = row["deadline_at"] - started
+            if remaining <= 0:
+                await self._finish(job_id, "expired", error="Job deadline passed before it started.")
+                continue
+            if row["has_secret"] and job_id not in self._secrets:
+                await self._finish(
+                    job_id, "failed", error="The job's API key was lost when the server restarted; submit the job again."
+                )
+                continue
+
+            try:
+                result = await asyncio.wait_for(
+                    self.runner(orjson.loads(row["payload"]), self._secrets.get(job_id), remaining),
+                    timeout=remaining,
+                )
+                await self._finish(job_id, "succeeded", result=result)
+            except asyncio.TimeoutError:
+                await self._finish(job_id, "expired", error="Job exceeded its deadline.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._finish(job_id, "failed", error=str(e))
+            finally:
+                self._latencies.append((started - row["created_at"], time.time() - started))
@@ -0,0 +1,194 @@
+import math
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    LANE_ANALYTICS_BUCKET_SECONDS,
+    LANE_ANALYTICS_BUCKETS,
+    LANE_ANALYTICS_RELATIVE_ACCURACY,
+)
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch-style). Any reported quantile is
+    within `relative_accuracy` of the true value; memory grows with the log of
+    the value range, not with the number of values. Values <= 0 share one bucket.
+    """
+
+    def __init__(self, relative_accuracy: float = LANE_ANALYTICS_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = round(q * (self.count - 1))
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms.
+                return round(2 * self.gamma ** index / (self.gamma + 1), 4)
+        return round(2 * self.gamma ** max(self.buckets) / (self.gamma + 1), 4)
+
+
+class LaneAggregate:
+    """Running totals, time buckets and sketches for one lane x HS chapter."""
+
+    def __init__(self):
+        self.count = 0
+        self.sources: Dict[str, int] = {}
+        self.duty_sum = 0.0
+        self.risk_sum = 0.0
+        self.value_sum = 0.0
+        self.first_seen = None
+        self.last_seen = None
+        # epoch bucket index -> [count, duty_sum, risk_sum, value_sum]
+        self.buckets: Dict[int, List[float]] = {}
+        self.duty = QuantileSketch()
+        self.risk = QuantileSketch()
+        self.value = QuantileSketch()
+
+    def add(self, source: str, duty_percent: float, risk_score: float, declared_value: float, now: float):
+        self.count += 1
+        self.sources[source] = self.sources.get(source, 0) + 1
+        self.duty_sum += duty_percent
+        self.risk_sum += risk_score
+        self.value_sum += declared_value
+        self.first_seen = self.first_seen or now
+        self.last_seen = now
+        self.duty.add(duty_percent)
+        self.risk.add(risk_score)
+        self.value.add(declared_value)
+
+        epoch = int(now // LANE_ANALYTICS_BUCKET_SECONDS)
+        bucket = self.buckets.get(epoch)
+        if bucket is None:
+            bucket = self.buckets[epoch] = [0, 0.0, 0.0, 0.0]
+            oldest_kept = epoch - LANE_ANALYTICS_BUCKETS + 1
+            for stale in [key for key in self.buckets if key < oldest_kept]:
+                del self.buckets[stale]
+        bucket[0] += 1
+        bucket[1] += duty_percent
+        bucket[2] += risk_score
+        bucket[3] += declared_value
+
+    def window(self, seconds: float, now: float) -> Tuple[int, float, float, float]:
+        first_epoch = int((now - seconds) // LANE_ANALYTICS_BUCKET_SECONDS) + 1
+        totals = [0, 0.0, 0.0, 0.0]
+        for epoch, bucket in self.buckets.items():
+            if epoch >= first_epoch:
+                for idx in range(4):
+                    totals[idx] += bucket[idx]
+        return tuple(totals)
+
+
+class LaneAnalytics:
+    """
+    Per-process lane dashboard aggregates, updated as each analysis or
+    recalculation completes. Keys are (manufacturing country, destination
+    country, HS chapter), so reads cost O(lanes) regardless of how many
+    analyses have been recorded.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self._lanes: Dict[Tuple[str, str, str], LaneAggregate] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def hs_chapter(hs_code: str) -> str:
+        digits = "".join(char for char in str(hs_code or "") if char.isdigit())
+        return digits[:2] or "00"
+
+    def record(
+        self,
+        source: str,
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        duty_percent: float,
+        risk_score: float,
+        declared_value: float,
+        now: Optional[float] = None,
+    ):
+        key = (manufacturing_country, destination_country, self.hs_chapter(hs_code))
+        now = time.time() if now is None else now
+        with self._lock:
+            aggregate = self._lanes.get(key)
+            if aggregate is None:
+                aggregate = self._lanes[key] = LaneAggregate()
+            aggregate.add(source, float(duty_percent), float(risk_score), float(declared_value), now)
+
+    def _quantiles(self, sketch: QuantileSketch) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100)}": sketch.quantile(q) for q in self.QUANTILES}
+
+    def lanes(
+        self,
+        manufacturing_country: Optional[str] = None,
+        destination_country: Optional[str] = None,
+        hs_chapter: Optional[str] = None,
+        window_seconds: Optional[float] = None,
+        limit: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> List[Dict]:
+        now = time.time() if now is None else now
+        rows = []
+        with self._lock:
+            for (origin, destination, chapter), aggregate in self._lanes.items():
+                if manufacturing_country and origin != manufacturing_country:
+                    continue
+                if destination_country and destination != destination_country:
+                    continue
+                if hs_chapter and chapter != hs_chapter:
+                    continue
+
+                count = aggregate.count
+                row = {
+                    "manufacturing_country": origin,
+                    "destination_country": destination,
+                    "hs_chapter": chapter,
+                    "count": count,
+                    "sources": dict(aggregate.sources),
+                    "avg_duty_percent": round(aggregate.duty_sum / count, 2),
+                    "avg_risk_score": round(aggregate.risk_sum / count, 2),
+                    "avg_declared_value": round(aggregate.value_sum / count, 2),
+                    "total_declared_value": round(aggregate.value_sum, 2),
+                    "duty_percent_quantiles": self._quantiles(aggregate.duty),
+                    "risk_score_quantiles": self._quantiles(aggregate.risk),
+                    "declared_value_quantiles": self._quantiles(aggregate.value),
+                    "first_seen": aggregate.first_seen,
+                    "last_seen": aggregate.last_seen,
+                }
+                if window_seconds:
+                    window_count, duty_sum, risk_sum, value_sum = aggregate.window(window_seconds, now)
+                    if window_count == 0:
+                        continue
+                    row["window"] = {
+                        "seconds": window_seconds,
+                        "count": window_count,
+                        "avg_duty_percent": round(duty_sum / window_count, 2),
+                        "avg_risk_score": round(risk_sum / window_count, 2),
+                        "total_declared_value": round(value_sum, 2),
+                    }
+                rows.append(row)
+
+        sort_key = (lambda row: row["window"]["count"]) if window_seconds else (lambda row: row["count"])
+        rows.sort(key=sort_key, reverse=True)
+        return rows[:limit] if limit else rows
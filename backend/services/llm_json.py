@@ -0,0 +1,300 @@
+"""
+Incremental parsing and repair of JSON returned by the LLM.
+
+IncrementalJSONParser is fed completion text as it streams in and reports
+top-level fields of the root object as soon as each value is complete, so
+callers can start work on e.g. `hs_code` before the rest of the object has
+arrived. repair_json recovers fenced, prefixed, trailing-comma or truncated
+output instead of failing the request.
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import LLM_STREAM_RESPONSES
+
+_CLOSERS = {"{": "}", "[": "]"}
+_MAX_REPAIR_ATTEMPTS = 64
+
+
+class IncrementalJSONParser:
+    """Streaming scanner for the root object's top-level `"key": value` pairs."""
+
+    def __init__(self, watch: Optional[Iterable[str]] = None):
+        self.watch = set(watch) if watch is not None else None
+        self._pieces: List[str] = []
+        self._value: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._phase = "root"  # root -> key -> colon -> value -> after -> done
+        self._key_chars: List[str] = []
+        self._key: Optional[str] = None
+        self._value_open = False
+        self.fields: Dict[str, Any] = {}
+
+    @property
+    def text(self) -> str:
+        return "".join(self._pieces)
+
+    def _complete_value(self, completed: List[Tuple[str, Any]]):
+        raw = "".join(self._value).strip()
+        self._value = []
+        self._value_open = False
+        if self._key is None or not raw:
+            return
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        self.fields[self._key] = value
+        if self.watch is None or self._key in self.watch:
+            completed.append((self._key, value))
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consumes a chunk; returns the (key, value) pairs it completed."""
+        self._pieces.append(chunk)
+        completed: List[Tuple[str, Any]] = []
+
+        for char in chunk:
+            if self._phase in ("root", "done"):
+                if self._phase == "root" and char == "{":
+                    self._depth, self._phase = 1, "key"
+                continue
+
+            capturing = self._phase == "value" and self._value_open
+            if capturing:
+                self._value.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._phase == "key":
+                        self._key = json.loads('"' + "".join(self._key_chars) + '"')
+                        self._phase = "colon"
+                    elif self._depth == 1 and self._phase == "value":
+                        self._complete_value(completed)
+                        self._phase = "after"
+                    continue
+                if self._depth == 1 and self._phase == "key":
+                    self._key_chars.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._phase == "key":
+                    self._key_chars = []
+                elif self._depth == 1 and self._phase == "value" and not self._value_open:
+                    self._value_open = True
+                    self._value.append(char)
+            elif char in "{[":
+                if self._depth == 1 and self._phase == "value" and not self._value_open:
+                    self._value_open = True
+                    self._value.append(char)
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._phase == "value":
+                    self._complete_value(completed)
+                    self._phase = "after"
+                elif self._depth == 0:
+                    if self._phase == "value":
+                        self._value.pop()  # the root's closing brace
+                        self._complete_value(completed)
+                    self._phase = "done"
+            elif self._depth == 1:
+                if char == ":" and self._phase == "colon":
+                    self._phase = "value"
+                elif char == ",":
+                    if self._phase == "value":
+                        self._value.pop()
+                        self._complete_value(completed)
+                    self._phase, self._key = "key", None
+                elif self._phase == "value" and not self._value_open and not char.isspace():
+                    self._value_open = True
+                    self._value.append(char)
+
+        return completed
+
+
+def strip_fences(text: str) -> str:
+    """Drops markdown fences and any prose around the outermost JSON value."""
+    text = (text or "").strip()
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return text
+    text = text[min(starts):]
+    fence = text.rfind("```")
+    if fence > 0:
+        text = text[:fence]
+    return text.strip()
+
+
+def _close_open_structures(text: str, complete_tail: bool = False) -> Optional[str]:
+    """
+    Closes an unterminated string and open containers and drops trailing
+    commas. Returns None when the text ends inside a number or literal,
+    unless complete_tail says that token is known to be whole (the text was
+    cut at a separator that followed it).
+    """
+    output: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+
+    for char in text:
+        if in_string:
+            output.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in "}]":
+            while output and output[-1].isspace():
+                output.pop()
+            if output and output[-1] == ",":
+                output.pop()
+            if stack:
+                stack.pop()
+        output.append(char)
+
+    if in_string:
+        if escape:
+            output.pop()
+        output.append('"')
+
+    closed = "".join(output).rstrip()
+    if not complete_tail and not in_string and closed and (closed[-1].isalnum() or closed[-1] in ".+-"):
+        # A bare number or literal cut mid-token cannot be trusted; drop it.
+        return None
+    if closed.endswith(","):
+        closed = closed[:-1]
+    elif closed.endswith(":"):
+        closed += " null"
+    return closed + "".join(reversed(stack))
+
+
+def _last_separator(text: str) -> int:
+    """Index of the last comma outside a string, or -1."""
+    last = -1
+    in_string = escape = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            last = index
+    return last
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parses LLM output, repairing fences, trailing commas and truncation. A
+    truncated trailing member is dropped back to the previous complete one.
+    Raises ValueError if nothing parseable remains.
+    """
+    candidate = strip_fences(text)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+
+    cut_at_separator = False
+    for _ in range(_MAX_REPAIR_ATTEMPTS):
+        closed = _close_open_structures(candidate, complete_tail=cut_at_separator)
+        if closed is not None:
+            try:
+                return json.loads(closed)
+            except json.JSONDecodeError:
+                pass
+        cut = _last_separator(candidate)
+        if cut <= 0:
+            break
+        candidate = candidate[:cut]
+        cut_at_separator = True
+
+    raise ValueError("AI returned invalid JSON format.")
+
+
+def _delta_content(chunk) -> Optional[str]:
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return None
+    delta = getattr(choices[0], "delta", None)
+    return getattr(delta, "content", None)
+
+
+async def complete_json(
+    client,
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: Any = None,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+    watch: Optional[Iterable[str]] = None,
+    stream: bool = LLM_STREAM_RESPONSES,
+    timeout: Optional[float] = None,
+) -> Any:
+    """
+    Runs a chat completion off the event loop and returns its repaired JSON.
+
+    When streaming, on_field(key, value) is called on the event loop as each
+    watched top-level field of the root object completes. timeout (seconds)
+    bounds the whole call, stream included, and raises TimeoutError.
+    """
+    loop = asyncio.get_running_loop()
+    parser = IncrementalJSONParser(watch=watch)
+    abandoned = threading.Event()
+    options = {} if timeout is None else {"timeout": timeout}
+
+    def publish(completed):
+        if on_field is not None and not abandoned.is_set():
+            for key, value in completed:
+                loop.call_soon_threadsafe(on_field, key, value)
+
+    def consume() -> str:
+        if not stream:
+            response = client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **options
+            )
+            publish(parser.feed(response.choices[0].message.content or ""))
+            return parser.text
+        chunks = client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True, **options
+        )
+        try:
+            for chunk in chunks:
+                if abandoned.is_set():
+                    break
+                content = _delta_content(chunk)
+                if content:
+                    publish(parser.feed(content))
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        return parser.text
+
+    try:
+        text = await asyncio.wait_for(asyncio.to_thread(consume), timeout)
+    except asyncio.TimeoutError:
+        # The worker thread stops reading at its next chunk.
+        abandoned.set()
+        raise
+    return repair_json(text)
@@ -0,0 +1,335 @@
+"""
+Latency-aware routing over several OpenAI-compatible endpoints.
+
+LLM_ENDPOINTS is a JSON list of endpoints, e.g.
+
+    [{"name": "groq", "base_url": "https://api.groq.com/openai/v1"},
+     {"name": "backup", "base_url": "http://10.0.0.5:8000/v1", "api_key": "local",
+      "models": {"llama-3.3-70b-versatile": "llama-3.3-70b"}}]
+
+Each endpoint may set "api_key" or "api_key_env" (default GROQ_API_KEY),
+"models" to rename requested models, and, for the replay/synthetic
+transports, "latency_ms" and "error_rate" to simulate it.
+
+Every call goes to the endpoint with the lowest latency EWMA, penalised by its
+recent error rate; endpoints with no samples are tried first. If the call has
+not answered (first chunk, when streaming) by the endpoint's LLM_HEDGE_PERCENTILE
+latency, a hedged duplicate goes to the next-best endpoint. The first answer
+wins and the loser's stream is closed. A failed call fails over to the next
+endpoint. Statistics are shared by every router in the process, so
+per-request-key routers learn from each other.
+"""
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+from config import (
+    GROQ_API_KEY,
+    LLM_ENDPOINTS,
+    LLM_HEDGE_DEFAULT_DELAY_MS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY_MS,
+    LLM_HEDGE_PERCENTILE,
+    LLM_TRANSPORT,
+)
+from services.llm_transport import TransportClient, _Completions
+
+_ERROR_PENALTY = 4.0
+_EXPLORE_RATE = 0.02
+_MIN_SAMPLES_FOR_PERCENTILE = 20
+
+
+class _LatencyTracker:
+    __slots__ = ("ewma", "samples")
+
+    def __init__(self, window: int = 256):
+        self.ewma: Optional[float] = None
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float, weight: float = 0.2):
+        self.ewma = seconds if self.ewma is None else self.ewma * (1 - weight) + seconds * weight
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < _MIN_SAMPLES_FOR_PERCENTILE:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class EndpointStats:
+    """Latency (time to first chunk when streaming, else total) and error rate of one endpoint."""
+
+    def __init__(self, error_half_life: float = 30.0):
+        self._lock = Lock()
+        self.latency = {True: _LatencyTracker(), False: _LatencyTracker()}
+        self._error_rate = 0.0
+        self._error_updated = time.monotonic()
+        self._error_half_life = error_half_life
+        self.in_flight = 0
+        self.counters = {"calls": 0, "errors": 0, "hedges": 0, "wins": 0, "cancelled": 0}
+
+    def error_rate(self) -> float:
+        # Decays while idle, so a recovered endpoint gets traffic again.
+        elapsed = time.monotonic() - self._error_updated
+        return self._error_rate * 0.5 ** (elapsed / self._error_half_life)
+
+    def _update_error(self, failed: bool, weight: float = 0.2):
+        self._error_rate = self.error_rate() * (1 - weight) + (weight if failed else 0.0)
+        self._error_updated = time.monotonic()
+
+    def started(self, hedge: bool):
+        with self._lock:
+            self.in_flight += 1
+            self.counters["calls"] += 1
+            if hedge:
+                self.counters["hedges"] += 1
+
+    def succeeded(self, stream: bool, seconds: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.latency[stream].observe(seconds)
+            self._update_error(False)
+
+    def failed(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters["errors"] += 1
+            self._update_error(True)
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def score(self, stream: bool) -> float:
+        ewma = self.latency[stream].ewma
+        if ewma is None:
+            return 0.0
+        return ewma * (1 + _ERROR_PENALTY * self.error_rate()) * (1 + 0.1 * self.in_flight)
+
+    def hedge_delay(self, stream: bool) -> float:
+        observed = self.latency[stream].percentile(LLM_HEDGE_PERCENTILE)
+        if observed is None:
+            return LLM_HEDGE_DEFAULT_DELAY_MS / 1000
+        return max(LLM_HEDGE_MIN_DELAY_MS / 1000, observed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        def latency(tracker: _LatencyTracker):
+            def percentile(q):
+                value = tracker.percentile(q)
+                return round(value * 1000, 1) if value is not None else None
+
+            return {
+                "ewma_ms": round(tracker.ewma * 1000, 1) if tracker.ewma is not None else None,
+                "p50_ms": percentile(0.5),
+                "p95_ms": percentile(0.95),
+                "samples": len(tracker.samples),
+            }
+
+        with self._lock:
+            return {
+                **self.counters,
+                "in_flight": self.in_flight,
+                "error_rate": round(self.error_rate(), 4),
+                "stream": latency(self.latency[True]),
+                "complete": latency(self.latency[False]),
+            }
+
+
+# Shared by every router in the process, keyed by endpoint name.
+_STATS: Dict[str, EndpointStats] = {}
+_STATS_LOCK = Lock()
+
+
+def endpoint_stats(name: str) -> EndpointStats:
+    with _STATS_LOCK:
+        stats = _STATS.get(name)
+        if stats is None:
+            stats = _STATS[name] = EndpointStats()
+        return stats
+
+
+def endpoint_metrics() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        items = list(_STATS.items())
+    return {name: stats.snapshot() for name, stats in items}
+
+
+def load_endpoint_specs(raw: str = LLM_ENDPOINTS) -> List[Dict[str, Any]]:
+    if not raw:
+        return []
+    specs = json.loads(raw)
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) and spec.get("base_url") for spec in specs):
+        raise ValueError("LLM_ENDPOINTS must be a JSON list of objects with at least a base_url.")
+    names = [spec.get("name") or spec["base_url"] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("LLM_ENDPOINTS names must be unique.")
+    return specs
+
+
+class Endpoint:
+    def __init__(self, name: str, client, models: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.client = client
+        self.models = models or {}
+        self.stats = endpoint_stats(name)
+
+    def model_for(self, requested: str) -> str:
+        return self.models.get(requested, requested)
+
+
+def _endpoint_key(spec: Dict[str, Any], request_api_key: Optional[str]) -> Optional[str]:
+    if spec.get("api_key"):
+        return spec["api_key"]
+    env_name = spec.get("api_key_env", "GROQ_API_KEY")
+    if env_name == "GROQ_API_KEY":
+        # A per-request key replaces the default Groq credentials.
+        return request_api_key or GROQ_API_KEY
+    return os.getenv(env_name)
+
+
+def build_endpoints(specs: List[Dict[str, Any]], api_key: Optional[str] = None, mode: str = LLM_TRANSPORT) -> List[Endpoint]:
+    endpoints = []
+    for spec in specs:
+        name = spec.get("name") or spec["base_url"]
+        key = _endpoint_key(spec, api_key)
+        if mode == "live":
+            if not key:
+                continue
+            from openai import OpenAI
+
+            # The router does its own failover, so the SDK should not retry.
+            client = OpenAI(api_key=key, base_url=spec["base_url"], max_retries=0)
+        else:
+            if mode == "record" and not key:
+                continue
+            simulated = {}
+            if "latency_ms" in spec:
+                simulated["latency_spec"] = str(spec["latency_ms"])
+            if "error_rate" in spec:
+                simulated["error_rate"] = float(spec["error_rate"])
+            client = TransportClient(mode, api_key=key, base_url=spec["base_url"], **simulated)
+        endpoints.append(Endpoint(name, client, spec.get("models")))
+    if not endpoints:
+        raise RuntimeError("No endpoint in LLM_ENDPOINTS has an API key.")
+    return endpoints
+
+
+def _relay(response, iterator, first):
+    try:
+        if first is not None:
+            yield first
+        yield from iterator
+    finally:
+        close = getattr(response, "close", None)
+        if close is not None:
+            close()
+
+
+def _discard(future: Future):
+    """Done-callback for a losing attempt: close its stream if it opened one."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if isinstance(result, tuple):
+        close = getattr(result[0], "close", None)
+        if close is not None:
+            close()
+
+
+class LLMRouter:
+    """OpenAI-compatible client that routes each completion across endpoints."""
+
+    # Attempts block on HTTP; hedges need their own threads next to the caller's.
+    _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-route")
+
+    def __init__(self, endpoints: List[Endpoint], hedge: bool = LLM_HEDGE_ENABLED, seed: Optional[int] = None):
+        self.endpoints = endpoints
+        self.hedge = hedge and len(endpoints) > 1
+        self._rng = random.Random(seed)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def ranked(self, stream: bool) -> List[Endpoint]:
+        ranked = sorted(self.endpoints, key=lambda endpoint: endpoint.stats.score(stream))
+        if len(ranked) > 1 and self._rng.random() < _EXPLORE_RATE:
+            # Occasionally lead with another endpoint so its statistics stay fresh.
+            ranked.insert(0, ranked.pop(self._rng.randrange(1, len(ranked))))
+        return ranked
+
+    @staticmethod
+    def _attempt(endpoint: Endpoint, kwargs: Dict[str, Any], stream: bool, hedge: bool):
+        endpoint.stats.started(hedge)
+        started = time.perf_counter()
+        try:
+            response = endpoint.client.chat.completions.create(
+                **{**kwargs, "model": endpoint.model_for(kwargs["model"])}, stream=stream
+            )
+            if stream:
+                iterator = iter(response)
+                response = (response, iterator, next(iterator, None))
+        except Exception:
+            endpoint.stats.failed()
+            raise
+        endpoint.stats.succeeded(stream, time.perf_counter() - started)
+        return response
+
+    def create(self, stream: bool = False, **kwargs):
+        queue = self.ranked(stream)
+        pending: Dict[Future, Endpoint] = {}
+
+        def launch(hedge: bool = False):
+            endpoint = queue.pop(0)
+            pending[self._executor.submit(self._attempt, endpoint, kwargs, stream, hedge)] = endpoint
+            return endpoint
+
+        primary = launch()
+        hedge_at = time.monotonic() + primary.stats.hedge_delay(stream) if self.hedge else None
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            timeout = None
+            if hedge_at is not None and queue:
+                timeout = max(0.0, hedge_at - time.monotonic())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                launch(hedge=True)
+                hedge_at = None
+                continue
+
+            winner = None
+            for future in done:
+                endpoint = pending.pop(future)
+                if winner is not None:
+                    _discard(future)
+                elif future.exception() is not None:
+                    last_error = future.exception()
+                else:
+                    winner = (endpoint, future.result())
+
+            if winner is None:
+                if not pending and queue:
+                    launch()  # fail over
+                continue
+
+            endpoint, result = winner
+            endpoint.stats.count("wins")
+            for loser, loser_endpoint in pending.items():
+                loser_endpoint.stats.count("cancelled")
+                if not loser.cancel():
+                    loser.add_done_callback(_discard)
+            if stream:
+                return _relay(*result)
+            return result
+
+        raise last_error
+
+
+def create_router(api_key: Optional[str] = None, mode: str = LLM_TRANSPORT) -> LLMRouter:
+    return LLMRouter(build_endpoints(load_endpoint_specs(), api_key=api_key, mode=mode))
@@ -0,0 +1,418 @@
+"""
+Pluggable transport for OpenAI-compatible chat completions.
+
+LLM_TRANSPORT selects how AIService and TradeIntelService reach the model:
+- live:      call the configured endpoint (default).
+- record:    call the endpoint and save each request/response pair as a cassette.
+- replay:    answer from cassettes with simulated latency and injected errors.
+- synthetic: generate schema-valid JSON for the classification, trade-intel and
+             vision prompts without any network access.
+
+With LLM_ENDPOINTS set, create_llm_client returns an LLMRouter over several
+endpoints instead (services/llm_router.py); each endpoint uses the mode above.
+
+Every client exposes client.chat.completions.create(**kwargs) and returns an
+object with choices[0].message.content, like the OpenAI SDK. With stream=True
+it returns an iterator of chunks with choices[0].delta.content instead.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from config import (
+    GROQ_BASE_URL,
+    LLM_CASSETTE_DIR,
+    LLM_ENDPOINTS,
+    LLM_REPLAY_ERROR_RATE,
+    LLM_REPLAY_FALLBACK,
+    LLM_REPLAY_LATENCY_MS,
+    LLM_REPLAY_SEED,
+    LLM_TRANSPORT,
+)
+
+TRANSPORT_MODES = {"live", "record", "replay", "synthetic"}
+
+# Simulated streams deliver the first delta after this share of the sampled
+# latency and the rest in evenly spaced chunks of this many characters.
+_STREAM_FIRST_TOKEN_FRACTION = 0.3
+_STREAM_CHUNK_CHARS = 16
+
+
+class LLMTransportError(RuntimeError):
+    pass
+
+
+class InjectedLLMError(LLMTransportError):
+    """Raised by replay mode to simulate upstream failures."""
+
+
+class LLMTimeoutError(LLMTransportError, TimeoutError):
+    """Raised by replay/synthetic mode when the sampled latency exceeds the request timeout."""
+
+
+def requires_api_key(mode: str = LLM_TRANSPORT) -> bool:
+    # With LLM_ENDPOINTS each endpoint carries its own credentials.
+    return mode in {"live", "record"} and not LLM_ENDPOINTS
+
+
+def _completion(content: str, model: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))],
+    )
+
+
+def _stream_chunk(content: Optional[str], model: str, finish_reason: Optional[str] = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason=finish_reason, delta=SimpleNamespace(role="assistant", content=content))],
+    )
+
+
+def _canonical_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replaces inline image data with its digest so cassettes stay small."""
+    canonical = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts = []
+            for part in content:
+                if part.get("type") == "image_url":
+                    url = str((part.get("image_url") or {}).get("url", ""))
+                    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+                    parts.append({"type": "image_url", "image_sha256": digest})
+                else:
+                    parts.append(part)
+            content = parts
+        canonical.append({"role": message.get("role"), "content": content})
+    return canonical
+
+
+def request_key(model: str, messages: List[Dict[str, Any]], temperature: Any = None) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": _canonical_messages(messages), "temperature": temperature},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    texts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(str(part.get("text", "")) for part in content if part.get("type") == "text")
+    return "\n".join(texts)
+
+
+def _has_image(messages: List[Dict[str, Any]]) -> bool:
+    return any(
+        isinstance(message.get("content"), list)
+        and any(part.get("type") == "image_url" for part in message["content"])
+        for message in messages
+    )
+
+
+class LatencyModel:
+    """
+    Parses LLM_REPLAY_LATENCY_MS: "250", "fixed:250", "uniform:100,400",
+    "normal:300,80" or "lognormal:5.6,0.4" (parameters of the underlying normal).
+    """
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.rng = rng
+        kind, _, params = str(spec or "0").partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        self.kind = kind.strip().lower()
+        self.params = [float(value) for value in params.split(",") if value.strip()]
+        if self.kind not in {"fixed", "uniform", "normal", "lognormal"}:
+            raise ValueError(f"Unknown latency distribution '{self.kind}'")
+
+    def sample_ms(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(self.params[0], self.params[1]))
+        return self.rng.lognormvariate(self.params[0], self.params[1])
+
+
+class SyntheticResponder:
+    """Deterministic, schema-valid responses for the prompts this backend sends."""
+
+    _HS_PATTERN = re.compile(r"Supported HS codes for this system:\s*(.+)")
+    _PRODUCT_PATTERN = re.compile(r"Product(?: Name)?:\s*(.+)")
+    _LANE_PATTERN = re.compile(r"Lane:\s*([A-Z]{2})\s*->\s*([A-Z]{2})")
+
+    def respond(self, model: str, messages: List[Dict[str, Any]]) -> str:
+        text = _prompt_text(messages)
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+        if _has_image(messages):
+            return self._vision(text, rng)
+        if "trade operations analyst" in text:
+            return json.dumps(self._trade_intel(text, rng))
+        return json.dumps(self._classification(text, rng))
+
+    def _product(self, text: str) -> str:
+        match = self._PRODUCT_PATTERN.search(text)
+        return match.group(1).strip() if match else "product"
+
+    def _vision(self, text: str, rng: random.Random) -> str:
+        hint = text.split("\n", 1)[0].replace("Product name hint:", "").strip() or "product"
+        material = rng.choice(["cotton", "polyester", "aluminium", "ABS plastic", "stainless steel"])
+        return (
+            f"A {hint} made primarily of {material}, intended for consumer use, "
+            "with stitched/moulded construction and no electronic components."
+        )
+
+    def _classification(self, text: str, rng: random.Random) -> Dict[str, Any]:
+        match = self._HS_PATTERN.search(text)
+        codes = [code.strip() for code in match.group(1).split(",")] if match else []
+        codes = [code for code in codes if re.fullmatch(r"\d{4}(\.\d{2})?", code)] or ["6109.10"]
+
+        count = rng.randint(1, 4)
+        raw = [rng.randint(10, 60) for _ in range(count)]
+        percentages = [round(100 * value / sum(raw), 2) for value in raw]
+        percentages[-1] = round(100 - sum(percentages[:-1]), 2)
+        origins = ["CN", "IN", "VN", "BD", "US", "DE", "MX", "BR"]
+        names = ["cotton", "polyester", "elastane", "steel", "aluminium", "plastic", "rubber", "glass"]
+
+        return {
+            "hs_code": rng.choice(codes),
+            "confidence": round(rng.uniform(0.6, 0.97), 2),
+            "explanation": f"Synthetic classification for {self._product(text)}.",
+            "materials": [
+                {
+                    "id": f"mat-{idx + 1}",
+                    "name": rng.choice(names),
+                    "percentage": percentages[idx],
+                    "origin_country": rng.choice(origins),
+                    "stage": "raw_material",
+                }
+                for idx in range(count)
+            ],
+        }
+
+    def _trade_intel(self, text: str, rng: random.Random) -> Dict[str, Any]:
+        lane = self._LANE_PATTERN.search(text)
+        route = f"{lane.group(1)} -> {lane.group(2)}" if lane else "origin -> destination"
+        return {
+            "recent_insights": [
+                {"title": title, "detail": f"Synthetic {title.lower()} signal for {route}."}
+                for title in ("Duty outlook", "Capacity signal", "Compliance watch")
+            ],
+            "shipping_options": [
+                {
+                    "mode": mode,
+                    "route": route,
+                    "eta_days": eta,
+                    "estimated_cost_usd": round(rng.uniform(low, high), 2),
+                    "risk_level": rng.choice(["Low", "Medium", "High"]),
+                    "notes": f"Synthetic {mode.lower()} option.",
+                }
+                for mode, eta, low, high in (("SEA", 30, 900, 2500), ("AIR", 7, 2500, 7000), ("RAIL", 18, 1500, 3500))
+            ],
+            "compliance_checks": [
+                {"item": item, "status": rng.choice(["pass", "warn", "action_required"]), "note": "Synthetic check."}
+                for item in ("HS classification", "Origin declarations", "Shipment documents")
+            ],
+        }
+
+
+class _Completions:
+    def __init__(self, transport: "TransportClient"):
+        self._transport = transport
+
+    def create(self, **kwargs):
+        return self._transport.create(**kwargs)
+
+
+class TransportClient:
+    def __init__(
+        self,
+        mode: str,
+        api_key: Optional[str] = None,
+        base_url: str = GROQ_BASE_URL,
+        cassette_dir: Path = LLM_CASSETTE_DIR,
+        latency_spec: str = LLM_REPLAY_LATENCY_MS,
+        error_rate: float = LLM_REPLAY_ERROR_RATE,
+        replay_fallback: str = LLM_REPLAY_FALLBACK,
+        seed: Optional[int] = LLM_REPLAY_SEED,
+    ):
+        if mode not in TRANSPORT_MODES:
+            raise ValueError(f"Unknown LLM_TRANSPORT '{mode}'. Use one of: {', '.join(sorted(TRANSPORT_MODES))}")
+        self.mode = mode
+        self.cassette_dir = Path(cassette_dir)
+        self.error_rate = error_rate
+        self.replay_fallback = replay_fallback
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._latency = LatencyModel(latency_spec, self._rng)
+        self._synthetic = SyntheticResponder()
+        self._live = None
+        if requires_api_key(mode):
+            from openai import OpenAI
+
+            self._live = OpenAI(api_key=api_key, base_url=base_url)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _cassette_path(self, key: str) -> Path:
+        return self.cassette_dir / f"{key}.json"
+
+    def _simulate_upstream(self, block: bool = True, timeout: Optional[float] = None) -> float:
+        """
+        Samples latency and injected failures. Blocks for the latency unless
+        the caller is streaming, in which case the delay is returned to spread
+        over the stream. A blocking call longer than timeout times out.
+        """
+        with self._rng_lock:
+            delay_ms = self._latency.sample_ms()
+            fail = self._rng.random() < self.error_rate
+        # The real SDK call is synchronous, so block the same way it would.
+        if block and timeout is not None and delay_ms / 1000 > timeout:
+            time.sleep(timeout)
+            raise LLMTimeoutError(f"Simulated upstream latency {delay_ms:.0f} ms exceeded the {timeout:.3f} s timeout.")
+        if block and delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        if fail:
+            raise InjectedLLMError("Injected upstream error (LLM_REPLAY_ERROR_RATE).")
+        return delay_ms
+
+    def _save_cassette(
+        self,
+        key: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Any,
+        response_model: str,
+        content: str,
+        started: float,
+    ):
+        cassette = {
+            "request": {"model": model, "messages": _canonical_messages(messages), "temperature": temperature},
+            "response": {"model": response_model, "content": content},
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        self._cassette_path(key).write_text(json.dumps(cassette, indent=2), encoding="utf-8")
+
+    def _record_stream(self, key: str, model: str, messages: List[Dict[str, Any]], temperature: Any, stream, started: float):
+        pieces = []
+        response_model = model
+        for chunk in stream:
+            response_model = getattr(chunk, "model", None) or response_model
+            if chunk.choices and chunk.choices[0].delta.content:
+                pieces.append(chunk.choices[0].delta.content)
+            yield chunk
+        self._save_cassette(key, model, messages, temperature, response_model, "".join(pieces), started)
+
+    def _replay_stream(self, content: str, model: str, delay_ms: float):
+        """Yields content in small deltas, spreading the sampled latency over them."""
+        pieces = [content[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(content), _STREAM_CHUNK_CHARS)] or [""]
+        first_ms = delay_ms * _STREAM_FIRST_TOKEN_FRACTION
+        per_piece_ms = (delay_ms - first_ms) / len(pieces)
+        if first_ms > 0:
+            time.sleep(first_ms / 1000)
+        for piece in pieces:
+            if per_piece_ms > 0:
+                time.sleep(per_piece_ms / 1000)
+            yield _stream_chunk(piece, model)
+        yield _stream_chunk(None, model, finish_reason="stop")
+
+    def create(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Any = None,
+        stream: bool = False,
+        timeout: Optional[float] = None,
+        **kwargs
+    ):
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        if self.mode == "live":
+            return self._live.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, stream=stream, **kwargs
+            )
+
+        key = request_key(model, messages, temperature)
+
+        if self.mode == "record":
+            started = time.perf_counter()
+            response = self._live.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, stream=stream, **kwargs
+            )
+            if stream:
+                return self._record_stream(key, model, messages, temperature, response, started)
+            self._save_cassette(
+                key, model, messages, temperature,
+                getattr(response, "model", model), response.choices[0].message.content, started,
+            )
+            return response
+
+        delay_ms = self._simulate_upstream(block=not stream, timeout=timeout)
+
+        content = None
+        if self.mode == "replay":
+            path = self._cassette_path(key)
+            if path.exists():
+                cassette = json.loads(path.read_text(encoding="utf-8"))
+                content, model = cassette["response"]["content"], cassette["response"].get("model", model)
+            elif self.replay_fallback != "synthetic":
+                raise LLMTransportError(f"No recorded response for request {key[:12]} in {self.cassette_dir}.")
+
+        if content is None:
+            content = self._synthetic.respond(model, messages)
+        if stream:
+            return self._replay_stream(content, model, delay_ms)
+        return _completion(content, model)
+
+
+def open_connections(client) -> int:
+    """
+    Opens a pooled connection to every live upstream behind `client` (one per
+    router endpoint) with a cheap models.list() call, so the first completion
+    does not pay for DNS, TCP and TLS setup. Returns how many were opened;
+    simulated transports have none.
+    """
+    endpoints = getattr(client, "endpoints", None)
+    clients = [endpoint.client for endpoint in endpoints] if endpoints is not None else [client]
+    opened = 0
+    for upstream in clients:
+        if isinstance(upstream, TransportClient):
+            upstream = upstream._live
+        if upstream is None or not hasattr(upstream, "models"):
+            continue
+        try:
+            upstream.models.list()
+            opened += 1
+        except Exception:
+            pass
+    return opened
+
+
+def create_llm_client(api_key: Optional[str] = None, mode: str = LLM_TRANSPORT, base_url: str = GROQ_BASE_URL):
+    """
+    Returns an OpenAI-compatible client for the configured transport mode, or
+    a router across LLM_ENDPOINTS when that is set.
+    """
+    if LLM_ENDPOINTS:
+        from services.llm_router import create_router
+
+        return create_router(api_key=api_key, mode=mode)
+    if mode == "live":
+        from openai import OpenAI
+
+        return OpenAI(api_key=api_key, base_url=base_url)
+    return TransportClient(mode, api_key=api_key, base_url=base_url)
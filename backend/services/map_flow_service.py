@@ -1,45 +1,136 @@
 import json
+import math
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core import state
+from core.analysis_records import MaterialRecord
+
+EARTH_RADIUS_KM = 6371.0088
 
 
 class MapFlowService:
+    """
+    Builds the globe payload for an analysis. Country names and coordinates
+    come from state.COUNTRY_COORDINATES (data/countries.json, ISO 3166-1).
+    Great-circle lane geometry is computed once per country pair and shared
+    across instances until the reference data changes.
+    """
+
+    ARC_SEGMENTS = 32
+
+    # Shared across instances; cleared whenever state.DATA_VERSION changes.
+    _lane_cache: Dict[Tuple[str, str], Optional[Dict]] = {}
+    _lane_cache_version = None
 
     def __init__(self):
         self.output_file = Path(__file__).resolve().parent.parent / "globe_data.json"
 
-        self.country_map = {
-            "US": "United States of America",
-            "IN": "India",
-            "CN": "China",
-            "DE": "Germany",
-            "JP": "Japan",
-            "KR": "South Korea",
-            "FR": "France",
-            "GB": "United Kingdom",
-            "IT": "Italy",
-            "CA": "Canada",
-            "BR": "Brazil",
-            "AU": "Australia"
-        }
-
     def resolve_country(self, code: str) -> str:
-        return self.country_map.get(code.upper(), code)
+        country = state.COUNTRY_COORDINATES.get(code.upper())
+        return country["name"] if country else code
+
+    @staticmethod
+    def _great_circle(lat1: float, lon1: float, lat2: float, lon2: float, segments: int):
+        """Returns (distance_km, [[lon, lat], ...]) along the shortest path."""
+        phi1, lam1, phi2, lam2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        a = (
+            math.sin((phi2 - phi1) / 2) ** 2
+            + math.cos(phi1) * math.cos(phi2) * math.sin((lam2 - lam1) / 2) ** 2
+        )
+        angle = 2 * math.asin(min(1.0, math.sqrt(a)))
+
+        start = (math.cos(phi1) * math.cos(lam1), math.cos(phi1) * math.sin(lam1), math.sin(phi1))
+        end = (math.cos(phi2) * math.cos(lam2), math.cos(phi2) * math.sin(lam2), math.sin(phi2))
+        sin_angle = math.sin(angle)
+
+        arc = []
+        for step in range(segments + 1):
+            t = step / segments
+            if sin_angle < 1e-12:
+                x, y, z = start
+            else:
+                w1 = math.sin((1 - t) * angle) / sin_angle
+                w2 = math.sin(t * angle) / sin_angle
+                x, y, z = (w1 * s + w2 * e for s, e in zip(start, end))
+            arc.append([
+                round(math.degrees(math.atan2(y, x)), 4),
+                round(math.degrees(math.atan2(z, math.hypot(x, y))), 4),
+            ])
+        return angle * EARTH_RADIUS_KM, arc
+
+    @classmethod
+    def lane_geometry(cls, origin: str, destination: str) -> Optional[Dict]:
+        """
+        Render-ready geometry for origin -> destination, or None when either
+        country has no coordinates. Cached per pair.
+        """
+        if cls._lane_cache_version != state.DATA_VERSION:
+            cls._lane_cache = {}
+            cls._lane_cache_version = state.DATA_VERSION
+
+        key = (origin.upper(), destination.upper())
+        if key in cls._lane_cache:
+            return cls._lane_cache[key]
+
+        start = state.COUNTRY_COORDINATES.get(key[0])
+        end = state.COUNTRY_COORDINATES.get(key[1])
+        lane = None
+        if start and end:
+            distance_km, arc = cls._great_circle(
+                start["latitude"], start["longitude"], end["latitude"], end["longitude"], cls.ARC_SEGMENTS
+            )
+            lane = {
+                "from": key[0],
+                "to": key[1],
+                "from_coordinates": [start["longitude"], start["latitude"]],
+                "to_coordinates": [end["longitude"], end["latitude"]],
+                "distance_km": round(distance_km, 1),
+                "arc": arc,
+            }
+        cls._lane_cache[key] = lane
+        return lane
+
+    @classmethod
+    def precompute_lanes(cls, countries: Iterable[str]) -> int:
+        """Warms the lane cache for every ordered pair of the given countries."""
+        codes = sorted({code.upper() for code in countries})
+        for origin in codes:
+            for destination in codes:
+                if origin != destination:
+                    cls.lane_geometry(origin, destination)
+        return len(cls._lane_cache)
+
+    def generate_lanes(
+        self,
+        manufacturing_country: str,
+        destination_country: str,
+        materials: Sequence[MaterialRecord]
+    ) -> Dict:
+        """
+        The outbound lane (factory -> destination) and one inbound lane per
+        distinct material origin (origin -> factory), from the lane cache.
+        """
+        origins = []
+        for material in materials or ():
+            origin = material.origin_country
+            if origin and origin != manufacturing_country and origin not in origins:
+                origins.append(origin)
+
+        inbound = [self.lane_geometry(origin, manufacturing_country) for origin in origins]
+        return {
+            "outbound": self.lane_geometry(manufacturing_country, destination_country),
+            "inbound": [lane for lane in inbound if lane is not None],
+        }
 
     def generate_map_flow(
         self,
         hs_code: str,
         manufacturing_country: str,
         destination_country: str,
-        materials: List[Dict]
+        materials: Sequence[MaterialRecord]
     ) -> List[Dict]:
-        material_name = "Unknown"
-        if materials:
-            first = materials[0]
-            if isinstance(first, dict):
-                material_name = first.get("name") or "Unknown"
-            else:
-                material_name = getattr(first, "name", "Unknown")
+        material_name = (materials[0].name if materials else None) or "Unknown"
 
         return [
             {
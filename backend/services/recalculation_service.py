@@ -0,0 +1,174 @@
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.analysis_records import MaterialRecord
+from services.currency_converter import CurrencyConverter
+from services.map_flow_service import MapFlowService
+from services.risk_engine import RiskEngine
+from services.tariff_engine import TariffEngine
+
+
+class RecalculationService:
+    """
+    Runs the tariff -> risk -> map stages for an analysis. Each stage output is
+    memoised in the analysis' stage cache under (stage, the exact inputs it
+    depends on), so a recalculation only reruns the stages whose inputs changed:
+
+    - tariff_rates:   hs_code, manufacturing_country, destination_country, as_of
+    - fx_quote:       currency, as_of
+    - tariff_summary: tariff_rates inputs + declared_value + fx_quote
+    - risk_score:     lane, total duty percent, distinct material origins
+    - map_flow:       hs_code, lane, first material name
+    - map_lanes:      manufacturing/destination country, material origins
+    """
+
+    STAGES = ("tariff_rates", "fx_quote", "tariff_summary", "risk_score", "map_flow", "map_lanes")
+    STAGE_CACHE_SIZE = 16
+
+    def __init__(
+        self,
+        tariff_engine: Optional[TariffEngine] = None,
+        risk_engine: Optional[RiskEngine] = None,
+        map_service: Optional[MapFlowService] = None,
+        currency_converter: Optional[CurrencyConverter] = None,
+    ):
+        self.tariff_engine = tariff_engine or TariffEngine()
+        self.currency_converter = currency_converter or CurrencyConverter()
+        self.risk_engine = risk_engine or RiskEngine()
+        self.map_service = map_service or MapFlowService()
+
+    def _stage(
+        self,
+        stage_cache: Dict[Tuple, Any],
+        name: str,
+        fingerprint: Tuple,
+        compute: Callable[[], Any],
+        recomputed: List[str],
+    ):
+        # One flat dict per analysis rather than one per stage: most analyses
+        # are never recalculated, and they are all kept in memory.
+        key = (name, fingerprint)
+        if key in stage_cache:
+            # Re-insert so the dict's insertion order doubles as LRU order.
+            output = stage_cache.pop(key)
+            stage_cache[key] = output
+            return output
+
+        output = compute()
+        stage_cache[key] = output
+        if len(stage_cache) > self.STAGE_CACHE_SIZE * len(self.STAGES):
+            stage_cache.pop(next(iter(stage_cache)))
+        recomputed.append(name)
+        return output
+
+    def _tariff_stages(
+        self,
+        stage_cache: Dict[Tuple, Any],
+        lane: Tuple,
+        as_of: date,
+        declared_value: float,
+        currency: str,
+        recomputed: List[str],
+    ):
+        rates = self._stage(
+            stage_cache, "tariff_rates", lane + (as_of,),
+            lambda: self.tariff_engine.resolve_rates(*lane, as_of=as_of),
+            recomputed,
+        )
+        fx = self._stage(
+            stage_cache, "fx_quote", (currency, as_of),
+            lambda: self.currency_converter.quote(currency, as_of),
+            recomputed,
+        )
+        return self._stage(
+            stage_cache, "tariff_summary", lane + (as_of, declared_value, fx),
+            lambda: self.tariff_engine.build_summary(rates, declared_value, fx),
+            recomputed,
+        )
+
+    def prime_tariff(
+        self,
+        stage_cache: Dict[Tuple, Any],
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        declared_value: float,
+        as_of: Optional[date] = None,
+        currency: str = "USD",
+    ) -> List[str]:
+        """
+        Runs only the tariff stages, e.g. as soon as the HS code is known and
+        before the materials are. A later evaluate() with the same inputs
+        reuses them. Returns the names of the stages it computed.
+        """
+        recomputed = []
+        lane = (hs_code, manufacturing_country, destination_country)
+        self._tariff_stages(stage_cache, lane, as_of or date.today(), declared_value, currency, recomputed)
+        return recomputed
+
+    def evaluate(
+        self,
+        stage_cache: Dict[Tuple, Any],
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        declared_value: float,
+        materials: Sequence[MaterialRecord],
+        as_of: Optional[date] = None,
+        currency: str = "USD",
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Returns ({tariff_summary, risk_score, map_flow, map_lanes}, names of recomputed stages).
+        Callers convert materials once with compact_materials() (core/analysis_records.py).
+        Tariffs and the exchange rate for declared_value's currency use the
+        versions in effect on as_of (default: today). Raises FxRateError when
+        the currency has no rate then.
+        """
+        recomputed = []
+        lane = (hs_code, manufacturing_country, destination_country)
+        tariff_summary = self._tariff_stages(
+            stage_cache, lane, as_of or date.today(), declared_value, currency, recomputed
+        )
+
+        material_origins = tuple(dict.fromkeys(m.origin_country for m in materials if m.origin_country))
+        origins = tuple(sorted(material_origins))
+        risk_score = self._stage(
+            stage_cache, "risk_score",
+            (manufacturing_country, destination_country, tariff_summary["total_duty_percent"], origins),
+            lambda: self.risk_engine.calculate_risk(
+                manufacturing_country=manufacturing_country,
+                destination_country=destination_country,
+                total_duty_percent=tariff_summary["total_duty_percent"],
+                materials=materials,
+            ),
+            recomputed,
+        )
+
+        first_material = materials[0].name if materials else None
+        map_flow = self._stage(
+            stage_cache, "map_flow", lane + (first_material,),
+            lambda: self.map_service.generate_map_flow(
+                hs_code=hs_code,
+                manufacturing_country=manufacturing_country,
+                destination_country=destination_country,
+                materials=materials,
+            ),
+            recomputed,
+        )
+
+        map_lanes = self._stage(
+            stage_cache, "map_lanes", (manufacturing_country, destination_country, material_origins),
+            lambda: self.map_service.generate_lanes(
+                manufacturing_country=manufacturing_country,
+                destination_country=destination_country,
+                materials=materials,
+            ),
+            recomputed,
+        )
+
+        return {
+            "tariff_summary": tariff_summary,
+            "risk_score": risk_score,
+            "map_flow": map_flow,
+            "map_lanes": map_lanes,
+        }, recomputed
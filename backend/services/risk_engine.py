@@ -1,39 +1,111 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
 from core import state
 
 
 class RiskEngine:
+    DEFAULT_COUNTRY_RISK = 50
+
+    # Shared across instances; rebuilt whenever state.COUNTRY_RISK changes.
+    _lane_snapshot = None
+    _lane_index = {}
+    _lane_matrix = None
+
+    @classmethod
+    def lane_risk_matrix(cls):
+        """
+        Returns (country -> row/column index, origin x destination base-risk matrix).
+        The last row/column holds the default risk for countries without data.
+        """
+        snapshot = tuple(state.COUNTRY_RISK.items())
+        if snapshot != cls._lane_snapshot:
+            country_risk = np.array(
+                [risk for _, risk in snapshot] + [cls.DEFAULT_COUNTRY_RISK],
+                dtype=np.float64,
+            )
+            cls._lane_matrix = country_risk[:, None] * 0.35 + country_risk[None, :] * 0.25
+            cls._lane_index = {code: idx for idx, (code, _) in enumerate(snapshot)}
+            cls._lane_snapshot = snapshot
+        return cls._lane_index, cls._lane_matrix
+
     @staticmethod
-    def _material_origin(material):
-        if isinstance(material, dict):
-            return material.get("origin_country")
-        return getattr(material, "origin_country", None)
+    def _sourcing_count(materials) -> int:
+        return len({material.origin_country for material in materials if material.origin_country})
 
-    def calculate_risk(
+    @staticmethod
+    def _round2(scores: np.ndarray) -> np.ndarray:
+        # rint(x * 100) / 100 is what np.round does; it can disagree with Python's
+        # round() only when x * 100 lands on a .5 boundary, so redo those exactly.
+        scaled = scores * 100
+        rounded = np.rint(scaled) / 100
+        ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+        for idx in ties:
+            rounded[idx] = round(float(scores[idx]), 2)
+        return rounded
+
+    def calculate_risk_batch(
         self,
-        manufacturing_country: str,
-        destination_country: str,
-        total_duty_percent: float,
-        materials: list
-    ) -> float:
+        manufacturing_countries: Sequence[str],
+        destination_countries: Sequence[str],
+        total_duty_percents: Sequence[float],
+        materials: Optional[Sequence[list]] = None,
+        sourcing_counts: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
         """
-        Returns a risk score between 0 and 100.
+        Columnar variant of calculate_risk. Pass either the materials (MaterialRecord,
+        core/analysis_records.py) of each row or the precomputed number of distinct
+        sourcing countries per row.
+        Returns a float64 array of scores identical to the scalar path.
         """
-        origin_risk = state.COUNTRY_RISK.get(manufacturing_country, 50)
-        destination_risk = state.COUNTRY_RISK.get(destination_country, 50)
+        index, matrix = self.lane_risk_matrix()
+        default_idx = len(index)
 
-        tariff_risk = total_duty_percent * 1.5
+        origin_idx = np.fromiter(
+            (index.get(code, default_idx) for code in manufacturing_countries),
+            dtype=np.intp,
+            count=len(manufacturing_countries),
+        )
+        destination_idx = np.fromiter(
+            (index.get(code, default_idx) for code in destination_countries),
+            dtype=np.intp,
+            count=len(destination_countries),
+        )
 
-        sourcing_countries = {
-            origin for origin in (self._material_origin(m) for m in materials) if origin
-        }
-        complexity_risk = len(sourcing_countries) * 5
+        if sourcing_counts is None:
+            sourcing_counts = [self._sourcing_count(row) for row in (materials or [])]
+        counts = np.asarray(sourcing_counts, dtype=np.int64)
+        duty = np.asarray(total_duty_percents, dtype=np.float64)
 
+        tariff_risk = duty * 1.5
+        complexity_risk = counts * 5
+
+        # Same operation order as the original scalar formula so floats match bit for bit.
         risk_score = (
-            origin_risk * 0.35 +
-            destination_risk * 0.25 +
+            matrix[origin_idx, destination_idx] +
             tariff_risk * 0.25 +
             complexity_risk * 0.15
         )
 
-        risk_score = max(0, min(100, risk_score))
-        return round(risk_score, 2)
+        risk_score = np.minimum(np.maximum(risk_score, 0.0), 100.0)
+        return self._round2(risk_score)
+
+    def calculate_risk(
+        self,
+        manufacturing_country: str,
+        destination_country: str,
+        total_duty_percent: float,
+        materials: list
+    ) -> float:
+        """
+        Returns a risk score between 0 and 100.
+        """
+        return float(
+            self.calculate_risk_batch(
+                [manufacturing_country],
+                [destination_country],
+                [total_duty_percent],
+                sourcing_counts=[self._sourcing_count(materials)],
+            )[0]
+        )
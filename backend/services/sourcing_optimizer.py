@@ -0,0 +1,266 @@
+import bisect
+import time
+from dataclasses import asdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from core import state
+from core.analysis_records import MaterialRecord
+from services.currency_converter import CurrencyConverter
+from services.risk_engine import RiskEngine
+from services.tariff_engine import TariffEngine
+
+
+class SourcingOptimizer:
+    """
+    Searches alternative origin_country assignments for the materials of an
+    analysis and returns the Pareto frontier of landed duty vs. risk.
+
+    - Landed duty: outbound duty (factory -> destination, fixed) plus inbound
+      duty on each material's value share (material origin -> factory).
+    - Risk: mean of the RiskEngine score of the outbound lane, whose complexity
+      term counts distinct material origins, and the value-weighted RiskEngine
+      score of each material's inbound lane.
+
+    The search is a depth-first branch-and-bound seeded with greedy
+    consolidations, bounded by a wall-clock budget.
+    """
+
+    DEFAULT_TIME_BUDGET_MS = 2000
+    _CLOCK_CHECK_INTERVAL = 256
+    _EPSILON = 1e-9
+    # Objectives are reported to 2 decimals; closer points are treated as equal.
+    _RESOLUTION = 0.005
+
+    def __init__(
+        self,
+        tariff_engine: Optional[TariffEngine] = None,
+        risk_engine: Optional[RiskEngine] = None,
+        currency_converter: Optional[CurrencyConverter] = None,
+    ):
+        self.tariff_engine = tariff_engine or TariffEngine()
+        self.risk_engine = risk_engine or RiskEngine()
+        self.currency_converter = currency_converter or CurrencyConverter()
+
+    @staticmethod
+    def candidate_countries(extra: Iterable[str] = ()) -> List[str]:
+        candidates = set(state.COUNTRY_RISK.keys())
+        for lane in state.TRADE_AGREEMENTS:
+            candidates.update(lane.split("-"))
+        candidates.update(extra)
+        return sorted({str(code).strip().upper() for code in candidates if len(str(code).strip()) == 2})
+
+    def optimize(
+        self,
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        declared_value: float,
+        materials: Sequence[MaterialRecord],
+        candidate_countries: Optional[List[str]] = None,
+        time_budget_ms: Optional[int] = None,
+        as_of: Optional[date] = None,
+        currency: str = "USD",
+    ) -> Dict:
+        """declared_value is in `currency`; every duty amount returned is in USD."""
+        started = time.perf_counter()
+        budget_ms = time_budget_ms or self.DEFAULT_TIME_BUDGET_MS
+        deadline = started + budget_ms / 1000.0
+
+        materials = [asdict(m) for m in materials]
+        current_origins = [m.get("origin_country") or manufacturing_country for m in materials]
+        candidates = (
+            sorted(set(candidate_countries))
+            if candidate_countries
+            else self.candidate_countries(extra=current_origins)
+        )
+
+        outbound = self.tariff_engine.calculate_tariff(
+            hs_code=hs_code,
+            manufacturing_country=manufacturing_country,
+            destination_country=destination_country,
+            declared_value=declared_value,
+            as_of=as_of,
+            fx=self.currency_converter.quote(currency, as_of),
+        )
+
+        # Inbound duty percent and lane risk only depend on the origin country.
+        inbound_percents = self.tariff_engine.total_percents_by_origin(
+            hs_code, set(candidates) | set(current_origins), manufacturing_country, as_of=as_of
+        )
+        lanes = {}
+
+        def lane(country: str):
+            if country not in lanes:
+                percent = 0.0 if country == manufacturing_country else inbound_percents[country]
+                risk = float(self.risk_engine.calculate_risk_batch(
+                    [country], [manufacturing_country], [percent], sourcing_counts=[1]
+                )[0])
+                lanes[country] = (percent, risk)
+            return lanes[country]
+
+        outbound_risk = {}
+
+        def outbound_risk_for(origin_count: int) -> float:
+            if origin_count not in outbound_risk:
+                outbound_risk[origin_count] = float(self.risk_engine.calculate_risk_batch(
+                    [manufacturing_country], [destination_country], [outbound.total_duty_percent],
+                    sourcing_counts=[origin_count],
+                )[0])
+            return outbound_risk[origin_count]
+
+        percentages = [max(0.0, float(m.get("percentage", 0) or 0)) for m in materials]
+        total_percentage = sum(percentages) or 1.0
+        values = self.currency_converter.to_usd(
+            np.array(percentages, dtype=np.float64) * (declared_value / 100), currency, as_of
+        ).tolist()
+        weights = [pct / total_percentage for pct in percentages]
+
+        # A country beaten on both inbound duty and inbound risk by another candidate
+        # is beaten for every material, so it never needs to be branched on.
+        efficient = []
+        best_risk = float("inf")
+        for country in sorted(candidates, key=lambda code: (lane(code)[0], lane(code)[1], code)):
+            if lane(country)[1] < best_risk:
+                efficient.append(country)
+                best_risk = lane(country)[1]
+
+        options = [
+            [(lane(country)[0] / 100 * value, lane(country)[1] * weight, country) for country in efficient]
+            for value, weight in zip(values, weights)
+        ]
+
+        # Most valuable materials first: their choice moves the bounds the most.
+        order = sorted(range(len(materials)), key=lambda idx: -values[idx])
+        min_duty_after = [0.0] * (len(order) + 1)
+        min_risk_after = [0.0] * (len(order) + 1)
+        for pos in range(len(order) - 1, -1, -1):
+            material_options = options[order[pos]]
+            min_duty_after[pos] = min_duty_after[pos + 1] + min((o[0] for o in material_options), default=0.0)
+            min_risk_after[pos] = min_risk_after[pos + 1] + min((o[1] for o in material_options), default=0.0)
+
+        def objectives(inbound_duty: float, inbound_risk: float, origin_count: int):
+            return (
+                outbound.estimated_duty_amount + inbound_duty,
+                (outbound_risk_for(origin_count) + inbound_risk) / 2,
+            )
+
+        # Non-dominated points kept sorted by duty, so risk is strictly decreasing
+        # along the lists and a dominance check is a single bisect.
+        frontier_duty = []
+        frontier_risk = []
+        frontier_assignment = []
+
+        def dominated(duty: float, risk: float) -> bool:
+            pos = bisect.bisect_right(frontier_duty, duty + self._RESOLUTION)
+            return pos > 0 and frontier_risk[pos - 1] <= risk + self._RESOLUTION
+
+        def offer(assignment: List[str]):
+            inbound_duty = sum(lane(c)[0] / 100 * v for c, v in zip(assignment, values))
+            inbound_risk = sum(lane(c)[1] * w for c, w in zip(assignment, weights))
+            duty, risk = objectives(inbound_duty, inbound_risk, len(set(assignment)))
+            if dominated(duty, risk):
+                return
+            start = bisect.bisect_left(frontier_duty, duty)
+            end = start
+            while end < len(frontier_duty) and frontier_risk[end] >= risk:
+                end += 1
+            frontier_duty[start:end] = [duty]
+            frontier_risk[start:end] = [risk]
+            frontier_assignment[start:end] = [list(assignment)]
+
+        if materials and efficient:
+            for country in efficient:
+                offer([country] * len(materials))
+
+        # Materials of equal value are interchangeable; only try their assignments in
+        # non-decreasing option order so each multiset of origins is visited once.
+        same_as_previous = [
+            pos > 0 and abs(values[order[pos]] - values[order[pos - 1]]) <= self._EPSILON
+            for pos in range(len(order))
+        ]
+
+        stats = {"nodes": 0, "complete": True}
+        assignment = [None] * len(materials)
+
+        def search(pos: int, used: frozenset, inbound_duty: float, inbound_risk: float, floor: int):
+            stats["nodes"] += 1
+            if stats["nodes"] % self._CLOCK_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                stats["complete"] = False
+            if not stats["complete"]:
+                return
+
+            if pos == len(order):
+                offer(assignment)
+                return
+
+            bound_duty, bound_risk = objectives(
+                inbound_duty + min_duty_after[pos],
+                inbound_risk + min_risk_after[pos],
+                len(used),
+            )
+            if dominated(bound_duty, bound_risk):
+                return
+
+            idx = order[pos]
+            first = floor if same_as_previous[pos] else 0
+            # Already-used origins first: they add no sourcing complexity.
+            choices = sorted(range(first, len(efficient)), key=lambda j: efficient[j] not in used)
+            for j in choices:
+                option_duty, option_risk, country = options[idx][j]
+                assignment[idx] = country
+                search(
+                    pos + 1,
+                    used if country in used else used | {country},
+                    inbound_duty + option_duty,
+                    inbound_risk + option_risk,
+                    j,
+                )
+                if not stats["complete"]:
+                    return
+
+        if materials and efficient:
+            search(0, frozenset(), 0.0, 0.0, 0)
+
+        def describe(assignment_origins: List[str], duty: float, risk: float) -> Dict:
+            updated = []
+            for material, origin in zip(materials, assignment_origins):
+                item = dict(material)
+                item["origin_country"] = origin
+                updated.append(item)
+            return {
+                "total_duty_amount": round(duty, 2),
+                "outbound_duty_amount": outbound.estimated_duty_amount,
+                "inbound_duty_amount": round(duty - outbound.estimated_duty_amount, 2),
+                "risk_score": round(risk, 2),
+                "origin_countries": sorted(set(assignment_origins)),
+                "changed_materials": sum(
+                    1 for before, after in zip(current_origins, assignment_origins) if before != after
+                ),
+                "materials": updated,
+            }
+
+        baseline_duty, baseline_risk = objectives(
+            sum(lane(c)[0] / 100 * v for c, v in zip(current_origins, values)),
+            sum(lane(c)[1] * w for c, w in zip(current_origins, weights)),
+            len(set(current_origins)),
+        )
+
+        return {
+            "currency": "USD",
+            "baseline": describe(current_origins, baseline_duty, baseline_risk),
+            "frontier": [
+                describe(chosen, duty, risk)
+                for duty, risk, chosen in zip(frontier_duty, frontier_risk, frontier_assignment)
+            ],
+            "search": {
+                "candidate_countries": candidates,
+                "efficient_countries": efficient,
+                "nodes_explored": stats["nodes"],
+                "complete": stats["complete"],
+                "time_budget_ms": budget_ms,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            },
+        }
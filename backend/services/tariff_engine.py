@@ -1,8 +1,17 @@
+from datetime import date
+from typing import Dict, Iterable, Optional
+
 from core import state
 from models.response_models import TariffResponse
+from services.currency_converter import USD_QUOTE, FxQuote
+from services.tariff_index import TariffIndex
 
 
 class TariffEngine:
+    # Shared across instances; rebuilt whenever the reference data changes.
+    _index = None
+    _index_key = None
+
     def normalize_hs(self, hs_code: str) -> str:
         raw = hs_code.replace(".", "").strip()
 
@@ -14,81 +23,144 @@ class TariffEngine:
 
         return raw
 
-    def calculate_tariff(
+    @classmethod
+    def index(cls) -> TariffIndex:
+        key = (
+            state.DATA_VERSION,
+            id(state.TARIFFS),
+            len(state.TARIFFS),
+            len(state.TRADE_AGREEMENTS),
+            len(state.TRADE_BLOCS),
+        )
+        if cls._index is None or key != cls._index_key:
+            cls._index = TariffIndex(state.TARIFFS, state.TRADE_AGREEMENTS, state.TRADE_BLOCS)
+            cls._index_key = key
+        return cls._index
+
+    def resolve_rates(
         self,
         hs_code: str,
         manufacturing_country: str,
         destination_country: str,
-        declared_value: float
-    ) -> TariffResponse:
-        normalized_hs = self.normalize_hs(hs_code)
-
-        tariff_data = state.TARIFFS.get(normalized_hs)
-
-        if not tariff_data and len(normalized_hs) >= 4:
-            prefix4 = normalized_hs[:4]
-            prefix4_matches = [
-                value for key, value in state.TARIFFS.items()
-                if key.startswith(prefix4)
-            ]
-            if prefix4_matches:
-                tariff_data = prefix4_matches[0]
-
-        if not tariff_data and len(normalized_hs) >= 2:
-            chapter2 = normalized_hs[:2]
-            chapter_matches = [
-                value for key, value in state.TARIFFS.items()
-                if key.startswith(chapter2)
-            ]
-            if chapter_matches:
-                avg_base = sum(item.get("base_duty", 0) for item in chapter_matches) / len(chapter_matches)
-                avg_additional = (
-                    sum(item.get("additional_duty", 0) for item in chapter_matches) / len(chapter_matches)
-                )
-                tariff_data = {
-                    "base_duty": round(avg_base, 2),
-                    "additional_duty": round(avg_additional, 2)
-                }
-
-        if not tariff_data:
-            print(f"[WARN] No tariff found for {normalized_hs}. Applying default duty.")
-            tariff_data = {
-                "base_duty": 10,
-                "additional_duty": 0
-            }
+        as_of: Optional[date] = None
+    ) -> dict:
+        """
+        Resolves the duty percentages for an HS code on a lane, using the
+        tariff and agreement versions in effect on as_of (default: today).
+        They do not depend on the declared value, so callers may reuse them
+        across values.
+        """
+        index = self.index()
+        day = (as_of or date.today()).toordinal()
+        base_duty, additional_duty = self._tariff_value(index, self.normalize_hs(hs_code), day)
+
+        discount = index.discount(manufacturing_country, destination_country, day)
 
-        base_duty = tariff_data.get("base_duty", 0)
-        additional_duty = tariff_data.get("additional_duty", 0)
+        total_percent = base_duty + additional_duty - discount
 
-        agreement_key = f"{manufacturing_country}-{destination_country}"
-        discount = 0
+        if total_percent < 0:
+            total_percent = 0
 
-        if agreement_key in state.TRADE_AGREEMENTS:
-            agreement_data = state.TRADE_AGREEMENTS[agreement_key]
+        return {
+            "base_duty": base_duty,
+            "additional_duty": additional_duty,
+            "discount": discount,
+            "total_percent": total_percent,
+        }
 
-            if isinstance(agreement_data, dict):
-                discount = agreement_data.get("discount_percent", 0)
-            elif isinstance(agreement_data, (int, float)):
-                discount = agreement_data
+    def total_percents_by_origin(
+        self,
+        hs_code: str,
+        origins: Iterable[str],
+        destination_country: str,
+        as_of: Optional[date] = None
+    ) -> Dict[str, float]:
+        """
+        total_duty_percent for each origin -> destination_country lane, as
+        calculate_tariff would report it. The HS rate is resolved once and the
+        discounts are read from one column of the preference matrix.
+        """
+        index = self.index()
+        day = (as_of or date.today()).toordinal()
+        base_duty, additional_duty = self._tariff_value(index, self.normalize_hs(hs_code), day)
+
+        matrix = index.preference_matrix(day)
+        destination_id = index.country_id(destination_country)
+        return {
+            origin: float(max(
+                base_duty + additional_duty - matrix.at(index.country_id(origin), destination_id), 0
+            ))
+            for origin in origins
+        }
+
+    @staticmethod
+    def _tariff_value(index: TariffIndex, normalized_hs: str, day: int):
+        tariff_value = index.tariff(normalized_hs, day)
+
+        if tariff_value is None and len(normalized_hs) >= 4:
+            tariff_value = index.heading_tariff(normalized_hs[:4], day)
+
+        if tariff_value is None and len(normalized_hs) >= 2:
+            chapter_matches = index.chapter_tariffs(normalized_hs[:2], day)
+            if chapter_matches:
+                avg_base = sum(base for base, _ in chapter_matches) / len(chapter_matches)
+                avg_additional = sum(additional for _, additional in chapter_matches) / len(chapter_matches)
+                tariff_value = (round(avg_base, 2), round(avg_additional, 2))
 
-        total_percent = base_duty + additional_duty - discount
+        if tariff_value is None:
+            print(f"[WARN] No tariff found for {normalized_hs}. Applying default duty.")
+            tariff_value = (10, 0)
 
-        if total_percent < 0:
-            total_percent = 0
+        return tariff_value
+
+    def build_summary(self, rates: dict, declared_value: float, fx: FxQuote = USD_QUOTE) -> dict:
+        """
+        Builds the tariff summary as a plain dict with the same field types as
+        TariffResponse, without a Pydantic validation pass. declared_value is
+        in fx.currency; estimated_duty_amount is in USD and
+        estimated_duty_amount_in_currency in fx.currency.
+        """
+        base_duty = rates["base_duty"]
+        additional_duty = rates["additional_duty"]
+        discount = rates["discount"]
+        total_percent = rates["total_percent"]
 
-        estimated_amount = (total_percent / 100) * declared_value
+        declared_value_usd = declared_value * fx.usd_per_unit
+        estimated_amount = (total_percent / 100) * declared_value_usd
 
         explanation = (
             f"Base duty {base_duty}% + additional duty {additional_duty}% "
             f"- trade agreement discount {discount}% "
             f"= total {total_percent}% applied on declared value."
         )
+        if fx.currency != USD_QUOTE.currency:
+            explanation += f" Declared value converted at 1 {fx.currency} = {fx.usd_per_unit} USD."
+
+        return {
+            "base_duty": float(base_duty),
+            "additional_duty": float(additional_duty),
+            "trade_agreement_discount": float(-discount),
+            "total_duty_percent": float(total_percent),
+            "estimated_duty_amount": float(round(estimated_amount, 2)),
+            "currency": fx.currency,
+            "fx_rate": fx.usd_per_unit,
+            "fx_effective_from": fx.effective_from.isoformat() if fx.effective_from else None,
+            "declared_value_usd": float(round(declared_value_usd, 2)),
+            "estimated_duty_amount_in_currency": float(round((total_percent / 100) * declared_value, 2)),
+            "explanation": explanation,
+        }
+
+    def build_tariff(self, rates: dict, declared_value: float, fx: FxQuote = USD_QUOTE) -> TariffResponse:
+        return TariffResponse.model_construct(**self.build_summary(rates, declared_value, fx))
 
-        return TariffResponse(
-            base_duty=base_duty,
-            additional_duty=additional_duty,
-            trade_agreement_discount=-discount,
-            total_duty_percent=total_percent,
-            estimated_duty_amount=round(estimated_amount, 2),
-            explanation=explanation
-        )
+    def calculate_tariff(
+        self,
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        declared_value: float,
+        as_of: Optional[date] = None,
+        fx: FxQuote = USD_QUOTE,
+    ) -> TariffResponse:
+        rates = self.resolve_rates(hs_code, manufacturing_country, destination_country, as_of=as_of)
+        return self.build_tariff(rates, declared_value, fx)
@@ -0,0 +1,216 @@
+"""
+Effective-dated tariff and trade agreement lookups.
+
+An entry in tariffs.json / trade_agreements.json is either a plain record,
+which is always in effect, or {"versions": [...]} where each version adds
+"effective_from" (inclusive) and optionally "effective_to" (exclusive) ISO
+dates. Dates outside every version behave as if the entry did not exist.
+
+Entries that are always in effect are stored as their bare (interned) value;
+only dated entries get a Timeline of parallel tuples searched by bisection,
+so a lookup for any date costs the same as one for today.
+
+Trade preferences come from bilateral lanes ("IN-US") and from blocs in
+trade_blocs.json ({"members": [...], "discount_percent": n}, optionally
+versioned the same way). They are compiled into one dense origin x
+destination PreferenceMatrix per date range; a bilateral lane overrides any
+bloc covering the same pair, and overlapping blocs keep the larger discount.
+"""
+from array import array
+from bisect import bisect_right
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+MIN_DAY = date.min.toordinal()
+MAX_DAY = date.max.toordinal() + 1
+
+TariffValue = Tuple[float, float]  # (base_duty, additional_duty)
+
+
+class Timeline:
+    """Non-overlapping [start, end) day intervals with a value each."""
+
+    __slots__ = ("starts", "ends", "values")
+
+    def __init__(self, intervals: List[Tuple[int, int, Any]], label: str):
+        intervals = sorted(intervals, key=lambda item: item[0])
+        for (_, previous_end, _), (start, _, _) in zip(intervals, intervals[1:]):
+            if start < previous_end:
+                raise ValueError(f"Overlapping effective dates for {label}.")
+        self.starts = tuple(start for start, _, _ in intervals)
+        self.ends = tuple(end for _, end, _ in intervals)
+        self.values = tuple(value for _, _, value in intervals)
+
+    def at(self, day: int):
+        position = bisect_right(self.starts, day) - 1
+        if position >= 0 and day < self.ends[position]:
+            return self.values[position]
+        return None
+
+
+class PreferenceMatrix:
+    """
+    Origin x destination discounts for one date range. cells holds a uint16
+    id per pair (row-major, size x size) into the shared values tuple, whose
+    id 0 is "no preference". The last row and column belong to countries
+    that are in no agreement or bloc.
+    """
+
+    __slots__ = ("size", "cells", "values")
+
+    def __init__(self, size: int, cells: array, values: Tuple[Any, ...]):
+        self.size = size
+        self.cells = cells
+        self.values = values
+
+    def at(self, origin_id: int, destination_id: int):
+        return self.values[self.cells[origin_id * self.size + destination_id]]
+
+
+def _day(value: Optional[str], default: int) -> int:
+    return date.fromisoformat(value).toordinal() if value else default
+
+
+def _compiled_values(compiled) -> Tuple[Any, ...]:
+    return compiled.values if isinstance(compiled, Timeline) else (compiled,)
+
+
+class TariffIndex:
+    def __init__(
+        self,
+        tariffs: Dict[str, Any],
+        agreements: Dict[str, Any],
+        blocs: Optional[Dict[str, Any]] = None,
+    ):
+        self._interned: Dict[Any, Any] = {}
+        self.version_count = 0
+        self._tariffs = {
+            hs_code: self._compile(hs_code, entry, self._tariff_value)
+            for hs_code, entry in tariffs.items()
+        }
+        self._compile_preferences(agreements, blocs or {})
+
+        # Heading and chapter fallbacks keep the file's key order.
+        self._by_heading: Dict[str, List[str]] = {}
+        self._by_chapter: Dict[str, List[str]] = {}
+        for hs_code in tariffs:
+            self._by_heading.setdefault(hs_code[:4], []).append(hs_code)
+            self._by_chapter.setdefault(hs_code[:2], []).append(hs_code)
+
+    def _intern(self, value):
+        return self._interned.setdefault(value, value)
+
+    def _tariff_value(self, record: Dict[str, Any]) -> TariffValue:
+        return self._intern((record.get("base_duty", 0), record.get("additional_duty", 0)))
+
+    def _discount_value(self, record: Any):
+        if isinstance(record, dict):
+            return self._intern(record.get("discount_percent", 0))
+        if isinstance(record, (int, float)):
+            return self._intern(record)
+        return 0
+
+    def _bloc_value(self, record: Dict[str, Any]) -> Tuple[frozenset, Any]:
+        members = frozenset(str(code).strip().upper() for code in record.get("members", ()))
+        return self._intern((members, self._discount_value(record)))
+
+    def _compile(self, label: str, entry: Any, to_value) -> Union[Any, Timeline]:
+        versions = entry.get("versions") if isinstance(entry, dict) else None
+        if versions is None:
+            self.version_count += 1
+            return to_value(entry)
+
+        intervals = []
+        for version in versions:
+            start = _day(version.get("effective_from"), MIN_DAY)
+            end = _day(version.get("effective_to"), MAX_DAY)
+            if end <= start:
+                raise ValueError(f"Empty effective date range for {label}.")
+            intervals.append((start, end, to_value(version)))
+        self.version_count += len(intervals)
+        if len(intervals) == 1 and intervals[0][:2] == (MIN_DAY, MAX_DAY):
+            return intervals[0][2]
+        return Timeline(intervals, label)
+
+    @staticmethod
+    def _at(compiled, day: int):
+        if isinstance(compiled, Timeline):
+            return compiled.at(day)
+        return compiled
+
+    def tariff(self, hs_code: str, day: int) -> Optional[TariffValue]:
+        compiled = self._tariffs.get(hs_code)
+        return None if compiled is None else self._at(compiled, day)
+
+    def heading_tariff(self, heading: str, day: int) -> Optional[TariffValue]:
+        """First line under the 4-digit heading that is in effect on day."""
+        for hs_code in self._by_heading.get(heading, ()):
+            value = self.tariff(hs_code, day)
+            if value is not None:
+                return value
+        return None
+
+    def chapter_tariffs(self, chapter: str, day: int) -> List[TariffValue]:
+        values = (self.tariff(hs_code, day) for hs_code in self._by_chapter.get(chapter, ()))
+        return [value for value in values if value is not None]
+
+    def _compile_preferences(self, agreements: Dict[str, Any], blocs: Dict[str, Any]):
+        lanes = {}
+        for lane, entry in agreements.items():
+            origin, _, destination = lane.partition("-")
+            lanes[(origin, destination)] = self._compile(lane, entry, self._discount_value)
+        compiled_blocs = [self._compile(name, entry, self._bloc_value) for name, entry in blocs.items()]
+
+        countries = {code for pair in lanes for code in pair}
+        for compiled in compiled_blocs:
+            for members, _ in _compiled_values(compiled):
+                countries.update(members)
+        self.countries = tuple(sorted(countries))
+        self.country_ids = {code: idx for idx, code in enumerate(self.countries)}
+        self.default_country_id = len(self.countries)
+
+        # A new matrix starts wherever any lane or bloc changes.
+        boundaries = {MIN_DAY}
+        for compiled in [*lanes.values(), *compiled_blocs]:
+            if isinstance(compiled, Timeline):
+                boundaries.update(compiled.starts)
+                boundaries.update(end for end in compiled.ends if end < MAX_DAY)
+        self._matrix_starts = tuple(sorted(boundaries))
+
+        value_ids: Dict[Any, int] = {0: 0}
+        size = self.default_country_id + 1
+        matrices = []
+        for day in self._matrix_starts:
+            discounts: Dict[Tuple[int, int], Any] = {}
+            for compiled in compiled_blocs:
+                in_effect = self._at(compiled, day)
+                if in_effect is None:
+                    continue
+                members, discount = in_effect
+                ids = sorted(self.country_ids[code] for code in members)
+                for origin_id in ids:
+                    for destination_id in ids:
+                        pair = (origin_id, destination_id)
+                        if origin_id != destination_id and discount > discounts.get(pair, 0):
+                            discounts[pair] = discount
+            for (origin, destination), compiled in lanes.items():
+                discount = self._at(compiled, day)
+                if discount is not None:
+                    discounts[(self.country_ids[origin], self.country_ids[destination])] = discount
+
+            cells = array("H", bytes(2 * size * size))
+            for (origin_id, destination_id), discount in discounts.items():
+                cells[origin_id * size + destination_id] = value_ids.setdefault(discount, len(value_ids))
+            matrices.append(cells)
+
+        values = tuple(value_ids)
+        self._matrices = tuple(PreferenceMatrix(size, cells, values) for cells in matrices)
+
+    def country_id(self, code: str) -> int:
+        return self.country_ids.get(code, self.default_country_id)
+
+    def preference_matrix(self, day: int) -> PreferenceMatrix:
+        return self._matrices[bisect_right(self._matrix_starts, day) - 1]
+
+    def discount(self, origin: str, destination: str, day: int):
+        return self.preference_matrix(day).at(self.country_id(origin), self.country_id(destination))
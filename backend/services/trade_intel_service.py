@@ -1,9 +1,20 @@
+import copy
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from openai import OpenAI
-
-from config import AI_MODEL, GROQ_API_KEY, GROQ_BASE_URL, USE_REAL_AI
+from config import (
+    AI_MODEL,
+    GROQ_API_KEY,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+    TRADE_INTEL_MIN_BUDGET_SECONDS,
+    USE_REAL_AI,
+)
+from core.deadline import Deadline
+from core.http_cache import fingerprint
+from core.ttl_cache import TTLCache
+from services.llm_json import complete_json
+from services.llm_transport import create_llm_client, requires_api_key
 
 
 class TradeIntelService:
@@ -12,22 +23,28 @@ class TradeIntelService:
     - recent_insights
     - shipping_options
     - compliance_checks
-    Falls back to deterministic values if AI output is unavailable.
+    Falls back to deterministic values if AI output is unavailable or the
+    request deadline leaves too little time for it. AI output is cached per
+    exact set of inputs; fallbacks are not.
     """
 
     def __init__(self):
         self.model = AI_MODEL
-        self.client = None
+        self._client = None
+        self.cache = TTLCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
 
-        if USE_REAL_AI and GROQ_API_KEY:
-            self.client = OpenAI(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+    @property
+    def client(self):
+        if self._client is None and USE_REAL_AI and (GROQ_API_KEY or not requires_api_key()):
+            self._client = create_llm_client(api_key=GROQ_API_KEY)
+        return self._client
 
     def _resolve_client(self, groq_api_key: str = ""):
         if not USE_REAL_AI:
             return None
         key = str(groq_api_key or "").strip()
         if key:
-            return OpenAI(api_key=key, base_url=GROQ_BASE_URL)
+            return create_llm_client(api_key=key)
         return self.client
 
     @staticmethod
@@ -127,6 +144,37 @@ class TradeIntelService:
             ],
         }
 
+    def cache_key(
+        self,
+        product_name: str,
+        hs_code: str,
+        manufacturing_country: str,
+        destination_country: str,
+        declared_value: float,
+        tariff_summary: Dict[str, Any],
+        risk_score: float,
+        ai_explanation: str,
+    ) -> str:
+        return fingerprint(
+            "trade_intel", self.model, product_name, hs_code, manufacturing_country, destination_country,
+            float(declared_value), tariff_summary, float(risk_score), ai_explanation,
+        )
+
+    def remember(self, inputs: Dict[str, Any], intel: Dict[str, Any], stored_at: Optional[float] = None) -> bool:
+        """
+        Seeds the cache with earlier output for `inputs` (the generate() arguments
+        that cache_key takes). Skipped, returning False, when it is already cached,
+        too old, or just the deterministic fallback.
+        """
+        key = self.cache_key(**inputs)
+        if key in self.cache:
+            return False
+        blocks = {name: intel.get(name) for name in ("recent_insights", "shipping_options", "compliance_checks")}
+        fallback_inputs = {name: value for name, value in inputs.items() if name != "ai_explanation"}
+        if blocks == self._fallback(**fallback_inputs):
+            return False
+        return self.cache.put(key, copy.deepcopy(blocks), stored_at=stored_at)
+
     def _normalize_payload(self, parsed: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
         insights_raw = self._normalize_list(parsed.get("recent_insights"))
         shipping_raw = self._normalize_list(parsed.get("shipping_options"))
@@ -189,7 +237,16 @@ class TradeIntelService:
         risk_score: float,
         ai_explanation: str,
         groq_api_key: str = "",
+        deadline: Optional[Deadline] = None,
     ) -> Dict[str, List[Dict[str, Any]]]:
+        key = self.cache_key(
+            product_name, hs_code, manufacturing_country, destination_country,
+            declared_value, tariff_summary, risk_score, ai_explanation,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
         fallback = self._fallback(
             product_name=product_name,
             hs_code=hs_code,
@@ -204,6 +261,13 @@ class TradeIntelService:
         if client is None:
             return fallback
 
+        timeout = None
+        if deadline is not None:
+            timeout = deadline.remaining()
+            if timeout < TRADE_INTEL_MIN_BUDGET_SECONDS:
+                deadline.missed("trade_intel")
+                return fallback
+
         prompt = f"""
 You are a trade operations analyst.
 Generate JSON only for UI cards.
@@ -249,20 +313,20 @@ Rules:
 """
 
         try:
-            response = client.chat.completions.create(
+            parsed = await complete_json(
+                client,
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.2,
+                timeout=timeout,
             )
-
-            content = (response.choices[0].message.content or "").strip()
-            if content.startswith("```"):
-                content = content.replace("```json", "").replace("```", "").strip()
-
-            parsed = json.loads(content)
             if not isinstance(parsed, dict):
                 return fallback
 
-            return self._normalize_payload(parsed, fallback)
+            intel = self._normalize_payload(parsed, fallback)
+            self.cache.put(key, copy.deepcopy(intel))
+            return intel
         except Exception:
+            if deadline is not None and deadline.expired:
+                deadline.missed("trade_intel")
             return fallback
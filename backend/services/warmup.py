@@ -0,0 +1,306 @@
+"""
+Cache warmup after a deploy: at startup, then every WARMUP_INTERVAL_SECONDS
+when that is set.
+
+Each run
+1. builds the analysis services and opens pooled connections to the LLM
+   upstreams, so the first request pays for neither imports nor TLS setup;
+2. reads analyses from the last WARMUP_HISTORY_SECONDS of history and seeds the
+   classification and trade-intel caches with results still within
+   LLM_CACHE_TTL_SECONDS;
+3. re-runs, in the background and at most WARMUP_CONCURRENCY at a time, the
+   classification of the WARMUP_TOP_PRODUCTS most frequent product
+   fingerprints and the trade intel of the WARMUP_TOP_LANES most frequent
+   (HS code, lane) pairs that are still cold after seeding.
+
+GET /ready answers 503 until the first run has finished step 1 and warmed
+WARMUP_READY_THRESHOLD of the items planned in step 3, or until
+WARMUP_READY_TIMEOUT_SECONDS have passed.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import (
+    WARMUP_CONCURRENCY,
+    WARMUP_ENABLED,
+    WARMUP_HISTORY_LIMIT,
+    WARMUP_HISTORY_SECONDS,
+    WARMUP_INTERVAL_SECONDS,
+    WARMUP_READY_THRESHOLD,
+    WARMUP_READY_TIMEOUT_SECONDS,
+    WARMUP_TOP_LANES,
+    WARMUP_TOP_PRODUCTS,
+)
+from core.analysis_records import compact_materials
+from services.ai_service import AIService
+from services.currency_converter import CurrencyConverter
+from services.llm_transport import open_connections
+from services.recalculation_service import RecalculationService
+from services.risk_engine import RiskEngine
+from services.tariff_engine import TariffEngine
+from services.trade_intel_service import TradeIntelService
+
+HistorySource = Callable[[float, int], List[Dict[str, Any]]]
+
+
+def _description(payload: Dict[str, Any]) -> str:
+    return str(payload.get("description") or "").strip()
+
+
+class WarmupService:
+    def __init__(
+        self,
+        ai_service: AIService,
+        trade_intel_service: TradeIntelService,
+        recalculation_service: RecalculationService,
+        history: HistorySource,
+        enabled: bool = WARMUP_ENABLED,
+        interval_seconds: float = WARMUP_INTERVAL_SECONDS,
+        history_seconds: float = WARMUP_HISTORY_SECONDS,
+        history_limit: int = WARMUP_HISTORY_LIMIT,
+        top_products: int = WARMUP_TOP_PRODUCTS,
+        top_lanes: int = WARMUP_TOP_LANES,
+        concurrency: int = WARMUP_CONCURRENCY,
+        ready_threshold: float = WARMUP_READY_THRESHOLD,
+        ready_timeout_seconds: float = WARMUP_READY_TIMEOUT_SECONDS,
+    ):
+        self.ai_service = ai_service
+        self.trade_intel_service = trade_intel_service
+        self.recalculation_service = recalculation_service
+        self.history = history
+        self.enabled = enabled
+        self.interval_seconds = interval_seconds
+        self.history_seconds = history_seconds
+        self.history_limit = history_limit
+        self.top_products = top_products
+        self.top_lanes = top_lanes
+        self.concurrency = max(1, concurrency)
+        self.ready_threshold = ready_threshold
+        self.ready_timeout_seconds = ready_timeout_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._prepared = False
+        self._ready = not enabled
+        self._running = False
+        self.runs = 0
+        self._progress = self._new_progress()
+
+    @staticmethod
+    def _new_progress() -> Dict[str, Any]:
+        return {
+            "connections": 0,
+            "history_records": 0,
+            "seeded_classifications": 0,
+            "seeded_trade_intel": 0,
+            "planned": 0,
+            "warmed": 0,
+            "failed": 0,
+            "duration_seconds": None,
+            "error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        if self.enabled and self._task is None:
+            self._started_at = time.monotonic()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._progress["error"] = str(e)
+                print(f"[WARMUP] Failed: {e}")
+            # Readiness is left to `ready`: a run that failed or warmed too little
+            # only becomes ready after WARMUP_READY_TIMEOUT_SECONDS.
+            if self.interval_seconds <= 0:
+                return
+            await asyncio.sleep(self.interval_seconds)
+
+    # ------------------------------------------------------------------
+    # Readiness
+    # ------------------------------------------------------------------
+    @property
+    def ready(self) -> bool:
+        if self._ready:
+            return True
+        if self._started_at is None:
+            return False
+        if time.monotonic() - self._started_at >= self.ready_timeout_seconds:
+            self._ready = True
+        elif self._prepared and self.warm_fraction() >= self.ready_threshold:
+            self._ready = True
+        return self._ready
+
+    def warm_fraction(self) -> float:
+        planned = self._progress["planned"]
+        return self._progress["warmed"] / planned if planned else 1.0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "running": self._running,
+            "runs": self.runs,
+            "warm_fraction": round(self.warm_fraction(), 4),
+            "ready_threshold": self.ready_threshold,
+            "progress": dict(self._progress),
+            "caches": {
+                "classification": self.ai_service.cache.stats(),
+                "trade_intel": self.trade_intel_service.cache.stats(),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Warmup
+    # ------------------------------------------------------------------
+    def _prepare(self) -> int:
+        TariffEngine.index()
+        RiskEngine.lane_risk_matrix()
+        CurrencyConverter.table()
+        # Touching the clients imports the SDK and builds their connection pools.
+        clients = {id(client): client for client in (self.ai_service.client, self.trade_intel_service.client) if client is not None}
+        return sum(open_connections(client) for client in clients.values())
+
+    def _plan(self, records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Latest record of each top product fingerprint and of each top (HS code, lane) pair."""
+        product_counts, product_latest = Counter(), {}
+        lane_counts, lane_latest = Counter(), {}
+        for record in records:
+            payload, result = record["payload"], record["result"]
+            description = _description(payload)
+            if description:
+                product = self.ai_service.classification_key(payload["product_name"], description)
+                product_counts[product] += 1
+                product_latest[product] = record
+            lane = (result["hs_code"], result["manufacturing_country"], result["destination_country"])
+            lane_counts[lane] += 1
+            lane_latest[lane] = record
+        return (
+            [product_latest[key] for key, _ in product_counts.most_common(self.top_products)],
+            [lane_latest[key] for key, _ in lane_counts.most_common(self.top_lanes)],
+        )
+
+    @staticmethod
+    def _trade_intel_inputs(record: Dict[str, Any]) -> Dict[str, Any]:
+        payload, result = record["payload"], record["result"]
+        return {
+            "product_name": payload["product_name"],
+            "hs_code": result["hs_code"],
+            "manufacturing_country": result["manufacturing_country"],
+            "destination_country": result["destination_country"],
+            # Trade intel sees USD; analyses from before multi-currency were all USD.
+            "declared_value": result["tariff_summary"].get("declared_value_usd", result["declared_value"]),
+            "tariff_summary": result["tariff_summary"],
+            "risk_score": result["risk_score"],
+            "ai_explanation": result.get("explanation", ""),
+        }
+
+    def _seed(self, records: List[Dict[str, Any]]):
+        progress = self._progress
+        # Newest first, so each key is seeded with its latest result.
+        for record in reversed(records):
+            payload, result, stored_at = record["payload"], record["result"], record["finished_at"]
+            description = _description(payload)
+            if description and self.ai_service.remember_classification(
+                payload["product_name"], description, result, stored_at=stored_at
+            ):
+                progress["seeded_classifications"] += 1
+            if self.trade_intel_service.remember(self._trade_intel_inputs(record), result, stored_at=stored_at):
+                progress["seeded_trade_intel"] += 1
+
+    async def _warm_product(self, record: Dict[str, Any]) -> bool:
+        payload = record["payload"]
+        description = _description(payload)
+        key = self.ai_service.classification_key(payload["product_name"], description)
+        if key not in self.ai_service.cache:
+            await self.ai_service.classify_product(product_name=payload["product_name"], description=description)
+        return key in self.ai_service.cache
+
+    async def _warm_lane(self, record: Dict[str, Any]) -> bool:
+        """Replays the lane's latest analysis the way the pipeline would run it today."""
+        payload, result = record["payload"], record["result"]
+        description = _description(payload)
+        if description:
+            classification = await self.ai_service.classify_product(
+                product_name=payload["product_name"], description=description
+            )
+        else:
+            classification = result
+        as_of = date.fromisoformat(payload["as_of"]) if payload.get("as_of") else None
+        stages, _ = self.recalculation_service.evaluate(
+            {},
+            hs_code=classification["hs_code"],
+            manufacturing_country=result["manufacturing_country"],
+            destination_country=result["destination_country"],
+            declared_value=result["declared_value"],
+            materials=compact_materials(classification["materials"]),
+            as_of=as_of,
+            currency=result.get("currency", "USD"),
+        )
+        inputs = {
+            **self._trade_intel_inputs(record),
+            "hs_code": classification["hs_code"],
+            "declared_value": stages["tariff_summary"]["declared_value_usd"],
+            "tariff_summary": stages["tariff_summary"],
+            "risk_score": stages["risk_score"],
+            "ai_explanation": classification.get("explanation", ""),
+        }
+        if self.trade_intel_service.cache_key(**inputs) not in self.trade_intel_service.cache:
+            await self.trade_intel_service.generate(**inputs)
+        return self.trade_intel_service.cache_key(**inputs) in self.trade_intel_service.cache
+
+    async def run_once(self):
+        started = time.monotonic()
+        self._running = True
+        self._progress = progress = self._new_progress()
+        try:
+            progress["connections"] = await asyncio.to_thread(self._prepare)
+            records = await asyncio.to_thread(
+                self.history, time.time() - self.history_seconds, self.history_limit
+            )
+            progress["history_records"] = len(records)
+            products, lanes = self._plan(records)
+            self._seed(records)
+            progress["planned"] = len(products) + len(lanes)
+            self._prepared = True
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def warm(coroutine_factory, record):
+                async with semaphore:
+                    try:
+                        warmed = await coroutine_factory(record)
+                    except Exception:
+                        warmed = False
+                progress["warmed" if warmed else "failed"] += 1
+
+            # Products first, so lane replays find their classification cached.
+            await asyncio.gather(*(warm(self._warm_product, record) for record in products))
+            await asyncio.gather(*(warm(self._warm_lane, record) for record in lanes))
+        finally:
+            self._running = False
+            self.runs += 1
+            progress["duration_seconds"] = round(time.monotonic() - started, 3)
+
+        print(
+            f"[WARMUP] {progress['warmed']}/{progress['planned']} top products and lanes warm "
+            f"({progress['seeded_classifications']} classifications, {progress['seeded_trade_intel']} trade intel "
+            f"seeded from {progress['history_records']} analyses; {progress['connections']} upstream connections) "
+            f"in {progress['duration_seconds']} s"
+        )